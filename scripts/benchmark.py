@@ -0,0 +1,294 @@
+import argparse
+import contextlib
+import glob
+import io
+import json
+import math
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import cv2
+import numpy as np
+
+from generate_def import DEFGenerator
+from modify_def import generate_diearea_from_image, generate_new_diearea
+from variant_generator import VariantGenerator
+
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_ROOT = os.path.dirname(SCRIPTS_DIR)
+
+# Parameter grids per scale; "full" covers the whole requested range
+SCALES = {
+    "quick": {
+        "generate_def": [100, 1000, 5000],
+        "generate_def_sweep": [100, 1000],
+        "generate_new_diearea": [1, 10, 100],
+        "diearea_from_image": [256, 1024],
+        "variants": 2,
+    },
+    "full": {
+        "generate_def": [100, 1000, 5000, 20000],
+        "generate_def_sweep": [100, 1000, 5000],
+        "generate_new_diearea": [1, 10, 100, 1000],
+        "diearea_from_image": [256, 1024, 4096, 16384],
+        "variants": 10,
+    },
+}
+
+# Modules the DEF-only modes of modify_def.py must not load, and the default
+# extra startup time (import of modify_def over a bare interpreter) they may cost
+HEAVY_MODULES = ("cv2", "numpy")
+STARTUP_BUDGET_MS = 100
+
+# Synthetic die for the dataset profiles (their depth knobs are in DBU for a die of this order)
+PROFILE_DIE = (4000000, 3000000)
+
+# --- Synthetic Inputs ---
+
+def write_outline_image(path, size):
+    """
+    Write a size x size outline image: a white staircase-notched die on a red keep-out background,
+    as expected by the image pipeline.
+    """
+    img = np.empty((size, size, 3), dtype=np.uint8)
+    img[:] = (0, 0, 255)
+    m = size // 10
+    step = max((size - 2 * m) // 8, 1)
+    die = np.array([(m, m), (m, size - m), (size - m - 3 * step, size - m), (size - m - 3 * step, size - m - 2 * step),
+                    (size - m, size - m - 2 * step), (size - m, m + step), (m + 4 * step, m + step), (m + 4 * step, m)],
+                   dtype=np.int32)
+    cv2.fillPoly(img, [die], (255, 255, 255))
+    cv2.imwrite(path, img)
+
+def notch_pairs(die_width, die_height, count):
+    """count non-overlapping bottom-edge cutouts as (edge point, internal point) pairs"""
+    pitch = die_width // (2 * count + 1)
+    depth = die_height // 4
+    return [((pitch * (2 * k + 1), 0), (pitch * (2 * k + 2), depth // (1 + k % 3))) for k in range(count)]
+
+# --- Benchmark Cases ---
+# Each case does its setup and returns (params, fn); only fn is timed.
+
+def case_generate_def(workdir, die_um):
+    generator = DEFGenerator()
+    dbu = generator.config["design"]["dbu_per_micron"] * die_um
+    out = os.path.join(workdir, f"gen_{die_um}um.def")
+    return {"die_um": die_um}, lambda: generator.generate_def_file(dbu, dbu, out)
+
+def case_generate_def_sweep(workdir, templates):
+    """DEFGenerator.generate_sweep over a square grid of 1-2 mm dies"""
+    generator = DEFGenerator()
+    side = math.isqrt(templates)
+    dbu = generator.config["design"]["dbu_per_micron"]
+    sizes = [(w, h, f"sweep_{w}x{h}") for w in range(2000 * dbu, 4000 * dbu, 2000 * dbu // side)[:side]
+             for h in range(2000 * dbu, 4000 * dbu, 2000 * dbu // side)[:side]]
+    out_dir = os.path.join(workdir, f"sweep_{templates}")
+    return {"templates": len(sizes)}, lambda: generator.generate_sweep(sizes, out_dir)
+
+def case_generate_new_diearea(workdir, cutouts):
+    die = ((0, 0), (4000000, 3000000))
+    pairs = notch_pairs(4000000, 3000000, cutouts)
+    return {"cutouts": cutouts}, lambda: generate_new_diearea(die, [], [], [], [], [], [], [], pairs)
+
+def case_diearea_from_image(workdir, size):
+    image = os.path.join(workdir, f"outline_{size}.png")
+    if not os.path.exists(image):
+        write_outline_image(image, size)
+    return {"pixels": size}, lambda: generate_diearea_from_image(image, *PROFILE_DIE)
+
+def case_variants(workdir, profile, variants):
+    """End-to-end VariantGenerator run with one dataset profile on a synthetic input DEF"""
+    input_def = os.path.join(workdir, "profile_input.def")
+    if not os.path.exists(input_def):
+        DEFGenerator().generate_def_file(*PROFILE_DIE, input_def)
+    config = VariantGenerator.load_shell_profile(profile)
+    out_dir = os.path.join(workdir, "variants", os.path.basename(profile))
+    name = os.path.basename(profile).replace("_modifier.sh", "")
+    return ({"profile": name, "variants": variants},
+            lambda: VariantGenerator(config).generate(input_def, out_dir, variants))
+
+def case_startup(workdir, mode):
+    """One modify_def.py invocation as the shell drivers run it, interpreter start included"""
+    input_def = os.path.join(workdir, "startup_input.def")
+    if not os.path.exists(input_def):
+        DEFGenerator().generate_def_file(*PROFILE_DIE, input_def)
+    cmd = [sys.executable, os.path.join(SCRIPTS_DIR, "modify_def.py"), "-i", input_def,
+           "-o", os.path.join(workdir, f"startup_{mode}.def")]
+    if mode == "diearea_line":
+        cmd += ["--diearea-line", "DIEAREA ( 0 0 ) ( 0 3000000 ) ( 4000000 3000000 ) ( 4000000 0 ) ;"]
+    elif mode == "rectangles":
+        cmd += ["-r", "1", "-c", "0", "0", "500000", "500000"]
+    else:
+        image = os.path.join(workdir, "outline_256.png")
+        if not os.path.exists(image):
+            write_outline_image(image, 256)
+        cmd += ["--generate-from-image", image, "--width", str(PROFILE_DIE[0]), "--height", str(PROFILE_DIE[1])]
+    return {"mode": mode}, lambda: subprocess.run(cmd, check=True, stdout=subprocess.DEVNULL)
+
+def check_startup(budget_ms, repeats=5):
+    """
+    Check that importing modify_def loads none of HEAVY_MODULES and adds at
+    most budget_ms to a bare interpreter start (best of repeats).
+
+    Returns:
+        tuple: (ok, import_ms, heavy modules that were loaded)
+    """
+    probe = (f"import sys; sys.path.insert(0, {SCRIPTS_DIR!r}); import modify_def; "
+             f"print(','.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))")
+
+    def best(args):
+        times = []
+        for _ in range(repeats):
+            start = time.perf_counter()
+            out = subprocess.run([sys.executable] + args, check=True, capture_output=True, text=True).stdout
+            times.append(time.perf_counter() - start)
+        return min(times), out
+
+    bare, _ = best(["-c", "pass"])
+    loaded, out = best(["-c", probe])
+    import_ms = (loaded - bare) * 1000
+    heavy = [m for m in out.strip().split(",") if m]
+    return not heavy and import_ms <= budget_ms, import_ms, heavy
+
+def collect_cases(scale):
+    """(name, case function, argument tuple) for every benchmark at the given scale"""
+    grid = SCALES[scale]
+    cases = [("generate_def", case_generate_def, (v,)) for v in grid["generate_def"]]
+    cases += [("generate_def_sweep", case_generate_def_sweep, (v,)) for v in grid["generate_def_sweep"]]
+    cases += [("generate_new_diearea", case_generate_new_diearea, (v,)) for v in grid["generate_new_diearea"]]
+    cases += [("diearea_from_image", case_diearea_from_image, (v,)) for v in grid["diearea_from_image"]]
+    profiles = sorted(glob.glob(os.path.join(REPO_ROOT, "dataset", "sample_*", "*_modifier.sh")))
+    profiles.append(os.path.join(REPO_ROOT, "scripts", "default_modifier.sh"))
+    cases += [("variants", case_variants, (p, grid["variants"])) for p in profiles]
+    cases += [("startup", case_startup, (mode,)) for mode in ("diearea_line", "rectangles", "image")]
+    return cases
+
+# --- Running and Storing ---
+
+def time_call(fn, repeats):
+    """Wall-clock seconds of repeats calls to fn, with its console output suppressed"""
+    times = []
+    for _ in range(repeats):
+        with contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            fn()
+            times.append(time.perf_counter() - start)
+    return times
+
+def result_key(result):
+    """Identity of a result across runs: benchmark name and parameters"""
+    return result["name"] + json.dumps(result["params"], sort_keys=True)
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+def run_benchmarks(scale="quick", repeats=3, name_filter=None):
+    """
+    Run every benchmark at a scale in a temporary directory.
+
+    Returns:
+        dict: run metadata and a list of results with min/median/mean seconds
+    """
+    results = []
+    with tempfile.TemporaryDirectory(prefix="rzoo_bench_") as workdir:
+        for name, case, args in collect_cases(scale):
+            if name_filter and name_filter not in name:
+                continue
+            with contextlib.redirect_stdout(io.StringIO()):
+                params, fn = case(workdir, *args)
+            times = time_call(fn, repeats)
+            result = {"name": name, "params": params, "repeats": repeats, "min": min(times),
+                      "median": statistics.median(times), "mean": statistics.mean(times)}
+            print(f"{name:<22} {json.dumps(params, sort_keys=True):<48} min {result['min']:.4f} s  "
+                  f"median {result['median']:.4f} s")
+            results.append(result)
+    return {
+        "commit": git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "cpus": os.cpu_count(),
+        "scale": scale,
+        "results": results,
+    }
+
+def compare_runs(baseline, current, threshold):
+    """
+    Compare median times against a baseline run.
+
+    Returns:
+        list: (key, baseline median, current median, ratio) for results slower than threshold x baseline
+    """
+    base = {result_key(r): r for r in baseline["results"]}
+    regressions = []
+    for r in current["results"]:
+        old = base.get(result_key(r))
+        if old is None or old["median"] <= 0:
+            continue
+        ratio = r["median"] / old["median"]
+        print(f"{result_key(r):<70} {old['median']:.4f} s -> {r['median']:.4f} s  x{ratio:.2f}")
+        if ratio > threshold:
+            regressions.append((result_key(r), old["median"], r["median"], ratio))
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Time generate_def, modify_def, the image path and variant generation on synthetic inputs",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter
+    )
+    parser.add_argument("--scale", choices=sorted(SCALES), default="quick",
+                        help="Parameter grid; full covers 100 um - 20 mm dies, up to 1000 cutouts and 16k px images")
+    parser.add_argument("--repeats", type=int, default=3, help="Timed calls per benchmark (min/median/mean are kept)")
+    parser.add_argument("--filter", type=str, help="Only run benchmarks whose name contains this string")
+    parser.add_argument("--results-dir", type=str, default="bench_results",
+                        help="Directory receiving one <timestamp>_<commit>.json per run")
+    parser.add_argument("--compare", type=str, help="Baseline results JSON to compare median times against")
+    parser.add_argument("--threshold", type=float, default=1.2,
+                        help="With --compare, fail if a benchmark is slower than this factor x baseline")
+    parser.add_argument("--startup-budget-ms", type=float, default=STARTUP_BUDGET_MS,
+                        help="Fail if importing modify_def.py costs more than this over a bare interpreter, "
+                             "or loads OpenCV/NumPy")
+
+    args = parser.parse_args()
+    if args.repeats < 1:
+        parser.error("--repeats must be >= 1")
+
+    run = run_benchmarks(args.scale, args.repeats, args.filter)
+    ok, import_ms, heavy = check_startup(args.startup_budget_ms)
+    run["startup"] = {"import_ms": round(import_ms, 3), "budget_ms": args.startup_budget_ms, "heavy_modules": heavy}
+    print(f"modify_def import: {import_ms:.1f} ms (budget {args.startup_budget_ms:g} ms)"
+          + (f", loads {', '.join(heavy)}" if heavy else ""))
+    os.makedirs(args.results_dir, exist_ok=True)
+    out = os.path.join(args.results_dir, f"{run['timestamp'].replace(':', '')}_{run['commit']}.json")
+    with open(out, 'w', encoding='utf-8') as f:
+        json.dump(run, f, indent=2)
+    print(f"Results written to {out}")
+
+    if args.compare:
+        try:
+            with open(args.compare, 'r', encoding='utf-8') as f:
+                baseline = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Error: Could not read baseline {args.compare}: {e}")
+            sys.exit(1)
+        regressions = compare_runs(baseline, run, args.threshold)
+        for key, old, new, ratio in regressions:
+            print(f"Regression: {key} {old:.4f} s -> {new:.4f} s (x{ratio:.2f})")
+        if regressions:
+            sys.exit(1)
+
+    if not ok:
+        print("Error: modify_def.py startup is over budget")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
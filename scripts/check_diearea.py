@@ -0,0 +1,266 @@
+import argparse
+import bisect
+import glob
+import json
+import os
+import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from modify_def import locate_diearea, parse_diearea
+
+# --- DIEAREA Legality Checks ---
+
+DIEAREA_SYNTAX = re.compile(r'DIEAREA(\s*\(\s*-?\d+\s+-?\d+\s*\))+\s*;')
+
+def _issue(category, message):
+    return {"category": category, "message": message}
+
+def _edges(points):
+    """Closed-polygon edges as (index, (xa, ya), (xb, yb))"""
+    n = len(points)
+    return [(i, points[i], points[(i + 1) % n]) for i in range(n)]
+
+def _adjacent(i, j, n):
+    return (i - j) % n in (1, n - 1)
+
+def _collinear_overlaps(segments, n, category_name):
+    """
+    Overlapping or touching collinear edges that are not neighbours.
+
+    segments: (line, start, end, index) for edges on the same axis; compared
+    per line in start order against the three previous edges reaching furthest.
+    """
+    issues = []
+    segments.sort()
+    line = None
+    reach = []  # up to three (end, index) with the largest end on the current line
+    for seg_line, start, end, index in segments:
+        if seg_line != line:
+            line, reach = seg_line, []
+        for prev_end, prev_index in reach:
+            if prev_end >= start and not _adjacent(index, prev_index, n):
+                kind = "self_overlap" if prev_end > start else "self_touching"
+                issues.append(_issue(kind, f"{category_name} edges {prev_index} and {index} "
+                                           f"{'overlap' if kind == 'self_overlap' else 'touch'} on line {line}"))
+                break
+        reach.append((end, index))
+        reach = sorted(reach, reverse=True)[:3]
+    return issues
+
+def _crossings(horizontal, vertical, n):
+    """
+    Horizontal/vertical edge pairs that cross or touch, by a sweep over x.
+
+    Horizontal edges enter the active set (sorted by y) at their left end and
+    leave after their right end; each vertical edge queries the y range it spans.
+    """
+    events = []
+    for y, x0, x1, index in horizontal:
+        events.append((x0, 0, y, index))
+        events.append((x1, 2, y, index))
+    for x, y0, y1, index in vertical:
+        events.append((x, 1, (y0, y1), index))
+    events.sort(key=lambda e: (e[0], e[1]))
+
+    issues = []
+    h_by_index = {index: (y, x0, x1) for y, x0, x1, index in horizontal}
+    active = []
+    for x, kind, payload, index in events:
+        if kind == 0:
+            bisect.insort(active, (payload, index))
+        elif kind == 2:
+            del active[bisect.bisect_left(active, (payload, index))]
+        else:
+            y0, y1 = payload
+            lo = bisect.bisect_left(active, (y0, -1))
+            hi = bisect.bisect_right(active, (y1, n))
+            for y, h_index in active[lo:hi]:
+                if _adjacent(index, h_index, n):
+                    continue
+                _, hx0, hx1 = h_by_index[h_index]
+                if y0 < y < y1 and hx0 < x < hx1:
+                    issues.append(_issue("self_intersection",
+                                         f"edges {h_index} and {index} cross at ( {x} {y} )"))
+                else:
+                    issues.append(_issue("self_touching",
+                                         f"edges {h_index} and {index} touch at ( {x} {y} )"))
+                break
+    return issues
+
+def check_polygon(points):
+    """
+    Check a DIEAREA vertex list for legality.
+
+    A two-point DIEAREA is a rectangle and always legal if it has positive area.
+    Polygons are checked for closure, repeated and zero-length vertices,
+    rectilinearity, collinear edges, self-overlap/touch/intersection (an
+    O(n log n) sweep specialised for axis-parallel edges) and orientation.
+
+    Returns:
+        tuple: (violations, warnings), each a list of {"category", "message"}
+    """
+    points = [tuple(p) for p in points]
+    violations = []
+    warnings = []
+
+    if len(points) == 2:
+        (xa, ya), (xb, yb) = points
+        if xa == xb or ya == yb:
+            violations.append(_issue("zero_area", "DIEAREA rectangle has zero area"))
+        return violations, warnings
+
+    if len(points) > 1 and points[0] == points[-1]:
+        violations.append(_issue("repeated_closing_vertex",
+                                 f"first vertex ( {points[0][0]} {points[0][1]} ) is repeated as the last vertex"))
+        points = points[:-1]
+
+    collapsed = []
+    for i, p in enumerate(points):
+        if collapsed and p == collapsed[-1]:
+            violations.append(_issue("zero_length_edge", f"vertex {i} ( {p[0]} {p[1]} ) repeats the previous vertex"))
+        else:
+            collapsed.append(p)
+    if len(collapsed) > 1 and collapsed[0] == collapsed[-1]:
+        collapsed.pop()
+    points = collapsed
+
+    if len(points) < 4:
+        violations.append(_issue("too_few_vertices", f"polygon has {len(points)} distinct vertices, needs at least 4"))
+        return violations, warnings
+
+    seen = {}
+    for i, p in enumerate(points):
+        if p in seen:
+            violations.append(_issue("repeated_vertex",
+                                     f"vertex ( {p[0]} {p[1]} ) appears at positions {seen[p]} and {i}"))
+        else:
+            seen[p] = i
+
+    n = len(points)
+    horizontal = []
+    vertical = []
+    direction = []
+    for i, (xa, ya), (xb, yb) in _edges(points):
+        if ya == yb:
+            horizontal.append((ya, min(xa, xb), max(xa, xb), i))
+            direction.append((1 if xb > xa else -1, 0))
+        elif xa == xb:
+            vertical.append((xa, min(ya, yb), max(ya, yb), i))
+            direction.append((0, 1 if yb > ya else -1))
+        else:
+            violations.append(_issue("non_rectilinear", f"edge {i} ( {xa} {ya} ) - ( {xb} {yb} ) is diagonal"))
+            direction.append(None)
+
+    for i in range(n):
+        d_prev, d_next = direction[i - 1], direction[i]
+        if d_prev is None or d_next is None:
+            continue
+        if d_prev == d_next:
+            violations.append(_issue("collinear_edges", f"vertex {i} ( {points[i][0]} {points[i][1]} ) is collinear "
+                                                        "with its neighbours"))
+        elif d_prev == (-d_next[0], -d_next[1]):
+            violations.append(_issue("self_overlap", f"edges {(i - 1) % n} and {i} fold back on each other "
+                                                     f"at ( {points[i][0]} {points[i][1]} )"))
+
+    violations.extend(_collinear_overlaps([(y, x0, x1, i) for y, x0, x1, i in horizontal], n, "horizontal"))
+    violations.extend(_collinear_overlaps([(x, y0, y1, i) for x, y0, y1, i in vertical], n, "vertical"))
+    violations.extend(_crossings(horizontal, vertical, n))
+
+    area2 = sum(xa * yb - xb * ya for _, (xa, ya), (xb, yb) in _edges(points))
+    if area2 == 0:
+        violations.append(_issue("zero_area", "polygon has zero area"))
+    elif area2 > 0:
+        warnings.append(_issue("orientation", "vertices are counter-clockwise; the generators emit clockwise"))
+
+    return violations, warnings
+
+def check_def_file(def_file):
+    """
+    Check the DIEAREA of one DEF file; never raises.
+
+    Returns:
+        dict: file, legal, vertices, violations, warnings and seconds
+    """
+    start = time.perf_counter()
+    result = {"file": def_file, "legal": False, "vertices": 0, "violations": [], "warnings": []}
+    try:
+        _, _, statement = locate_diearea(def_file)
+        if not DIEAREA_SYNTAX.fullmatch(statement):
+            result["violations"].append(_issue("syntax", f"malformed DIEAREA statement: {statement[:200]}"))
+        else:
+            points = parse_diearea(statement)
+            result["vertices"] = len(points)
+            result["violations"], result["warnings"] = check_polygon(points)
+    except (OSError, ValueError) as e:
+        result["violations"].append(_issue("syntax", str(e)))
+    result["legal"] = not result["violations"]
+    result["seconds"] = round(time.perf_counter() - start, 6)
+    return result
+
+def collect_def_files(paths):
+    """Expand files, directories (*.def inside) and glob patterns into a sorted file list"""
+    files = []
+    for pattern in paths:
+        for path in ([pattern] if os.path.exists(pattern) else glob.glob(pattern)):
+            if os.path.isdir(path):
+                files.extend(os.path.join(path, name) for name in os.listdir(path) if name.endswith('.def'))
+            elif os.path.isfile(path):
+                files.append(path)
+    return sorted(set(files))
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Check DIEAREA legality of DEF files (rectilinear, simple, closed without repetition)",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter
+    )
+    parser.add_argument("paths", nargs="+", help="DEF files, directories or glob patterns")
+    parser.add_argument("-j", "--jobs", type=int, default=os.cpu_count(), help="Number of worker processes")
+    parser.add_argument("--report", type=str, help="Write the per-file results to this JSON file")
+    parser.add_argument("--verbose", action="store_true", help="Print every file, not only illegal ones")
+
+    args = parser.parse_args()
+    if args.jobs < 1:
+        parser.error("--jobs must be >= 1")
+
+    files = collect_def_files(args.paths)
+    if not files:
+        print("Error: No DEF files found")
+        sys.exit(1)
+
+    start = time.perf_counter()
+    if args.jobs == 1 or len(files) == 1:
+        results = [check_def_file(f) for f in files]
+    else:
+        with ProcessPoolExecutor(max_workers=args.jobs) as pool:
+            results = list(pool.map(check_def_file, files, chunksize=max(1, len(files) // (args.jobs * 4))))
+    elapsed = time.perf_counter() - start
+
+    for r in results:
+        if not r["legal"] or args.verbose:
+            categories = sorted({v["category"] for v in r["violations"]})
+            print(f"{'LEGAL' if r['legal'] else 'ILLEGAL'}: {r['file']}" + (f" ({', '.join(categories)})" if categories else ""))
+            if args.verbose:
+                for issue in r["violations"] + r["warnings"]:
+                    print(f"    [{issue['category']}] {issue['message']}")
+
+    legal = sum(r["legal"] for r in results)
+    rate = 100.0 * legal / len(results)
+    if args.report:
+        with open(args.report, 'w', encoding='utf-8') as f:
+            json.dump({
+                "total": len(results),
+                "legal": legal,
+                "illegal": len(results) - legal,
+                "legality_rate": round(rate, 2),
+                "seconds": round(elapsed, 3),
+                "files": results,
+            }, f, indent=2)
+
+    print(f"Legality rate: {rate:.0f}% ({legal}/{len(results)}) in {elapsed:.3f} s")
+    if legal != len(results):
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
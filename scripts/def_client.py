@@ -0,0 +1,127 @@
+import base64
+import json
+import os
+import socket
+import tempfile
+import threading
+
+# --- Client for def_server.py ---
+#
+# Keeps one connection to the resident server; every call is one request
+# line and one response line. Safe to share between threads (calls are
+# serialized); open one client per thread for parallel requests.
+# Standard library only, so callers need none of the server's dependencies.
+
+def default_socket_path():
+    """$XDG_RUNTIME_DIR/rzoo_def_server.sock, else a socket in a per-user directory under the temp dir"""
+    runtime_dir = os.environ.get("XDG_RUNTIME_DIR")
+    if runtime_dir:
+        return os.path.join(runtime_dir, "rzoo_def_server.sock")
+    user = os.getuid() if hasattr(os, "getuid") else os.environ.get("USERNAME", "user")
+    return os.path.join(tempfile.gettempdir(), f"rzoo-{user}", "def_server.sock")
+
+DEFAULT_SOCKET = default_socket_path()
+
+class DEFServiceError(Exception):
+    """The server answered a request with an error"""
+
+class DEFClient:
+    """Connection to a def_server.py Unix socket"""
+
+    def __init__(self, socket_path=DEFAULT_SOCKET, timeout=60):
+        self.socket_path = socket_path
+        self.timeout = timeout
+        self._sock = None
+        self._file = None
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._sock.close()
+            self._sock = self._file = None
+
+    def _connect(self):
+        self._sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self._sock.settimeout(self.timeout)
+        self._sock.connect(self.socket_path)
+        self._file = self._sock.makefile('rwb')
+
+    def call(self, op, **params):
+        """
+        Send one request and wait for its response.
+
+        Returns:
+            dict: The response fields
+
+        Raises:
+            DEFServiceError: If the server reports an error
+            OSError: If the server cannot be reached
+        """
+        request = dict(params, op=op)
+        line = json.dumps(request).encode() + b"\n"
+        with self._lock:
+            if self._file is None:
+                self._connect()
+            try:
+                self._file.write(line)
+                self._file.flush()
+                reply = self._file.readline()
+            except OSError:
+                self._file = self._sock = None
+                raise
+            if not reply:
+                self._file = self._sock = None
+                raise ConnectionError(f"Server at {self.socket_path} closed the connection")
+        response = json.loads(reply)
+        if not response.pop("ok", False):
+            raise DEFServiceError(response.get("error", "unknown error"))
+        return response
+
+    # --- Operations ---
+
+    def ping(self):
+        return self.call("ping")
+
+    def stats(self):
+        return self.call("stats")
+
+    def generate(self, width, height, output=None, **params):
+        """
+        DEF text for a width x height die; when output (relative to the
+        server's output root) is given, the file is written and its path returned
+        """
+        response = self.call("generate", width=width, height=height, output=output, **params)
+        return response.get("def", response.get("output"))
+
+    def modify(self, template, output=None, **params):
+        """
+        Template DEF with a new DIEAREA from coordinates, diearea or image;
+        template and image paths are relative to the server's input root
+        """
+        response = self.call("modify", template=template, output=output, **params)
+        return response.get("def", response.get("output"))
+
+    def validate(self, def_file=None, diearea=None):
+        """check_diearea result for a DEF file or a DIEAREA (line or points)"""
+        if def_file is not None:
+            return self.call("validate", def_file=def_file)
+        return self.call("validate", diearea=diearea)
+
+    def render(self, def_file=None, diearea=None, output=None, **params):
+        """PNG bytes of the floorplan plot, or the output path it was written to"""
+        if def_file is not None:
+            params["def_file"] = def_file
+        else:
+            params["diearea"] = diearea
+        response = self.call("render", output=output, **params)
+        if output:
+            return response["output"]
+        return base64.b64decode(response["png"])
@@ -0,0 +1,502 @@
+import argparse
+import base64
+import json
+import os
+import re
+import signal
+import socket
+import socketserver
+import stat
+import sys
+import threading
+import time
+from collections import Counter, OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from check_diearea import DIEAREA_SYNTAX, check_def_file, check_polygon
+from def_client import DEFAULT_SOCKET
+from generate_def import DEFGenerator
+from modify_def import (add_def_blockages, clip_def_rows, find_diearea, format_diearea, generate_cutout_diearea,
+                        generate_diearea_from_image, make_image_cache, parse_diearea)
+from rectilinear import polygon_points
+
+# --- Resident DEF Service ---
+#
+# One process keeps DEFGenerator instances, parsed template DEFs and the
+# OpenCV pipeline loaded, and answers JSON requests from many clients, so a
+# request costs milliseconds instead of a Python start plus imports.
+# Requests are {"op": name, ...parameters}; responses are {"ok": true, ...}
+# or {"ok": false, "error": message}. See def_client.py.
+
+MAX_REQUEST_BYTES = 64 << 20
+# Warm state is keyed by what clients ask for, so keep only the recently used entries
+MAX_GENERATORS = 4
+MAX_TEMPLATES = 32
+# DESIGN names end up inside the DEF text, so they must stay a single token
+DESIGN_NAME_PATTERN = re.compile(r'[^\s;]+')
+
+class DEFService:
+    """Warm state shared by all connections, and the request operations"""
+
+    def __init__(self, config_file=None, lef_cache_dir=None, image_cache_dir=None, image_cache_size_mb=256,
+                 output_root=None, input_root=None):
+        """
+        Args:
+            output_root (str): Directory every requested output path must stay
+                               inside (default: the current directory)
+            input_root (str): Directory every requested input path (template,
+                              image, def_file, config, lef) must stay inside
+                              (default: the current directory)
+        """
+        self.config_file = config_file
+        self.output_root = os.path.realpath(output_root or os.getcwd())
+        self.input_root = os.path.realpath(input_root or os.getcwd())
+        self.lef_cache_dir = lef_cache_dir
+        self.image_cache = make_image_cache(image_cache_dir, image_cache_size_mb)
+        self._lock = threading.Lock()
+        self._generators = OrderedDict()   # (config, lef files) -> DEFGenerator, least recently used first
+        self._templates = OrderedDict()    # path -> (mtime_ns, size, lines, diearea_index, corners)
+        self.started = time.time()
+        self.requests = Counter()
+        self.errors = Counter()
+        self.seconds = Counter()
+        self.ops = {"ping": self.op_ping, "stats": self.op_stats, "generate": self.op_generate,
+                    "modify": self.op_modify, "validate": self.op_validate, "render": self.op_render}
+
+    def warm(self):
+        """Load OpenCV and the renderer now rather than on the first request"""
+        import render_floorplan
+        self.generator()
+        return render_floorplan
+
+    # --- Warm State ---
+
+    def generator(self, config_file=None, lef_files=None):
+        """DEFGenerator for a config and LEF stack, built once per combination"""
+        key = (config_file or self.config_file, tuple(lef_files or ()))
+        generator = self._recall(self._generators, key)
+        if generator is None:
+            generator = DEFGenerator(key[0], list(key[1]) or None, self.lef_cache_dir)
+            generator = self._remember(self._generators, key, generator, MAX_GENERATORS)
+        return generator
+
+    def template(self, path):
+        """
+        Parsed template DEF, re-read only when the file changes.
+
+        Returns:
+            tuple: (lines, diearea_index, corners); lines must not be modified
+        """
+        info = os.stat(path)
+        key = os.path.realpath(path)
+        cached = self._recall(self._templates, key)
+        if cached is not None and cached[:2] == (info.st_mtime_ns, info.st_size):
+            return cached[2:]
+        with open(path, 'r', encoding='utf-8') as f:
+            lines = f.readlines()
+        diearea_index = find_diearea(lines)
+        if diearea_index == -1:
+            raise ValueError(f"DIEAREA line not found in {path}")
+        entry = (info.st_mtime_ns, info.st_size, lines, diearea_index, parse_diearea(lines[diearea_index]))
+        self._remember(self._templates, key, entry, MAX_TEMPLATES, replace=True)
+        return entry[2:]
+
+    def _recall(self, cache, key):
+        """Cached value for key (marked as just used), or None"""
+        with self._lock:
+            value = cache.get(key)
+            if value is not None:
+                cache.move_to_end(key)
+        return value
+
+    def _remember(self, cache, key, value, limit, replace=False):
+        """Store value unless another thread got there first, dropping the least recently used beyond limit"""
+        with self._lock:
+            if replace or key not in cache:
+                cache[key] = value
+            cache.move_to_end(key)
+            while len(cache) > limit:
+                cache.popitem(last=False)
+            return cache[key]
+
+    def output_path(self, output):
+        """Resolve a requested output path under output_root; None stays None"""
+        if not output:
+            return None
+        return _confine(self.output_root, output, "output")
+
+    def input_path(self, path, name):
+        """Resolve a requested input path (the request field name) under input_root; None stays None"""
+        if path is None:
+            return None
+        return _confine(self.input_root, path, name)
+
+    # --- Dispatch ---
+
+    def handle(self, request):
+        """Run one request; never raises"""
+        start = time.perf_counter()
+        op = request.get("op") if isinstance(request, dict) else None
+        try:
+            if op not in self.ops:
+                raise ValueError(f"Unknown op {op!r}; expected one of {', '.join(sorted(self.ops))}")
+            response = self.ops[op](request)
+            response["ok"] = True
+        except (KeyError, TypeError) as e:
+            response = {"ok": False, "error": f"Invalid {op} request: {e}"}
+        except (OSError, ValueError) as e:
+            response = {"ok": False, "error": str(e)}
+        except Exception as e:
+            response = {"ok": False, "error": f"{type(e).__name__}: {e}"}
+        seconds = time.perf_counter() - start
+        with self._lock:
+            self.requests[str(op)] += 1
+            self.seconds[str(op)] += seconds
+            if not response["ok"]:
+                self.errors[str(op)] += 1
+        response["seconds"] = round(seconds, 6)
+        return response
+
+    # --- Operations ---
+
+    def op_ping(self, request):
+        return {"pid": os.getpid()}
+
+    def op_stats(self, request):
+        with self._lock:
+            return {"uptime": round(time.time() - self.started, 3), "generators": len(self._generators),
+                    "templates": len(self._templates), "requests": dict(self.requests), "errors": dict(self.errors),
+                    "op_seconds": {op: round(s, 6) for op, s in self.seconds.items()}}
+
+    def op_generate(self, request):
+        """
+        DEFGenerator.build_def: width, height in DBU; optional design, diearea
+        (DIEAREA line or [[x, y], ...]), add_blockages, config, lef, output
+        """
+        design = request.get("design")
+        if design is not None and not (isinstance(design, str) and DESIGN_NAME_PATTERN.fullmatch(design)):
+            raise ValueError(f"design must be a name without whitespace or ';', got {design!r}")
+        output = self.output_path(request.get("output"))
+        lef = request.get("lef") or []
+        if not isinstance(lef, list):
+            raise ValueError(f"lef must be a list of paths, got {lef!r}")
+        generator = self.generator(self.input_path(request.get("config"), "config"),
+                                   [self.input_path(path, "lef") for path in lef])
+        die_points = _request_points(request.get("diearea"))
+        if die_points is not None:
+            die_points = polygon_points(die_points)
+        elif request.get("add_blockages"):
+            raise ValueError("add_blockages needs a diearea; a rectangular die has no notches to block")
+        text = generator.build_def(request["width"], request["height"], design, die_points,
+                                   request.get("add_blockages", False))
+        return _deliver(text, output)
+
+    def op_modify(self, request):
+        """
+        Apply a new DIEAREA to a template DEF: template plus one of coordinates
+        (cut-out corner pairs), diearea, or image with width and height;
+        optional clip_rows, row_height, add_blockages, origin_at_zero, output
+        """
+        output = self.output_path(request.get("output"))
+        lines, diearea_index, corners = self.template(self.input_path(request["template"], "template"))
+        if "coordinates" in request:
+            coordinates = request["coordinates"]
+            if len(coordinates) == 0 or len(coordinates) % 4 != 0:
+                raise ValueError(f"Coordinate count must be a positive multiple of 4, got {len(coordinates)}")
+            new_diearea = generate_cutout_diearea(corners, coordinates)
+        elif isinstance(request.get("diearea"), str):
+            new_diearea = request["diearea"].rstrip().rstrip(';').strip() + ' ;'
+        elif "diearea" in request:
+            new_diearea = format_diearea(_request_points(request["diearea"]))
+        elif "image" in request:
+            new_diearea = generate_diearea_from_image(self.input_path(request["image"], "image"),
+                                                      request["width"], request["height"],
+                                                      request.get("origin_at_zero", False), self.image_cache)
+            if new_diearea is None:
+                raise ValueError(f"Could not generate DIEAREA from image {request['image']}")
+        else:
+            raise ValueError("modify needs coordinates, diearea or image")
+
+        if request.get("clip_rows"):
+            lines = clip_def_rows(lines, new_diearea, request.get("row_height"))
+        if request.get("add_blockages"):
+            lines = add_def_blockages(lines, new_diearea)
+        if request.get("clip_rows") or request.get("add_blockages"):
+            diearea_index = find_diearea(lines)
+        text = "".join(lines[:diearea_index]) + new_diearea + "\n" + "".join(lines[diearea_index + 1:])
+        response = _deliver(text, output)
+        response["diearea"] = new_diearea
+        return response
+
+    def op_validate(self, request):
+        """check_diearea on a def_file, or on a diearea (line or points)"""
+        if "def_file" in request:
+            return check_def_file(self.input_path(request["def_file"], "def_file"))
+        diearea = request["diearea"]
+        result = {"legal": False, "vertices": 0, "violations": [], "warnings": []}
+        if isinstance(diearea, str) and not DIEAREA_SYNTAX.fullmatch(diearea.strip()):
+            result["violations"].append({"category": "syntax",
+                                         "message": f"malformed DIEAREA statement: {diearea[:200]}"})
+        else:
+            points = _request_points(diearea)
+            result["vertices"] = len(points)
+            result["violations"], result["warnings"] = check_polygon(points)
+        result["legal"] = not result["violations"]
+        return result
+
+    def op_render(self, request):
+        """
+        render_floorplan of a def_file (optional rows, tracks) or a bare diearea;
+        writes the PNG to output, else returns it base64-encoded as "png"
+        """
+        import cv2
+        from render_floorplan import PNG_PARAMS, read_floorplan, render_floorplan
+        output = self.output_path(request.get("output"))
+        if "def_file" in request:
+            plan = read_floorplan(self.input_path(request["def_file"], "def_file"), request.get("rows", False),
+                                  request.get("tracks", False))
+        else:
+            plan = {"points": polygon_points(_request_points(request["diearea"])), "rows": [],
+                    "tracks": {"X": [], "Y": []}}
+        img = render_floorplan(plan, request.get("size", 800), request.get("margin", 0))
+        if output:
+            if not cv2.imwrite(output, img, PNG_PARAMS):
+                raise OSError(f"could not write {output}")
+            return {"output": output, "width": img.shape[1], "height": img.shape[0]}
+        ok, png = cv2.imencode(".png", img, PNG_PARAMS)
+        if not ok:
+            raise ValueError("PNG encoding failed")
+        return {"png": base64.b64encode(png.tobytes()).decode("ascii"), "width": img.shape[1],
+                "height": img.shape[0]}
+
+def _confine(root, path, name):
+    """Resolve a client-supplied path under root, rejecting absolute paths, '..' and symlinks out of root"""
+    if not isinstance(path, str) or not path or os.path.isabs(path) or ".." in re.split(r'[\\/]', path):
+        raise ValueError(f"{name} must be a relative path without '..', got {path!r}")
+    resolved = os.path.realpath(os.path.join(root, path))
+    # realpath also follows symlinks that lead out of the root
+    if os.path.commonpath([root, resolved]) != root:
+        raise ValueError(f"{name} {path!r} leads outside its root")
+    return resolved
+
+def _request_points(diearea):
+    """DIEAREA line or [[x, y], ...] from a request as [(x, y)]; None stays None"""
+    if diearea is None:
+        return None
+    points = parse_diearea(diearea) if isinstance(diearea, str) else [(int(x), int(y)) for x, y in diearea]
+    if len(points) < 2:
+        raise ValueError("DIEAREA needs at least two points")
+    return points
+
+def _deliver(text, output):
+    """Write DEF text to output (resolved by output_path) when given, else return it in the response"""
+    if not output:
+        return {"def": text}
+    output_dir = os.path.dirname(output)
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        f.write(text)
+    return {"output": output, "bytes": len(text)}
+
+# --- Transports ---
+
+class UnixRequestHandler(socketserver.StreamRequestHandler):
+    """Newline-delimited JSON; a connection may send any number of requests"""
+
+    def handle(self):
+        while True:
+            line = self.rfile.readline(MAX_REQUEST_BYTES + 1)
+            if not line:
+                return
+            if len(line) > MAX_REQUEST_BYTES:
+                response = {"ok": False, "error": f"Request larger than {MAX_REQUEST_BYTES} bytes"}
+            else:
+                try:
+                    request = json.loads(line)
+                except ValueError as e:
+                    response = {"ok": False, "error": f"Invalid JSON: {e}"}
+                else:
+                    response = self.server.service.handle(request)
+            self.wfile.write(json.dumps(response).encode() + b"\n")
+            self.wfile.flush()
+
+def _private_socket_dir(path):
+    """Create the directory of the default socket path for this user only, and refuse one others can use"""
+    directory = os.path.dirname(path)
+    os.makedirs(directory, mode=0o700, exist_ok=True)
+    info = os.stat(directory)
+    if info.st_uid != os.getuid() or info.st_mode & 0o077:
+        raise OSError(f"{directory} must be owned by this user and not accessible to others")
+
+def _clear_stale_socket(path):
+    """Remove a socket left by a server that is gone; refuse to replace a live server or a non-socket file"""
+    try:
+        info = os.stat(path)
+    except FileNotFoundError:
+        return
+    if not stat.S_ISSOCK(info.st_mode):
+        raise OSError(f"{path} exists and is not a socket")
+    probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        probe.connect(path)
+    except ConnectionRefusedError:
+        os.remove(path)
+        return
+    finally:
+        probe.close()
+    raise OSError(f"another server is already listening on {path}")
+
+class UnixServer(socketserver.ThreadingUnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, path, service):
+        self.service = service
+        if path == DEFAULT_SOCKET and not os.environ.get("XDG_RUNTIME_DIR"):
+            _private_socket_dir(path)
+        _clear_stale_socket(path)
+        super().__init__(path, UnixRequestHandler)
+        os.chmod(path, 0o600)
+
+class HTTPRequestHandler(BaseHTTPRequestHandler):
+    """
+    POST /<op> with a JSON body; GET /stats and GET /ping.
+
+    Browsers can reach a local port too, so a request must name this server in
+    its Host header (against DNS rebinding) and a POST must be sent as
+    application/json, which a page can only do after a CORS preflight this
+    server never answers.
+    """
+    protocol_version = "HTTP/1.1"
+    READ_ONLY_OPS = ("ping", "stats")
+
+    def _respond(self, response, status=None):
+        body = json.dumps(response).encode()
+        self.send_response(status or (200 if response["ok"] else 400))
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _reject(self, status, error):
+        """Answer without reading the body, then drop the connection"""
+        self.close_connection = True
+        self._respond({"ok": False, "error": error}, status)
+
+    def _host_allowed(self):
+        if self.headers.get("Host", "").lower() in self.server.allowed_hosts:
+            return True
+        self._reject(403, "Host header does not name this server")
+        return False
+
+    def do_GET(self):
+        if not self._host_allowed():
+            return
+        op = self.path.strip("/")
+        if op not in self.READ_ONLY_OPS:
+            self._reject(405, f"GET serves {' and '.join(self.READ_ONLY_OPS)}; POST other requests")
+            return
+        self._respond(self.server.service.handle({"op": op}))
+
+    def do_POST(self):
+        if not self._host_allowed():
+            return
+        if self.headers.get_content_type() != "application/json":
+            self._reject(415, "Content-Type must be application/json")
+            return
+        try:
+            length = int(self.headers.get("Content-Length", ""))
+        except ValueError:
+            length = -1
+        if length < 0:
+            self._reject(400, "Content-Length must be a non-negative integer")
+            return
+        if length > MAX_REQUEST_BYTES:
+            self._reject(400, f"Request larger than {MAX_REQUEST_BYTES} bytes")
+            return
+        try:
+            request = json.loads(self.rfile.read(length) or b"{}")
+        except ValueError as e:
+            self._respond({"ok": False, "error": f"Invalid JSON: {e}"})
+            return
+        if isinstance(request, dict):
+            request["op"] = self.path.strip("/")
+        self._respond(self.server.service.handle(request))
+
+    def log_message(self, format, *args):
+        pass
+
+class HTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, service):
+        self.service = service
+        host, port = address
+        self.allowed_hosts = {f"{name}:{port}" for name in ("localhost", "127.0.0.1", "[::1]", host.lower())}
+        super().__init__(address, HTTPRequestHandler)
+
+def parse_address(text):
+    """HOST:PORT, or a bare PORT on localhost"""
+    host, _, port = text.rpartition(':')
+    try:
+        return host or "127.0.0.1", int(port)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected HOST:PORT, got {text!r}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve DEF generate/modify/validate/render requests from one "
+                                                 "resident process",
+                                     formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+    transport = parser.add_mutually_exclusive_group()
+    transport.add_argument("--socket", type=str, default=DEFAULT_SOCKET, help="Unix socket to listen on")
+    transport.add_argument("--http", type=parse_address, help="Listen for HTTP on HOST:PORT instead")
+    parser.add_argument("-c", "--config", type=str, help="Default DEFGenerator configuration file (JSON)")
+    parser.add_argument("--lef-cache-dir", type=str, help="Cache the parsed LEF files in this directory")
+    parser.add_argument("--image-cache-dir", type=str, help="Cache image outline results in this directory")
+    parser.add_argument("--image-cache-size-mb", type=float, default=256, help="Size bound of the image cache")
+    parser.add_argument("--preload", type=str, nargs="+", default=[], help="Template DEFs to parse at startup")
+    parser.add_argument("--input-root", type=str, default=".",
+                        help="Directory that requested input paths are relative to and must stay inside")
+    parser.add_argument("--output-root", type=str, default=".",
+                        help="Directory that requested output paths are relative to and must stay inside")
+    args = parser.parse_args()
+
+    for label, root in (("Input", args.input_root), ("Output", args.output_root)):
+        if not os.path.isdir(root):
+            print(f"Error: {label} root {root} is not a directory")
+            sys.exit(1)
+    service = DEFService(args.config, args.lef_cache_dir, args.image_cache_dir, args.image_cache_size_mb,
+                         args.output_root, args.input_root)
+    try:
+        service.warm()
+        for path in args.preload:
+            service.template(path)
+    except (OSError, ValueError) as e:
+        print(f"Error: Could not warm up the service: {str(e)}")
+        sys.exit(1)
+
+    try:
+        if args.http:
+            server = HTTPServer(args.http, service)
+            where = "http://%s:%d" % args.http
+        else:
+            server = UnixServer(args.socket, service)
+            where = args.socket
+    except OSError as e:
+        print(f"Error: Could not listen on {args.http or args.socket}: {str(e)}")
+        sys.exit(1)
+
+    print(f"Serving DEF requests on {where}")
+    # Leave through the finally below (removing the socket) on kill as on Ctrl-C
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if not args.http and os.path.exists(args.socket):
+            os.remove(args.socket)
+
+if __name__ == "__main__":
+    main()
@@ -1,19 +1,31 @@
 import argparse
+import csv
 import math
 import json
 import os
+import re
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+import instrumentation
+from lef_reader import merge_lefs, tech_config
+from netlist_reader import netlist_area, netlist_summary
+from rectilinear import blockage_section, clip_rows, notch_rects, polygon_points
 
 class DEFGenerator:
     """
     Improved DEF file generator with configurable parameters
     """
     
-    def __init__(self, config_file=None):
+    def __init__(self, config_file=None, lef_files=None, lef_cache_dir=None):
         """
         Initialize with default or custom configuration
         
         Args:
             config_file (str): Path to JSON configuration file
+            lef_files (list): LEF files or directories of them; their site, routing
+                              layers and macros replace the configured ones
+            lef_cache_dir (str): Directory caching the parsed LEF files (optional)
         """
         # Default configuration
         self.config = {
@@ -67,7 +79,9 @@ class DEFGenerator:
                 {"layer": "metal10", "direction": "Y", "start": 3340, "step": 3200}
             ],
             "track_adjustments": {
-                "add_one_layers": ["metal2", "metal4", "metal5", "metal6", "metal7", "metal8", "metal9", "metal10"]
+                "add_one_layers": ["metal2", "metal4", "metal5", "metal6", "metal7", "metal8", "metal9", "metal10"],
+                # Tracks derived from LEF start one pitch after the offset on these layers
+                "offset_plus_pitch_layers": ["metal7", "metal8", "metal9", "metal10"]
             }
         }
         
@@ -76,6 +90,14 @@ class DEFGenerator:
             if not os.path.exists(config_file):
                 raise FileNotFoundError(f"Configuration file not found: {config_file}")
             self.load_config(config_file)
+        if lef_files:
+            self.load_lef(lef_files, lef_cache_dir)
+    
+    def load_lef(self, lef_files, cache_dir=None):
+        """Take the core site, TRACKS and macro sizes from a LEF stack"""
+        adjustments = self.config["track_adjustments"].get("offset_plus_pitch_layers", [])
+        tech = tech_config(merge_lefs(lef_files, cache_dir), self.config["design"]["dbu_per_micron"], adjustments)
+        self._merge_config(self.config, tech)
     
     def load_config(self, config_file):
         """Load configuration from JSON file"""
@@ -143,8 +165,16 @@ class DEFGenerator:
         
         return True
     
-    def generate_rows(self, width_dbu, height_dbu):
-        """Generate ROW section with adaptive parameters"""
+    def generate_rows(self, width_dbu, height_dbu, die_points=None):
+        """
+        Generate ROW section with adaptive parameters
+
+        Args:
+            width_dbu (int): Die width in DBU
+            height_dbu (int): Die height in DBU
+            die_points (list): Optional rectilinear DIEAREA vertices; rows are
+                               split into the segments that lie inside it
+        """
         self.validate_die_size(width_dbu, height_dbu)
         
         left_margin, right_margin, bottom_margin, top_margin = self.calculate_margins(width_dbu, height_dbu)
@@ -159,13 +189,22 @@ class DEFGenerator:
         # Calculate rows
         available_height = height_dbu - bottom_margin - top_margin
         max_rows = math.floor(available_height / cell_height)
+
+        row_ys = [bottom_margin + row_index * cell_height for row_index in range(max_rows)]
+        if die_points is None:
+            segments = [[(left_margin, do_count)] for _ in row_ys]
+        else:
+            segments = clip_rows(die_points, [(left_margin, y, do_count, cell_width) for y in row_ys], cell_height)
         
         rows = []
-        for row_index in range(max_rows):
-            current_y = bottom_margin + row_index * cell_height
+        for row_index, current_y in enumerate(row_ys):
             orient = "N" if row_index % 2 == 0 else "FS"
-            row = f"ROW ROW_{row_index} {cell_name} {left_margin} {current_y} {orient} DO {do_count} BY 1 STEP {cell_width} 0 ;"
-            rows.append(row)
+            row_segments = segments[row_index]
+            for seg_index, (row_x, row_do) in enumerate(row_segments):
+                # Rows split by a notch get one ROW per segment
+                name = f"ROW_{row_index}" if len(row_segments) == 1 else f"ROW_{row_index}_{seg_index}"
+                row = f"ROW {name} {cell_name} {row_x} {current_y} {orient} DO {row_do} BY 1 STEP {cell_width} 0 ;"
+                rows.append(row)
         
         if len(rows) == 0:
             raise ValueError("Die size too small to accommodate any rows.")
@@ -193,7 +232,16 @@ class DEFGenerator:
         
         return tracks
     
-    def generate_def_file(self, die_width, die_height, output_file, design_name=None):
+    def routing_layers(self):
+        """Layer names of the tracks config, in order and without duplicates"""
+        return list(dict.fromkeys(track["layer"] for track in self.config["tracks"]))
+
+    def generate_blockages(self, die_points):
+        """Generate a BLOCKAGES section covering every notch of die_points on all routing layers"""
+        return blockage_section(notch_rects(die_points), self.routing_layers())
+
+    def generate_def_file(self, die_width, die_height, output_file, design_name=None, die_points=None,
+                          add_blockages=False):
         """
         Generate a .def file with adaptive parameters
         
@@ -202,6 +250,24 @@ class DEFGenerator:
             die_height (float): Height of the DIE in database units (DBU)
             output_file (str): Output .def file path
             design_name (str): Name of the design (optional)
+            die_points (list): Rectilinear DIEAREA vertices inside the
+                               width x height box (optional); rows are clipped to it
+            add_blockages (bool): Emit placement and routing blockages over the
+                                  notches of die_points
+        """
+        def_content = self.build_def(die_width, die_height, design_name, die_points, add_blockages)
+        
+        # Write to output file
+        with instrumentation.stage("write_def"), open(output_file, 'w') as f:
+            f.write(def_content)
+        print(f"DEF file generated: {output_file}")
+
+    def build_def(self, die_width, die_height, design_name=None, die_points=None, add_blockages=False):
+        """
+        Build the content of a .def file; generate_def_file without the write
+
+        Returns:
+            str: DEF text
         """
         width_dbu = int(die_width)
         height_dbu = int(die_height)
@@ -210,14 +276,28 @@ class DEFGenerator:
             design_name = self.config["design"]["name"]
         
         # Generate DIEAREA
-        die_area = f"( 0 0 ) ( {width_dbu} {height_dbu} )"
+        if die_points is None:
+            die_area = f"( 0 0 ) ( {width_dbu} {height_dbu} )"
+        else:
+            die_area = " ".join(f"( {x} {y} )" for x, y in die_points)
         
         # Generate sections
-        rows = self.generate_rows(width_dbu, height_dbu)
-        tracks = self.generate_tracks(width_dbu, height_dbu)
+        with instrumentation.stage("rows"):
+            rows = self.generate_rows(width_dbu, height_dbu, die_points)
+        with instrumentation.stage("tracks"):
+            tracks = self.generate_tracks(width_dbu, height_dbu)
+        instrumentation.count("rows", len(rows))
+        instrumentation.count("tracks", len(tracks))
         
         row_section = "\n".join(rows)
         tracks_section = "\n".join(tracks)
+
+        blockages_section = ""
+        if add_blockages and die_points is not None:
+            with instrumentation.stage("blockages"):
+                blockages = self.generate_blockages(die_points)
+            if blockages:
+                blockages_section = "\n".join(blockages) + "\n\n"
         
         # DEF file content
         def_content = f"""VERSION {self.config["design"]["version"]} ;
@@ -232,16 +312,275 @@ DIEAREA {die_area} ;
 COMPONENTS 0 ;
 END COMPONENTS
 
-NETS 0 ;
+{blockages_section}NETS 0 ;
 END NETS
 
 END DESIGN
 """
-        
-        # Write to output file
-        with open(output_file, 'w') as f:
-            f.write(def_content)
-        print(f"DEF file generated: {output_file}")
+        return def_content
+
+    # --- Sweeps ---
+
+    def die_for_utilization(self, cell_area_um2, utilization, aspect_ratio=1.0, macro_area_um2=0.0,
+                            notch_fraction=0.0, min_core=(0, 0)):
+        """
+        Smallest die whose rows hold cell_area_um2 at the given utilization
+
+        Args:
+            cell_area_um2 (float): Total standard-cell area in square microns
+            utilization (float): Target placement utilization (0 < u <= 1)
+            aspect_ratio (float): Core width / height
+            macro_area_um2 (float): Macro area added to the core as is
+            notch_fraction (float): Share of the core the planned notches will
+                                    remove (0 <= f < 1); the core grows to keep
+                                    the required area after cutting
+            min_core (tuple): Minimum core (width, height) in DBU, e.g. the largest macro
+
+        Returns:
+            tuple: (width_dbu, height_dbu)
+        """
+        if not 0 < utilization <= 1 or aspect_ratio <= 0:
+            raise ValueError(f"Invalid utilization {utilization} or aspect ratio {aspect_ratio}")
+        if not 0 <= notch_fraction < 1:
+            raise ValueError(f"Invalid notch fraction {notch_fraction}; use 0 <= f < 1")
+        dbu = self.config["design"]["dbu_per_micron"]
+        cell_width = self.config["cell_library"]["width"]
+        cell_height = self.config["cell_library"]["height"]
+        core_area = (cell_area_um2 / utilization + macro_area_um2) * dbu * dbu / (1 - notch_fraction)
+        core_height = math.ceil(max(math.sqrt(core_area / aspect_ratio), min_core[1]) / cell_height) * cell_height
+        core_width = math.ceil(max(core_area / core_height, min_core[0]) / cell_width) * cell_width
+
+        # Margins grow with the die, so settle them by fixed-point iteration
+        width, height = core_width, core_height
+        for _ in range(10):
+            left, right, bottom, top = self.calculate_margins(width, height)
+            new_width, new_height = core_width + left + right, core_height + bottom + top
+            if (new_width, new_height) == (width, height):
+                break
+            width, height = new_width, new_height
+        return width, height
+
+    def sweep_counts(self, widths, heights):
+        """
+        Margins, row and track counts for many rectangular dies in one vectorized pass
+
+        Args:
+            widths (list): Die widths in DBU
+            heights (list): Die heights in DBU (same length)
+
+        Returns:
+            dict: numpy arrays "left", "bottom", "do_count", "max_rows" and "valid"
+                  (one entry per die) and "track_do" (die x track)
+        """
+        import numpy as np
+
+        w = np.asarray(widths, dtype=np.int64)
+        h = np.asarray(heights, dtype=np.int64)
+        margins = self.config["margins"]
+        # Same float arithmetic as calculate_margins / generate_rows / generate_tracks
+        left = np.maximum((w * margins["left_percent"] / 100).astype(np.int64), margins["min_left"])
+        right = np.maximum((w * margins["right_percent"] / 100).astype(np.int64), margins["min_right"])
+        bottom = np.maximum((h * margins["bottom_percent"] / 100).astype(np.int64), margins["min_bottom"])
+        top = np.maximum((h * margins["top_percent"] / 100).astype(np.int64), margins["min_top"])
+        cell_width = self.config["cell_library"]["width"]
+        cell_height = self.config["cell_library"]["height"]
+        available_width = w - left - right
+        available_height = h - bottom - top
+
+        tracks = self.config["tracks"]
+        add_one = set(self.config["track_adjustments"]["add_one_layers"])
+        is_x = np.array([t["direction"] == "X" for t in tracks], dtype=bool)
+        start = np.array([t["start"] for t in tracks], dtype=np.int64)
+        step = np.array([t["step"] for t in tracks], dtype=np.int64)
+        extra = np.array([t["layer"] in add_one for t in tracks], dtype=np.int64)
+        dimension = np.where(is_x, w[:, None], h[:, None])
+
+        return {
+            "left": left,
+            "bottom": bottom,
+            "do_count": np.floor(available_width / cell_width).astype(np.int64),
+            "max_rows": np.floor(available_height / cell_height).astype(np.int64),
+            "valid": (available_width >= cell_width) & (available_height >= cell_height),
+            "track_do": np.floor((dimension - start) / step).astype(np.int64) + extra,
+        }
+
+    def generate_sweep(self, sizes, output_dir, design_name=None, jobs=8):
+        """
+        Write one rectangular DEF template per die size; each file is identical to
+        what generate_def_file writes for that size
+
+        Args:
+            sizes (list): (width_dbu, height_dbu, name) per template; name is the
+                          output file stem
+            output_dir (str): Directory receiving <name>.def
+            design_name (str): Name of the design (optional)
+            jobs (int): Writer threads
+
+        Returns:
+            tuple: (number of files written, list of (name, error) for skipped sizes)
+        """
+        if design_name is None:
+            design_name = self.config["design"]["name"]
+        os.makedirs(output_dir, exist_ok=True)
+
+        with instrumentation.stage("sweep_counts"):
+            counts = self.sweep_counts([s[0] for s in sizes], [s[1] for s in sizes])
+        left, bottom = counts["left"].tolist(), counts["bottom"].tolist()
+        do_count, max_rows = counts["do_count"].tolist(), counts["max_rows"].tolist()
+        track_do, valid = counts["track_do"].tolist(), counts["valid"].tolist()
+
+        cell_name = self.config["cell_library"]["name"]
+        cell_width = self.config["cell_library"]["width"]
+        cell_height = self.config["cell_library"]["height"]
+        header = (f'VERSION {self.config["design"]["version"]} ;\nDIVIDERCHAR "/" ;\nBUSBITCHARS "[]" ;\n'
+                  f'DESIGN {design_name} ;\nUNITS DISTANCE MICRONS {self.config["design"]["dbu_per_micron"]} ;\n')
+        footer = "\n\nCOMPONENTS 0 ;\nEND COMPONENTS\n\nNETS 0 ;\nEND NETS\n\nEND DESIGN\n"
+        # ROW name/site prefixes and TRACKS lines repeat across the grid,
+        # so each distinct one is formatted once
+        row_prefixes = [f"ROW ROW_{i} {cell_name} " for i in range(max(max_rows, default=0))]
+        track_fields = [(t["direction"], t["start"], t["step"], t["layer"]) for t in self.config["tracks"]]
+        track_lines = {}
+
+        def tracks_section(do_values):
+            lines = []
+            for (direction, start, step, layer), do in zip(track_fields, do_values):
+                line = track_lines.get((layer, direction, do))
+                if line is None:
+                    line = track_lines[(layer, direction, do)] = f"TRACKS {direction} {start} DO {do} STEP {step} LAYER {layer} ;"
+                lines.append(line)
+            return "\n".join(lines)
+
+        def render(k):
+            width, height, _ = sizes[k]
+            x, y0 = left[k], bottom[k]
+            n_suffix = f" N DO {do_count[k]} BY 1 STEP {cell_width} 0 ;"
+            fs_suffix = f" FS DO {do_count[k]} BY 1 STEP {cell_width} 0 ;"
+            rows = "\n".join(f"{row_prefixes[i]}{x} {y0 + i * cell_height}{fs_suffix if i % 2 else n_suffix}"
+                             for i in range(max_rows[k]))
+            return (f"{header}DIEAREA ( 0 0 ) ( {int(width)} {int(height)} ) ;\n{rows}\n"
+                    f"{tracks_section(track_do[k])}{footer}")
+
+        skipped = []
+        todo = []
+        for k, (width, height, name) in enumerate(sizes):
+            if valid[k] and max_rows[k] > 0:
+                todo.append(k)
+            else:
+                try:
+                    self.validate_die_size(int(width), int(height))
+                    skipped.append((name, "Die size too small to accommodate any rows."))
+                except ValueError as e:
+                    skipped.append((name, str(e)))
+
+        # Formatting holds the GIL, so it stays in this thread; the pool overlaps the writes
+        def write_text(k, text):
+            with open(os.path.join(output_dir, f"{sizes[k][2]}.def"), 'w') as f:
+                f.write(text)
+
+        with instrumentation.stage("sweep_write"), ThreadPoolExecutor(max_workers=max(jobs, 1)) as pool:
+            pending = []
+            for k in todo:
+                pending.append(pool.submit(write_text, k, render(k)))
+                # Bound the queued text to a few files per writer
+                if len(pending) >= 4 * max(jobs, 1):
+                    pending.pop(0).result()
+            for future in pending:
+                future.result()
+        instrumentation.count("templates_written", len(todo))
+        instrumentation.count("templates_skipped", len(skipped))
+        return len(todo), skipped
+
+def parse_sweep_values(text, kind=int):
+    """
+    Parse "start:stop:step" (stop inclusive) or a comma-separated list
+
+    Returns:
+        list: values converted with kind
+    """
+    if ":" in text:
+        parts = text.split(":")
+        if len(parts) != 3:
+            raise ValueError(f"Expected start:stop:step, got {text}")
+        start, stop, step = (kind(p) for p in parts)
+        if step <= 0 or stop < start:
+            raise ValueError(f"Empty range {text}")
+        count = int(math.floor((stop - start) / step + 1e-9)) + 1
+        return [kind(start + i * step) for i in range(count)]
+    return [kind(v) for v in text.split(",") if v.strip()]
+
+def read_sweep_csv(csv_file, design_name):
+    """
+    Read die sizes from a CSV with width and height columns (DBU) and an optional name column
+
+    Returns:
+        list: (width_dbu, height_dbu, name)
+    """
+    sizes = []
+    with open(csv_file, 'r', newline='') as f:
+        for row in csv.DictReader(f):
+            width, height = int(float(row["width"])), int(float(row["height"]))
+            sizes.append((width, height, row.get("name") or f"{design_name}_{width}x{height}"))
+    return sizes
+
+def netlist_requirements(parser, generator, args):
+    """
+    Cell area, macro area and minimum core size to place: from --netlist joined
+    with the --lef macros, with --cell-area overriding the standard-cell area
+
+    Returns:
+        tuple: (cell_area_um2, macro_area_um2, (min_core_width, min_core_height) in DBU)
+    """
+    if not args.netlist:
+        return args.cell_area, 0.0, (0, 0)
+    if "macros" not in generator.config:
+        parser.error("--netlist needs --lef for the cell and macro sizes")
+    try:
+        summary = netlist_summary(args.netlist, args.netlist_cache_dir)
+    except (OSError, ValueError) as e:
+        print(f"Error: Could not read netlist {args.netlist}: {e}")
+        sys.exit(1)
+    area = netlist_area(summary, generator.config["macros"], generator.config["design"]["dbu_per_micron"])
+    if area["unknown"]:
+        print(f"Warning: {len(area['unknown'])} masters not in the LEF files are ignored: "
+              f"{', '.join(area['unknown'][:5])}{' ...' if len(area['unknown']) > 5 else ''}")
+    print(f"Netlist {summary['top']}: {area['cell_instances']} cells ({area['cell_area']:.1f} um^2), "
+          f"{area['macro_instances']} macros ({area['macro_area']:.1f} um^2)")
+    cell_area = args.cell_area if args.cell_area else area["cell_area"]
+    return cell_area, area["macro_area"], area["largest_macro"]
+
+def run_sweep(parser, generator, args):
+    """Collect the sizes requested on the command line and write the sweep"""
+    design = args.design or generator.config["design"]["name"]
+    sizes = []
+    try:
+        if args.sweep_widths or args.sweep_heights:
+            if not (args.sweep_widths and args.sweep_heights):
+                parser.error("--sweep-widths and --sweep-heights are used together")
+            sizes += [(w, h, f"{design}_{w}x{h}") for w in parse_sweep_values(args.sweep_widths)
+                      for h in parse_sweep_values(args.sweep_heights)]
+        if args.sweep_csv:
+            sizes += read_sweep_csv(args.sweep_csv, design)
+        if args.cell_area or args.netlist:
+            if not args.utilizations:
+                parser.error("--cell-area and --netlist sweeps need --utilizations")
+            cell_area, macro_area, min_core = netlist_requirements(parser, generator, args)
+            for u in parse_sweep_values(args.utilizations, float):
+                for ar in parse_sweep_values(args.aspect_ratios, float):
+                    w, h = generator.die_for_utilization(cell_area, u, ar, macro_area, args.notch_fraction, min_core)
+                    sizes.append((w, h, f"{design}_u{u:g}_ar{ar:g}"))
+    except (OSError, KeyError, ValueError) as e:
+        print(f"Error: Invalid sweep: {e}")
+        sys.exit(1)
+
+    if args.profile:
+        instrumentation.configure(args.profile)
+    try:
+        written, skipped = generator.generate_sweep(sizes, args.output_dir, args.design, args.jobs)
+    finally:
+        instrumentation.flush("generate_def", output=args.output_dir)
+    for name, error in skipped:
+        print(f"Skipped {name}: {error}")
+    print(f"{written} DEF files generated in {args.output_dir}")
 
 def main():
     parser = argparse.ArgumentParser(description="Generate DEF file with configurable parameters")
@@ -251,23 +590,89 @@ def main():
     parser.add_argument("-d", "--design", type=str, help="Design name")
     parser.add_argument("-c", "--config", type=str, help="Configuration file (JSON)")
     parser.add_argument("--save-config", type=str, help="Save configuration template to file")
+    parser.add_argument("--lef", type=str, nargs="+",
+                        help="LEF files or directories (e.g. dataset/sample_tr/input_sources) providing the site, "
+                             "routing tracks and macro sizes")
+    parser.add_argument("--lef-cache-dir", type=str, help="Cache the parsed LEF files in this directory")
+    parser.add_argument("--diearea-line", type=str,
+                        help='Rectilinear DIEAREA to emit instead of the full rectangle; ROWs are clipped to it '
+                             '(e.g., "DIEAREA ( 0 0 ) ( 0 1000 ) ( 800 1000 ) ( 800 0 ) ;")')
+    parser.add_argument("--add-blockages", action="store_true",
+                        help="With --diearea-line, add placement and per-layer routing blockages over each notch")
+    parser.add_argument("--profile", type=str,
+                        help="Record per-stage wall time, allocations and counters to this file: JSON lines, or a "
+                             "Prometheus textfile if it ends in .prom (also enabled by RZOO_PROFILE)")
+    sizing = parser.add_argument_group("netlist sizing", "Size the die from a gate-level netlist instead of -w/-t")
+    sizing.add_argument("--netlist", type=str,
+                        help="Structural Verilog (e.g. input_sources/Ng45_tr.v); needs --lef for cell and macro areas")
+    sizing.add_argument("--netlist-cache-dir", type=str, help="Cache the per-netlist instance counts in this directory")
+    sizing.add_argument("--utilization", type=float, default=0.7, help="Target standard-cell utilization of the core")
+    sizing.add_argument("--aspect-ratio", type=float, default=1.0, help="Core width/height")
+    sizing.add_argument("--notch-fraction", type=float, default=0.0,
+                        help="Share of the core the planned notches will remove; the core grows to compensate")
+    sweep = parser.add_argument_group("sweep", "Write many rectangular templates in one process")
+    sweep.add_argument("--sweep-widths", type=str,
+                       help='Die widths in DBU: "start:stop:step" (stop inclusive) or "w1,w2,..."')
+    sweep.add_argument("--sweep-heights", type=str, help="Die heights in DBU, same forms as --sweep-widths")
+    sweep.add_argument("--sweep-csv", type=str, help="CSV of die sizes with width,height[,name] columns in DBU")
+    sweep.add_argument("--cell-area", type=float,
+                       help="Standard-cell area in um^2; with --utilizations, derive each die from it")
+    sweep.add_argument("--utilizations", type=str, help='Target utilizations, e.g. "0.5:0.8:0.1" or "0.6,0.7"')
+    sweep.add_argument("--aspect-ratios", type=str, default="1",
+                       help="Core width/height ratios combined with --utilizations")
+    sweep.add_argument("--output-dir", type=str, default="sweep_defs", help="Directory receiving <name>.def per die")
+    sweep.add_argument("-j", "--jobs", type=int, default=8, help="Writer threads")
     
     args = parser.parse_args()
+    if args.add_blockages and not args.diearea_line:
+        parser.error("--add-blockages needs --diearea-line; a rectangular die has no notches to block")
     
     # Create generator
-    generator = DEFGenerator(args.config)
+    try:
+        generator = DEFGenerator(args.config, args.lef, args.lef_cache_dir)
+    except (OSError, ValueError) as e:
+        print(f"Error: Could not load technology: {e}")
+        sys.exit(1)
     
     # Save configuration template if requested
     if args.save_config:
         generator.save_config_template(args.save_config)
         return
     
+    if args.sweep_widths or args.sweep_heights or args.sweep_csv or args.cell_area or args.utilizations:
+        run_sweep(parser, generator, args)
+        return
+
+    if args.netlist and not (args.width or args.height):
+        cell_area, macro_area, min_core = netlist_requirements(parser, generator, args)
+        try:
+            args.width, args.height = generator.die_for_utilization(cell_area, args.utilization, args.aspect_ratio,
+                                                                    macro_area, args.notch_fraction, min_core)
+        except ValueError as e:
+            parser.error(str(e))
+        print(f"Die for {args.utilization:g} utilization: {args.width} x {args.height} DBU")
+
     # Check required arguments for DEF generation
     if not args.width or not args.height:
         parser.error("Width (-w) and height (-t) are required for DEF generation")
     
+    die_points = None
+    if args.diearea_line:
+        die_points = [(int(x), int(y)) for x, y in re.findall(r'\(\s*(-?\d+)\s+(-?\d+)\s*\)', args.diearea_line)]
+        try:
+            die_points = polygon_points(die_points)
+        except ValueError as e:
+            parser.error(str(e))
+
+    if args.profile:
+        instrumentation.configure(args.profile)
+
     # Generate DEF file
-    generator.generate_def_file(args.width, args.height, args.output, args.design)
+    try:
+        generator.generate_def_file(args.width, args.height, args.output, args.design, die_points,
+                                    args.add_blockages)
+    finally:
+        instrumentation.flush("generate_def", output=args.output)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,204 @@
+import contextlib
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+
+# --- Opt-in Stage Timing and Counters ---
+#
+# Off unless configure() is called (the tools' --profile option) or
+# RZOO_PROFILE names an output file. Output ending in .prom is written as a
+# Prometheus textfile (cumulative across runs), anything else as JSON lines
+# (one record per run). While off, stage() and count() do no work.
+
+PROFILE_ENV = "RZOO_PROFILE"
+PROFILE_FORMAT_ENV = "RZOO_PROFILE_FORMAT"
+METRIC_PREFIX = "rzoo"
+
+class Recorder:
+    """Wall time, allocations and counters of one run, grouped by stage name"""
+
+    def __init__(self, path, fmt, trace_memory=True):
+        # Imported here so tools that never profile do not pay for it at startup
+        import tracemalloc
+        self._tracemalloc = tracemalloc
+        self.path = path
+        self.fmt = fmt
+        self.trace_memory = trace_memory
+        self.stages = {}
+        self.counters = {}
+        self._stack = []
+        if trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        start_mem = 0
+        if self.trace_memory:
+            start_mem, peak = self._tracemalloc.get_traced_memory()
+            if self._stack:
+                self._stack[-1][1] = max(self._stack[-1][1], peak)
+            self._tracemalloc.reset_peak()
+        frame = [start_mem, start_mem]
+        self._stack.append(frame)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - start
+            self._stack.pop()
+            entry = self.stages.setdefault(name, {"calls": 0, "seconds": 0.0, "alloc_bytes": 0, "peak_bytes": 0})
+            entry["calls"] += 1
+            entry["seconds"] += seconds
+            if self.trace_memory:
+                current, peak = self._tracemalloc.get_traced_memory()
+                frame[1] = max(frame[1], peak)
+                entry["alloc_bytes"] += max(current - start_mem, 0)
+                entry["peak_bytes"] = max(entry["peak_bytes"], frame[1] - start_mem)
+                # The enclosing stage saw at least this peak
+                if self._stack:
+                    self._stack[-1][1] = max(self._stack[-1][1], frame[1])
+
+    def count(self, name, value=1):
+        self.counters[name] = self.counters.get(name, 0) + value
+
+    def reset(self):
+        self.stages = {}
+        self.counters = {}
+
+    def flush(self, tool, **labels):
+        """Write the current run under tool/labels and start a new one; no-op if nothing was recorded"""
+        if not self.stages and not self.counters:
+            return
+        if self.fmt == "prometheus":
+            _merge_textfile(self.path, tool, self.stages, self.counters)
+        else:
+            import socket
+            record = {"tool": tool, "labels": labels, "host": socket.gethostname(), "pid": os.getpid(),
+                      "timestamp": round(time.time(), 3),
+                      "stages": {name: dict(entry, seconds=round(entry["seconds"], 6))
+                                 for name, entry in self.stages.items()},
+                      "counters": self.counters}
+            line = (json.dumps(record, sort_keys=True) + "\n").encode("utf-8")
+            # O_APPEND plus one write per record keeps lines whole across worker processes
+            fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+            try:
+                os.write(fd, line)
+            finally:
+                os.close(fd)
+        self.reset()
+
+# --- Prometheus Textfile ---
+
+SAMPLE_PATTERN = re.compile(r'^(\w+)\{(.*)\} (\S+)$')
+
+def _format_value(value):
+    value = float(value)
+    return str(int(value)) if value.is_integer() else repr(value)
+
+def _merge_textfile(path, tool, stages, counters):
+    """Add one run to the cumulative totals in a node_exporter textfile, under a lock"""
+    # POSIX only; imported here so the tools still import on other platforms
+    import fcntl
+
+    samples = {}
+    for name, entry in stages.items():
+        labels = f'tool="{tool}",stage="{name}"'
+        samples[(f"{METRIC_PREFIX}_stage_calls_total", labels)] = entry["calls"]
+        samples[(f"{METRIC_PREFIX}_stage_seconds_total", labels)] = entry["seconds"]
+        samples[(f"{METRIC_PREFIX}_stage_alloc_bytes_total", labels)] = entry["alloc_bytes"]
+    for name, value in counters.items():
+        samples[(f"{METRIC_PREFIX}_events_total", f'tool="{tool}",event="{name}"')] = value
+    samples[(f"{METRIC_PREFIX}_runs_total", f'tool="{tool}"')] = 1
+
+    with open(path + ".lock", "w") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                for line in f:
+                    m = SAMPLE_PATTERN.match(line.strip())
+                    if m:
+                        key = (m.group(1), m.group(2))
+                        samples[key] = samples.get(key, 0) + float(m.group(3))
+        except FileNotFoundError:
+            pass
+
+        out = []
+        for metric in sorted({metric for metric, _ in samples}):
+            out.append(f"# TYPE {metric} counter")
+            out.extend(f"{metric}{{{labels}}} {_format_value(value)}"
+                       for (m, labels), value in sorted(samples.items()) if m == metric)
+        # The collector may read at any time, so replace the file atomically
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write("\n".join(out) + "\n")
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+
+# --- Module-level Recorder ---
+
+_recorder = None
+_null_stage = contextlib.nullcontext()
+# Per thread, so one thread's suspended() does not hide what the others record
+_local = threading.local()
+
+def configure(path, fmt=None):
+    """
+    Start recording into path. fmt is "jsonl" or "prometheus"; by default
+    .prom files are Prometheus textfiles and everything else JSON lines.
+    The choice is exported to the environment so worker processes follow it.
+    """
+    global _recorder
+    if fmt is None:
+        fmt = "prometheus" if path.endswith(".prom") else "jsonl"
+    if fmt not in ("jsonl", "prometheus"):
+        raise ValueError(f"Unknown profile format {fmt}; use jsonl or prometheus")
+    os.environ[PROFILE_ENV] = path
+    os.environ[PROFILE_FORMAT_ENV] = fmt
+    _recorder = Recorder(path, fmt)
+    return _recorder
+
+def configure_from_env():
+    """Enable recording if RZOO_PROFILE is set (e.g. inherited by a worker process)"""
+    path = os.environ.get(PROFILE_ENV)
+    if path and _recorder is None:
+        configure(path, os.environ.get(PROFILE_FORMAT_ENV) or None)
+    return _recorder
+
+def enabled():
+    return _recorder is not None
+
+def stage(name):
+    """Context manager timing a named stage; free when profiling is off"""
+    if _recorder is None or getattr(_local, "suspended", 0):
+        return _null_stage
+    return _recorder.stage(name)
+
+def count(name, value=1):
+    """Add value to a named counter"""
+    if _recorder is not None and not getattr(_local, "suspended", 0):
+        _recorder.count(name, value)
+
+@contextlib.contextmanager
+def suspended():
+    """Record nothing from this thread inside the block, e.g. work that only rebuilds state"""
+    depth = getattr(_local, "suspended", 0)
+    _local.suspended = depth + 1
+    try:
+        yield
+    finally:
+        _local.suspended = depth
+
+def reset():
+    """Drop whatever was recorded so far (e.g. state inherited by a forked worker)"""
+    if _recorder is not None:
+        _recorder.reset()
+
+def flush(tool, **labels):
+    """Emit the recorded run (if profiling is on) and start a new one"""
+    if _recorder is not None:
+        _recorder.flush(tool, **labels)
+
+configure_from_env()
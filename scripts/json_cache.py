@@ -0,0 +1,121 @@
+import hashlib
+import json
+import os
+import tempfile
+
+# --- Content-Addressed JSON Cache ---
+
+class JsonCache:
+    """
+    On-disk cache of JSON values derived from input files (image outlines,
+    parsed LEFs, netlist summaries), keyed by file content and processing
+    parameters.
+
+    Each entry is a small JSON file named after its key. Reads refresh the
+    entry's modification time, and writes evict the least recently used
+    entries once the directory grows past max_bytes. Each consumer passes
+    its own namespace, a subdirectory with its own budget, so sharing one
+    cache directory never lets one kind of entry evict another.
+
+    The directory is scanned once, on the first write; later writes only add
+    to that running total, and a scan happens again only when it passes
+    max_bytes. Eviction then goes down to EVICT_TO of the budget, so the next
+    scan is many writes away. Entries written by other processes are counted
+    at this process's next scan.
+    """
+
+    # Fraction of max_bytes an eviction frees the cache down to
+    EVICT_TO = 0.9
+
+    def __init__(self, cache_dir, max_bytes=256 * 1024 * 1024, namespace=None):
+        """
+        Args:
+            cache_dir (str): Directory holding the cache entries (created if missing)
+            max_bytes (int): Total size the entries may occupy before eviction
+            namespace (str): Subdirectory of cache_dir for this kind of entry
+        """
+        if namespace:
+            cache_dir = os.path.join(cache_dir, namespace)
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self._total = None      # bytes in the directory as of the last scan plus later writes
+        os.makedirs(cache_dir, exist_ok=True)
+
+    @staticmethod
+    def key_for_file(path, params):
+        """sha256 over the file contents and the JSON-encoded processing parameters"""
+        h = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                h.update(chunk)
+        h.update(json.dumps(params, sort_keys=True).encode('utf-8'))
+        return h.hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def get(self, key):
+        """Return the cached value for key, or None on a miss or unreadable entry"""
+        path = self._path(key)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                value = json.load(f)
+            os.utime(path)
+        except (OSError, ValueError):
+            return None
+        return value
+
+    def put(self, key, value):
+        """Store a JSON-serializable value atomically, then evict if the cache outgrew max_bytes"""
+        if self._total is None:
+            self._total = self._scan()[1]
+        path = self._path(key)
+        try:
+            replaced = os.path.getsize(path)
+        except OSError:
+            replaced = 0
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(value, f, separators=(',', ':'))
+            size = os.path.getsize(tmp_path)
+            os.replace(tmp_path, path)
+        except OSError:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        self._total += size - replaced
+        if self._total > self.max_bytes:
+            self.evict(int(self.max_bytes * self.EVICT_TO))
+
+    def _scan(self):
+        """(entries as (mtime, size, path), total size) of the cache directory"""
+        entries = []
+        total = 0
+        with os.scandir(self.cache_dir) as it:
+            for entry in it:
+                if not entry.name.endswith('.json'):
+                    continue
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+                total += stat.st_size
+        return entries, total
+
+    def evict(self, target=None):
+        """Delete least recently used entries until the cache fits in target bytes (default max_bytes)"""
+        if target is None:
+            target = self.max_bytes
+        entries, total = self._scan()
+        entries.sort()
+        for _, size, path in entries:
+            if total <= target:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+        self._total = total
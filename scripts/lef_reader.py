@@ -0,0 +1,205 @@
+import glob
+import os
+from collections import Counter
+
+from json_cache import JsonCache
+
+# Bumped whenever parse_lef output changes; part of the cache key
+LEF_INDEX_VERSION = 1
+
+# --- LEF Parsing ---
+
+def _float_pair(values):
+    """LEF PITCH/OFFSET take one value or an x y pair"""
+    values = [float(v) for v in values]
+    return values if len(values) == 2 else values * 2
+
+def parse_lef(path):
+    """
+    Extract the floorplanning data of a LEF file in one pass.
+
+    Only what DEF generation needs is kept: the database units, SITE sizes,
+    routing layer pitches/offsets/directions and MACRO sizes. Pins, obstructions,
+    vias and rules are skipped.
+
+    Args:
+        path (str): LEF file
+
+    Returns:
+        dict: {"dbu_per_micron": int or None,
+               "sites": {name: {"class", "width", "height"}},
+               "layers": [{"name", "direction", "pitch": [x, y], "offset": [x, y] or None}],
+               "macros": {name: {"class", "width", "height", "site"}}},
+              sizes in microns, routing layers in file order
+    """
+    index = {"dbu_per_micron": None, "sites": {}, "layers": [], "macros": {}}
+    block = None        # ("LAYER" | "MACRO" | "SITE" | "UNITS", name, record)
+    depth = 0           # PIN/OBS/PORT nesting inside a MACRO
+
+    with open(path, 'r', encoding='utf-8', errors='replace') as f:
+        for line in f:
+            tokens = line.split('#', 1)[0].split()
+            if not tokens:
+                continue
+            keyword = tokens[0]
+
+            if block is None:
+                # Block headers carry no ';' (unlike "LAYER metal1 ;" inside a VIA)
+                if keyword in ("LAYER", "MACRO", "SITE") and len(tokens) >= 2 and ';' not in tokens:
+                    block = (keyword, tokens[1], {})
+                    depth = 0
+                elif keyword == "UNITS":
+                    block = ("UNITS", "UNITS", {})
+                continue
+
+            kind, name, record = block
+            if keyword == "END":
+                if depth:
+                    depth -= 1
+                    continue
+                if len(tokens) == 1 or tokens[1] != name:
+                    continue
+                if kind == "LAYER" and record.get("type") == "ROUTING" and "pitch" in record:
+                    index["layers"].append({"name": name, "direction": record.get("direction", "HORIZONTAL"),
+                                            "pitch": record["pitch"], "offset": record.get("offset")})
+                elif kind == "SITE" and "size" in record:
+                    index["sites"][name] = {"class": record.get("class"), "width": record["size"][0],
+                                            "height": record["size"][1]}
+                elif kind == "MACRO" and "size" in record:
+                    index["macros"][name] = {"class": record.get("class"), "width": record["size"][0],
+                                             "height": record["size"][1], "site": record.get("site")}
+                block = None
+                continue
+
+            if kind == "MACRO" and keyword in ("PIN", "OBS", "PORT"):
+                depth += 1
+                continue
+            if depth:
+                continue
+
+            args = [t for t in tokens[1:] if t != ';']
+            if kind == "UNITS":
+                if keyword == "DATABASE" and len(args) >= 2:
+                    index["dbu_per_micron"] = int(float(args[1]))
+            elif keyword == "TYPE" and args:
+                record["type"] = args[0]
+            elif keyword == "DIRECTION" and args:
+                record["direction"] = args[0]
+            elif keyword == "PITCH" and args:
+                record["pitch"] = _float_pair(args)
+            elif keyword == "OFFSET" and args:
+                record["offset"] = _float_pair(args)
+            elif keyword == "CLASS" and args:
+                record["class"] = args[0].upper()
+            elif keyword == "SIZE" and len(args) >= 3:
+                record["size"] = [float(args[0]), float(args[2])]
+            elif keyword == "SITE" and args:
+                record["site"] = args[0]
+    return index
+
+def lef_files(paths):
+    """Expand directories (e.g. a design's input_sources/) to the .lef files they hold"""
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files.extend(sorted(glob.glob(os.path.join(path, "*.lef"))))
+        else:
+            files.append(path)
+    return files
+
+# --- Cached Index ---
+
+_parsed = {}
+
+def load_lef(path, cache=None):
+    """
+    parse_lef with a per-process memo and an optional on-disk JsonCache keyed
+    by the file content, so batch jobs sharing a cell LEF parse it once.
+    """
+    stat = os.stat(path)
+    memo_key = (os.path.abspath(path), stat.st_mtime_ns, stat.st_size)
+    if memo_key in _parsed:
+        return _parsed[memo_key]
+
+    key = None
+    index = None
+    if cache is not None:
+        key = cache.key_for_file(path, {"lef_index": LEF_INDEX_VERSION})
+        index = cache.get(key)
+    if index is None:
+        index = parse_lef(path)
+        if cache is not None:
+            try:
+                cache.put(key, index)
+            except OSError as e:
+                print(f"Warning: Could not write LEF cache entry: {str(e)}")
+    _parsed[memo_key] = index
+    return index
+
+def merge_lefs(paths, cache_dir=None):
+    """
+    Parse a LEF stack (tech LEF, cell LEF, macro LEFs) into one index.
+
+    Later files add sites, layers and macros; the first database units win.
+    """
+    cache = JsonCache(cache_dir, namespace="lef") if cache_dir else None
+    merged = {"dbu_per_micron": None, "sites": {}, "layers": [], "macros": {}}
+    for path in lef_files(paths):
+        index = load_lef(path, cache)
+        if merged["dbu_per_micron"] is None:
+            merged["dbu_per_micron"] = index["dbu_per_micron"]
+        merged["sites"].update(index["sites"])
+        known = {layer["name"] for layer in merged["layers"]}
+        merged["layers"].extend(layer for layer in index["layers"] if layer["name"] not in known)
+        merged["macros"].update(index["macros"])
+    return merged
+
+# --- Generator Configuration ---
+
+def core_site(index):
+    """The site most CORE macros sit on, else the first site of class CORE"""
+    used = Counter(m["site"] for m in index["macros"].values()
+                   if m["site"] in index["sites"] and (m["class"] or "").startswith("CORE"))
+    if used:
+        return used.most_common(1)[0][0]
+    for name, site in index["sites"].items():
+        if (site["class"] or "").upper() == "CORE":
+            return name
+    raise ValueError("No core SITE found in the LEF files")
+
+def tech_config(index, dbu_per_micron=2000, offset_plus_pitch_layers=()):
+    """
+    DEFGenerator config entries derived from a merged LEF index.
+
+    Every routing layer gets an X and a Y TRACKS entry with the layer pitch as
+    step and its offset (half a pitch if unset) as start. Layers named in
+    offset_plus_pitch_layers start one pitch later.
+
+    Returns:
+        dict: "design" (dbu_per_micron), "cell_library", "tracks" and "macros"
+              (name -> {"class", "width", "height"} in DBU)
+    """
+    dbu = index["dbu_per_micron"] or dbu_per_micron
+
+    def to_dbu(microns):
+        return int(round(microns * dbu))
+
+    site_name = core_site(index)
+    site = index["sites"][site_name]
+    tracks = []
+    for layer in index["layers"]:
+        offset = layer["offset"] or [p / 2 for p in layer["pitch"]]
+        for axis, direction in enumerate(("X", "Y")):
+            step = to_dbu(layer["pitch"][axis])
+            start = to_dbu(offset[axis])
+            if layer["name"] in offset_plus_pitch_layers:
+                start += step
+            tracks.append({"layer": layer["name"], "direction": direction, "start": start, "step": step})
+
+    return {
+        "design": {"dbu_per_micron": dbu},
+        "cell_library": {"name": site_name, "width": to_dbu(site["width"]), "height": to_dbu(site["height"])},
+        "tracks": tracks,
+        "macros": {name: {"class": m["class"], "width": to_dbu(m["width"]), "height": to_dbu(m["height"])}
+                   for name, m in index["macros"].items()},
+    }
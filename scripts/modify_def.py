@@ -1,32 +1,59 @@
 import argparse
+import csv
+import glob
+import json
+import math
+import mmap
+import os
 import re
 import sys
-import cv2
-import numpy as np
+import tempfile
+import time
+
+import instrumentation
+from json_cache import JsonCache
+from rectilinear import blockage_section, clip_rows, notch_rects, subtract_rectangles
 
 # --- OpenCV-based Image Processing Functions ---
+# cv2 and numpy are imported inside the image functions, so the DEF-only
+# modes start without loading them.
 
 def merge_close_coords(coords, tolerance):
     """
     Merges close coordinate values into a single average value.
     """
-    if not coords:
+    import numpy as np
+    coords = np.sort(np.asarray(coords, dtype=float))
+    if coords.size == 0:
         return []
-        
-    coords.sort()
-    
-    merged_coords = []
-    current_group = [coords[0]]
-    
-    for i in range(1, len(coords)):
-        if coords[i] - current_group[-1] < tolerance:
-            current_group.append(coords[i])
-        else:
-            merged_coords.append(int(round(np.mean(current_group))))
-            current_group = [coords[i]]
-            
-    merged_coords.append(int(round(np.mean(current_group))))
-    return merged_coords
+
+    # A new group starts wherever the gap to the previous sorted value reaches the tolerance
+    starts = np.concatenate(([0], np.flatnonzero(np.diff(coords) >= tolerance) + 1))
+    ends = np.append(starts[1:], coords.size)
+    return [int(round(np.mean(coords[s:e]))) for s, e in zip(starts, ends)]
+
+def snap_to_nearest(values, grid):
+    """
+    Snap every value to its nearest entry of the sorted grid; ties go to the lower entry.
+    """
+    import numpy as np
+    grid = np.asarray(grid)
+    upper = np.clip(np.searchsorted(grid, values), 0, len(grid) - 1)
+    lower = np.maximum(upper - 1, 0)
+    use_lower = np.abs(grid[lower] - values) <= np.abs(grid[upper] - values)
+    return np.where(use_lower, grid[lower], grid[upper])
+
+def corner_mask(points, tolerance):
+    """
+    True for the points of a closed polyline whose turn (cross product with
+    both neighbours) exceeds tolerance in absolute value.
+    """
+    import numpy as np
+    points = np.asarray(points, dtype=np.int64)
+    vec1 = points - np.roll(points, 1, axis=0)
+    vec2 = np.roll(points, -1, axis=0) - points
+    cross = vec1[:, 0] * vec2[:, 1] - vec1[:, 1] * vec2[:, 0]
+    return np.abs(cross) > tolerance
 
 def simplify_polygon(points):
     """
@@ -34,31 +61,101 @@ def simplify_polygon(points):
     """
     if len(points) < 3:
         return points
-    
-    simplified_points = []
-    for i in range(len(points)):
-        p_prev = points[(i - 1 + len(points)) % len(points)]
-        p_curr = points[i]
-        p_next = points[(i + 1) % len(points)]
-        
-        # Use cross-product to check for collinearity
-        vec1_x, vec1_y = p_curr[0] - p_prev[0], p_curr[1] - p_prev[1]
-        vec2_x, vec2_y = p_next[0] - p_curr[0], p_next[1] - p_curr[1]
-        
-        cross_product = vec1_x * vec2_y - vec1_y * vec2_x
-        
-        # If the cross-product is very close to 0, the three points are collinear.
-        # Tolerance can be adjusted as needed.
-        if abs(cross_product) > 1:
-            simplified_points.append(p_curr)
-            
-    return simplified_points
 
-def generate_diearea_from_image(image_path, target_width, target_height, origin_at_zero=False):
+    # If the cross-product is very close to 0, the three points are collinear.
+    # Tolerance can be adjusted as needed.
+    n = len(points)
+    simplified = []
+    for i, (x, y) in enumerate(points):
+        px, py = points[i - 1]
+        nx, ny = points[(i + 1) % n]
+        if abs((x - px) * (ny - y) - (y - py) * (nx - x)) > 1:
+            simplified.append(points[i])
+    instrumentation.count("simplify_vertices_in", len(points))
+    instrumentation.count("simplify_vertices_out", len(simplified))
+    return simplified
+
+def outline_corner_pixels(contour):
     """
-    Processes an image to generate a DIEAREA line based on its non-red outline.
+    Pixel coordinates (N x 2) of the corners of a CHAIN_APPROX_NONE contour,
+    i.e. the points where the cross product with both neighbours is non-zero.
+    """
+    import numpy as np
+    pixels = np.asarray(contour).reshape(-1, 2)
+    if len(pixels) == 0:
+        return pixels
+    return pixels[corner_mask(pixels, 0.001)]
+
+def corner_pixels_to_points(corners, img_width_px, img_height_px, target_width, target_height, origin_at_zero=False):
+    """
+    Scale, snap and simplify pixel-space corners into the clockwise DIEAREA
+    vertex list in target units. Returns None if there are no corners.
+    """
+    import numpy as np
+    corners = np.asarray(corners).reshape(-1, 2)
+
+    # Scale physical coordinates
+    scale_x = target_width / img_width_px
+    scale_y = target_height / img_height_px
+    physical = np.column_stack((corners[:, 0] * scale_x, (img_height_px - corners[:, 1]) * scale_y))
+
+    # Avoid adding consecutive duplicate points
+    if len(physical) > 1:
+        physical = physical[np.concatenate(([True], np.any(physical[1:] != physical[:-1], axis=1)))]
+    if len(physical) == 0:
+        return None
+
+    # Snap points to a grid; tolerance based on physical scale (e.g., 5 pixels)
+    snap_x = merge_close_coords(physical[:, 0], scale_x * 5)
+    snap_y = merge_close_coords(physical[:, 1], scale_y * 5)
+    snapped = np.column_stack((snap_to_nearest(physical[:, 0], snap_x), snap_to_nearest(physical[:, 1], snap_y)))
+
+    # Remove duplicate points while preserving order
+    _, first_index = np.unique(snapped, axis=0, return_index=True)
+    snapped = snapped[np.sort(first_index)]
+
+    # Simplify the polygon by removing collinear points
+    if len(snapped) >= 3:
+        instrumentation.count("simplify_vertices_in", len(snapped))
+        snapped = snapped[corner_mask(snapped, 1)]
+        instrumentation.count("simplify_vertices_out", len(snapped))
+
+    # Shift origin to (0,0) if requested
+    if origin_at_zero and len(snapped):
+        snapped = snapped - snapped.min(axis=0)
+
+    # Ensure contour is clockwise
+    following = np.roll(snapped, -1, axis=0)
+    if np.sum(snapped[:, 0] * following[:, 1] - following[:, 0] * snapped[:, 1]) > 0:
+        snapped = snapped[::-1]
+
+    return [(int(x), int(y)) for x, y in snapped]
+
+def contour_corner_points(contour, img_width_px, img_height_px, target_width, target_height, origin_at_zero=False):
+    """
+    Turn a CHAIN_APPROX_NONE contour (N x 1 x 2 pixel array) into the snapped,
+    clockwise DIEAREA vertex list in target units. Returns None if the contour has no corners.
+    """
+    return corner_pixels_to_points(outline_corner_pixels(contour), img_width_px, img_height_px,
+                                   target_width, target_height, origin_at_zero)
+
+# Red (keep-out) hue ranges in OpenCV HSV and the morphology kernel size; part of the cache key
+RED_HSV_RANGES = [([0, 100, 100], [10, 255, 255]), ([160, 100, 100], [180, 255, 255])]
+MORPH_KERNEL_SIZE = 5
+IMAGE_PIPELINE_PARAMS = {'version': 1, 'red_hsv_ranges': RED_HSV_RANGES, 'kernel': MORPH_KERNEL_SIZE}
+
+def extract_outline_corners(image_path):
     """
-    img = cv2.imread(image_path, cv2.IMREAD_COLOR)
+    Run the OpenCV part of the image pipeline on an outline image.
+
+    Returns:
+        tuple: (corners, img_width_px, img_height_px) with the pixel-space corners
+               of the largest non-red contour, or None (after printing an error)
+    """
+    import cv2
+    import numpy as np
+    with instrumentation.stage("imread"):
+        img = cv2.imread(image_path, cv2.IMREAD_COLOR)
     if img is None:
         print(f"Error: Could not read image file {image_path}")
         return None
@@ -66,101 +163,70 @@ def generate_diearea_from_image(image_path, target_width, target_height, origin_
     img_height_px, img_width_px = img.shape[:2]
     
     # Pre-processing to find the non-red area
-    hsv = cv2.cvtColor(img, cv2.COLOR_BGR2HSV)
-    lower_red1 = np.array([0, 100, 100])
-    upper_red1 = np.array([10, 255, 255])
-    lower_red2 = np.array([160, 100, 100])
-    upper_red2 = np.array([180, 255, 255])
-    mask1 = cv2.inRange(hsv, lower_red1, upper_red1)
-    mask2 = cv2.inRange(hsv, lower_red2, upper_red2)
-    mask = cv2.bitwise_or(mask1, mask2)
-    die_area_mask = cv2.bitwise_not(mask)
+    with instrumentation.stage("threshold"):
+        hsv = cv2.cvtColor(img, cv2.COLOR_BGR2HSV)
+        mask = None
+        for lower_red, upper_red in RED_HSV_RANGES:
+            red = cv2.inRange(hsv, np.array(lower_red), np.array(upper_red))
+            mask = red if mask is None else cv2.bitwise_or(mask, red)
+        die_area_mask = cv2.bitwise_not(mask)
     
     # Morphological operations to clean up the mask
-    kernel = np.ones((5, 5), np.uint8)
-    die_area_mask = cv2.erode(die_area_mask, kernel, iterations=1)
-    die_area_mask = cv2.dilate(die_area_mask, kernel, iterations=1)
+    with instrumentation.stage("morphology"):
+        kernel = np.ones((MORPH_KERNEL_SIZE, MORPH_KERNEL_SIZE), np.uint8)
+        die_area_mask = cv2.erode(die_area_mask, kernel, iterations=1)
+        die_area_mask = cv2.dilate(die_area_mask, kernel, iterations=1)
     
     # Find contours
-    contours, _ = cv2.findContours(die_area_mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_NONE)
+    with instrumentation.stage("contours"):
+        contours, _ = cv2.findContours(die_area_mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_NONE)
     if not contours:
         print("Error: No contours found in the image.")
         return None
     
-    main_contour = max(contours, key=cv2.contourArea)
-    
-    # Scale physical coordinates
-    scale_x = target_width / img_width_px
-    scale_y = target_height / img_height_px
-    
-    physical_points_list = []
-    if len(main_contour) > 0:
-        p_prev = main_contour[-1][0]
-    for i in range(len(main_contour)):
-        p_curr = main_contour[i][0]
-        p_next = main_contour[(i + 1) % len(main_contour)][0]
-        
-        # Filter for corner points using cross-product
-        vec1_x, vec1_y = p_curr[0] - p_prev[0], p_curr[1] - p_prev[1]
-        vec2_x, vec2_y = p_next[0] - p_curr[0], p_next[1] - p_curr[1]
-        
-        if abs(vec1_x * vec2_y - vec1_y * vec2_x) > 0.001:
-            x_phy = p_curr[0] * scale_x
-            y_phy = (img_height_px - p_curr[1]) * scale_y
-            
-            # Avoid adding duplicate points
-            if not physical_points_list or (x_phy, y_phy) != physical_points_list[-1]:
-                 physical_points_list.append((x_phy, y_phy))
-        p_prev = p_curr
-
-    # Snap points to a grid
-    if not physical_points_list:
-        print("Error: No corner points found.")
-        return None
-        
-    x_coords = [p[0] for p in physical_points_list]
-    y_coords = [p[1] for p in physical_points_list]
-    
-    # Tolerance based on physical scale (e.g., 5 pixels)
-    tolerance_x = scale_x * 5
-    tolerance_y = scale_y * 5
-    
-    snap_x = merge_close_coords(x_coords, tolerance_x)
-    snap_y = merge_close_coords(y_coords, tolerance_y)
-    
-    final_points_list = []
-    for x_raw, y_raw in physical_points_list:
-        closest_x = min(snap_x, key=lambda val: abs(val - x_raw))
-        closest_y = min(snap_y, key=lambda val: abs(val - y_raw))
-        final_points_list.append((closest_x, closest_y))
-    
-    # Remove duplicate points while preserving order
-    seen_points = set()
-    unique_points = []
-    for p in final_points_list:
-        if p not in seen_points:
-            unique_points.append(p)
-            seen_points.add(p)
-    final_points_list = unique_points
-
-    # Simplify the polygon by removing collinear points
-    final_points_list = simplify_polygon(final_points_list)
+    with instrumentation.stage("contour_walk"):
+        main_contour = max(contours, key=cv2.contourArea)
+        corners = outline_corner_pixels(main_contour)
+    instrumentation.count("contour_points", len(main_contour))
+    return corners, img_width_px, img_height_px
 
-    # Shift origin to (0,0) if requested
-    if origin_at_zero:
-        min_x = min(p[0] for p in final_points_list)
-        min_y = min(p[1] for p in final_points_list)
-        final_points_list = [(p[0] - min_x, p[1] - min_y) for p in final_points_list]
+def generate_diearea_from_image(image_path, target_width, target_height, origin_at_zero=False, cache=None):
+    """
+    Processes an image to generate a DIEAREA line based on its non-red outline.
 
-    # Ensure contour is clockwise
-    area_sum = 0.0
-    for i in range(len(final_points_list)):
-        p1 = final_points_list[i]
-        p2 = final_points_list[(i + 1) % len(final_points_list)]
-        area_sum += (p1[0] * p2[1] - p2[0] * p1[1])
-        
-    if area_sum > 0:
-        final_points_list.reverse()
+    With a JsonCache, the pixel-space corners are looked up by image content
+    first, so a cached outline is rescaled without running OpenCV.
+    """
+    import numpy as np
+    extracted = None
+    if cache is not None:
+        try:
+            key = cache.key_for_file(image_path, IMAGE_PIPELINE_PARAMS)
+        except OSError:
+            key = None
+        entry = cache.get(key) if key else None
+        instrumentation.count("image_cache_hits" if entry is not None else "image_cache_misses")
+        if entry is not None:
+            extracted = (np.array(entry['corners'], dtype=np.int64).reshape(-1, 2), entry['width'], entry['height'])
+
+    if extracted is None:
+        extracted = extract_outline_corners(image_path)
+        if extracted is None:
+            return None
+        if cache is not None and key:
+            corners, img_width_px, img_height_px = extracted
+            try:
+                cache.put(key, {'corners': corners.tolist(), 'width': img_width_px, 'height': img_height_px})
+            except OSError as e:
+                print(f"Warning: Could not write outline cache entry: {str(e)}")
+
+    corners, img_width_px, img_height_px = extracted
+    with instrumentation.stage("snap"):
+        final_points_list = corner_pixels_to_points(corners, img_width_px, img_height_px,
+                                                    target_width, target_height, origin_at_zero)
+    if final_points_list is None:
+        print("Error: No corner points found.")
+        return None
         
     # Format the final DIEAREA string
     die_area_str = "DIEAREA "
@@ -195,8 +261,7 @@ def parse_arguments():
     parser.add_argument(
         '-o', '--output',
         type=str,
-        required=True,
-        help='Output .def file path'
+        help='Output .def file path, or output directory with --generate-from-image-dir (required unless --batch or --in-place is used)'
     )
 
     # Create a mutually exclusive group for different modification modes
@@ -219,7 +284,25 @@ def parse_arguments():
         type=str,
         help='Path to the image file to generate the DIEAREA from'
     )
+
+    group.add_argument(
+        '--generate-from-image-dir',
+        type=str,
+        help='Directory or glob of outline images; writes <output>/generated_N.def for every outline_N image in parallel'
+    )
+
+    group.add_argument(
+        '-b', '--batch',
+        type=str,
+        help='Manifest (.jsonl or .csv) of output paths and cutout specs to apply to the input in parallel'
+    )
     
+    parser.add_argument(
+        '--in-place',
+        action='store_true',
+        help='Rewrite the input file instead of writing --output (the DIEAREA is patched without copying when it fits)'
+    )
+
     parser.add_argument(
         '-c', '--coordinates',
         type=int,
@@ -244,15 +327,89 @@ def parse_arguments():
         action='store_true',
         help='Shift the generated DIEAREA coordinates so the minimum x and y values are 0 (use with --generate-from-image)'
     )
+
+    parser.add_argument(
+        '--image-cache-dir',
+        type=str,
+        help='Cache the pixel-space outline corners of processed images in this directory'
+    )
+
+    parser.add_argument(
+        '--image-cache-size-mb',
+        type=float,
+        default=256,
+        help='Evict least recently used image cache entries beyond this total size'
+    )
     
+    parser.add_argument(
+        '--clip-rows',
+        action='store_true',
+        help='Split ROW statements into the segments that lie inside the new DIEAREA'
+    )
+
+    parser.add_argument(
+        '--row-height',
+        type=int,
+        help='Row (site) height in DBU for --clip-rows (default: smallest spacing between ROW y values)'
+    )
+
+    parser.add_argument(
+        '--add-blockages',
+        action='store_true',
+        help='Add placement and per-layer routing BLOCKAGES over every notch of the new DIEAREA'
+    )
+
+    parser.add_argument(
+        '-j', '--jobs',
+        type=int,
+        default=os.cpu_count(),
+        help='Number of worker processes (use with --batch)'
+    )
+
+    parser.add_argument(
+        '--summary',
+        type=str,
+        help='Write the per-job status of a --batch run to this JSON file (default for --generate-from-image-dir: <output>/manifest.json)'
+    )
+
     parser.add_argument(
         '--verbose',
         action='store_true',
         help='Enable verbose output mode'
     )
 
+    parser.add_argument(
+        '--profile',
+        type=str,
+        help='Record per-stage wall time, allocations and counters to this file: JSON lines, or a Prometheus '
+             'textfile if it ends in .prom (also enabled by the RZOO_PROFILE environment variable)'
+    )
+
     args = parser.parse_args()
 
+    if args.in_place:
+        if args.batch is not None or args.generate_from_image_dir is not None:
+            parser.error("--in-place cannot be used with --batch or --generate-from-image-dir")
+        if args.output is not None and not (os.path.exists(args.output) and os.path.exists(args.input)
+                                            and os.path.samefile(args.input, args.output)):
+            parser.error("--in-place cannot be combined with a different --output")
+        args.output = args.input
+
+    if args.batch is None and args.output is None:
+        parser.error("--output is required unless --batch or --in-place is specified")
+
+    if args.batch is not None or args.generate_from_image_dir is not None:
+        if args.coordinates is not None:
+            parser.error("--coordinates cannot be used with --batch or --generate-from-image-dir")
+        if args.jobs < 1:
+            parser.error("--jobs must be >= 1")
+
+    if args.generate_from_image_dir is not None:
+        if args.width is None or args.height is None:
+            parser.error("--width and --height are required when using --generate-from-image-dir")
+        if args.in_place:
+            parser.error("--in-place cannot be used with --generate-from-image-dir")
+
     # Validate that coordinates are provided if rectangles is specified
     if args.rectangles is not None and args.coordinates is None:
         parser.error("--coordinates is required when --rectangles is specified")
@@ -279,37 +436,199 @@ def read_def_file(input_file):
         print(f"Error: File {input_file} does not exist")
         sys.exit(1)
 
+def find_diearea(lines):
+    """
+    Return the index of the DIEAREA statement in lines, or -1 if there is none.
+    A statement spread over several lines is joined into one line in place.
+    """
+    for i, line in enumerate(lines):
+        if line.strip().startswith("DIEAREA"):
+            end = i
+            while ';' not in lines[end] and end + 1 < len(lines):
+                end += 1
+            if end > i:
+                lines[i:end + 1] = [" ".join(part.strip() for part in lines[i:end + 1]) + '\n']
+            return i
+    return -1
+
+# --- Streaming DEF I/O ---
+
+COPY_CHUNK_SIZE = 1 << 20
+
+DIEAREA_PATTERN = re.compile(rb'^[ \t]*DIEAREA\b', re.MULTILINE)
+
+def locate_diearea(input_file):
+    """
+    Find the DIEAREA statement through a memory map, without reading or decoding the file.
+
+    Returns:
+        tuple: (start, end, statement) where start/end are the byte offsets of the
+               lines holding the statement (end is just past the line with ';')
+    """
+    with open(input_file, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            raise ValueError("DIEAREA line not found")
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            m = DIEAREA_PATTERN.search(mm)
+            if m is None:
+                raise ValueError("DIEAREA line not found")
+            semicolon = mm.find(b';', m.start())
+            if semicolon == -1:
+                raise ValueError("DIEAREA statement is not terminated by ';'")
+            newline = mm.find(b'\n', semicolon)
+            end = len(mm) if newline == -1 else newline + 1
+            statement = b" ".join(mm[m.start():end].split()).decode('utf-8')
+            return m.start(), end, statement
+
+def _copy_range(src_fd, dst_fd, offset, length):
+    """
+    Append length bytes of src_fd, starting at offset, to dst_fd.
+    Uses copy_file_range or sendfile so the data stays in the kernel, and plain
+    reads/writes where neither is available for the two files.
+    """
+    end = offset + length
+    for method in ('copy_file_range', 'sendfile'):
+        if not hasattr(os, method):
+            continue
+        try:
+            while offset < end:
+                if method == 'copy_file_range':
+                    copied = os.copy_file_range(src_fd, dst_fd, end - offset, offset)
+                else:
+                    copied = os.sendfile(dst_fd, src_fd, offset, end - offset)
+                if copied == 0:
+                    break
+                offset += copied
+            return
+        except OSError:
+            continue
+    while offset < end:
+        chunk = os.pread(src_fd, min(COPY_CHUNK_SIZE, end - offset), offset)
+        if not chunk:
+            break
+        os.write(dst_fd, chunk)
+        offset += len(chunk)
+
+def patch_diearea_in_place(def_file, new_diearea, start, end):
+    """
+    Overwrite the DIEAREA bytes [start, end) of def_file in place, padding with spaces.
+    Returns False (leaving the file untouched) if the new statement does not fit.
+    """
+    with open(def_file, 'r+b') as f:
+        old = os.pread(f.fileno(), end - start, start)
+        newline = b'\n' if old.endswith(b'\n') else b''
+        data = new_diearea.encode('utf-8')
+        if len(data) + len(newline) > len(old):
+            return False
+        os.pwrite(f.fileno(), data.ljust(len(old) - len(newline)) + newline, start)
+    return True
+
+def stream_def_file(input_file, output_file, new_diearea, start, end):
+    """
+    Write input_file to output_file with the bytes [start, end) replaced by the new DIEAREA statement.
+
+    When both are the same file the statement is patched in place if it fits in
+    the old span; otherwise the untouched parts are spliced around it in the kernel.
+    """
+    in_place = os.path.exists(output_file) and os.path.samefile(input_file, output_file)
+    target = output_file
+    try:
+        if in_place:
+            if patch_diearea_in_place(input_file, new_diearea, start, end):
+                return
+            fd, target = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(output_file)), suffix='.def')
+            os.close(fd)
+        with open(input_file, 'rb') as src, open(target, 'wb') as dst:
+            src_fd, dst_fd = src.fileno(), dst.fileno()
+            _copy_range(src_fd, dst_fd, 0, start)
+            os.write(dst_fd, (new_diearea + '\n').encode('utf-8'))
+            _copy_range(src_fd, dst_fd, end, os.fstat(src_fd).st_size - end)
+        if in_place:
+            os.replace(target, output_file)
+    except Exception as e:
+        if in_place and target != output_file and os.path.exists(target):
+            os.remove(target)
+        print(f"Error: Failed to write to file {output_file}: {str(e)}")
+        sys.exit(1)
+
 def parse_diearea(line):
     """Parse coordinates from the DIEAREA line"""
-    matches = re.findall(r'\(\s*(\d+)\s+(\d+)\s*\)', line)
+    matches = re.findall(r'\(\s*(-?\d+)\s+(-?\d+)\s*\)', line)
     return [(int(x), int(y)) for x, y in matches]
 
-def identify_edge_and_internal(original_corners, point1, point2):
-    """Determine which point is on the edge (including corners) and which is internal"""
-    x0, y0 = original_corners[0]
-    w, h = original_corners[1]
+ROW_PATTERN = re.compile(
+    r'^(\s*)ROW\s+(\S+)\s+(\S+)\s+(-?\d+)\s+(-?\d+)\s+(\S+)\s+DO\s+(\d+)\s+BY\s+1\s+STEP\s+(\d+)\s+0\s*;\s*$'
+)
 
-    # Check if a point is internal
-    def is_internal(point):
-        x, y = point
-        return x0 < x < w and y0 < y < h
-
-    # Check if a point is on the edge
-    def is_edge(point):
-        x, y = point
-        return (
-            (x == x0 and 0 <= y <= h) or
-            (x == w and 0 <= y <= h) or
-            (y == y0 and 0 <= x <= w) or
-            (y == h and 0 <= x <= w)
-        )
+def clip_def_rows(lines, new_diearea, row_height=None):
+    """
+    Split the horizontal ROW statements of a DEF into the segments inside new_diearea.
+    Rows fully inside keep their line; rows crossing a notch become ROW <name>_<k>.
+    """
+    rows = []
+    for i, line in enumerate(lines):
+        m = ROW_PATTERN.match(line)
+        if m:
+            rows.append((i, m))
+    if not rows:
+        return lines
+
+    if row_height is None:
+        row_ys = sorted({int(m.group(5)) for _, m in rows})
+        gaps = [b - a for a, b in zip(row_ys, row_ys[1:])]
+        if not gaps:
+            raise ValueError("Cannot infer the row height from a single row; pass --row-height")
+        row_height = min(gaps)
+
+    segments = clip_rows(
+        parse_diearea(new_diearea),
+        [(int(m.group(4)), int(m.group(5)), int(m.group(7)), int(m.group(8))) for _, m in rows],
+        row_height
+    )
 
-    if is_internal(point1) and is_edge(point2):
-        return point2, point1
-    elif is_internal(point2) and is_edge(point1):
-        return point1, point2
-    else:
-        raise ValueError("One point must be inside the rectangle and one on the edge")
+    replacements = {}
+    for (i, m), row_segments in zip(rows, segments):
+        indent, name, site, _, y, orient, do_count, step = m.groups()
+        if row_segments == [(int(m.group(4)), int(do_count))]:
+            continue
+        new_lines = []
+        for k, (x, count) in enumerate(row_segments):
+            seg_name = name if len(row_segments) == 1 else f"{name}_{k}"
+            new_lines.append(f"{indent}ROW {seg_name} {site} {x} {y} {orient} DO {count} BY 1 STEP {step} 0 ;\n")
+        replacements[i] = new_lines
+
+    clipped = []
+    for i, line in enumerate(lines):
+        if i in replacements:
+            clipped.extend(replacements[i])
+        else:
+            clipped.append(line)
+    return clipped
+
+TRACKS_LAYER_PATTERN = re.compile(r'^\s*TRACKS\s+[XY]\s.*\sLAYER\s+(\S+)')
+
+def add_def_blockages(lines, new_diearea):
+    """
+    Add a placement blockage and one routing blockage per TRACKS layer over every notch of new_diearea.
+    Entries are appended to an existing BLOCKAGES section, otherwise a new section is placed before the nets.
+    """
+    layers = list(dict.fromkeys(m.group(1) for m in map(TRACKS_LAYER_PATTERN.match, lines) if m))
+    section = blockage_section(notch_rects(parse_diearea(new_diearea)), layers)
+    if not section:
+        return lines
+    section = [entry + '\n' for entry in section]
+
+    header_index = next((i for i, line in enumerate(lines) if line.strip().startswith("BLOCKAGES")), -1)
+    if header_index != -1:
+        end_index = next(i for i in range(header_index, len(lines)) if lines[i].strip().startswith("END BLOCKAGES"))
+        count = int(lines[header_index].split()[1]) + len(section) - 2
+        return (lines[:header_index] + [f"BLOCKAGES {count} ;\n"] + lines[header_index + 1:end_index]
+                + section[1:-1] + lines[end_index:])
+
+    insert_index = next((i for i, line in enumerate(lines)
+                         if line.split()[:1] in (["SPECIALNETS"], ["NETS"]) or line.strip() == "END DESIGN"),
+                        len(lines))
+    return lines[:insert_index] + section + ['\n'] + lines[insert_index:]
 
 def generate_new_diearea(original_corners, top_right_pairs, bottom_right_pairs, top_left_pairs, bottom_left_pairs,
                         left_edge_pairs, top_edge_pairs, right_edge_pairs, bottom_edge_pairs):
@@ -317,104 +636,17 @@ def generate_new_diearea(original_corners, top_right_pairs, bottom_right_pairs,
     x0, y0 = original_corners[0]
     w, h = original_corners[1]
 
-    all_points = []
-    
-    if len(bottom_left_pairs) == 0:
-        all_points.append((x0, y0))
-    else:
-        for corner, internal in bottom_left_pairs:
-            x1, y1 = corner
-            x2, y2 = internal
-            all_points.extend([(x2, y0), (x2, y2), (x0, y2)])
-
-    if len(left_edge_pairs) > 0:
-        for edge_point, internal in left_edge_pairs:
-            x1, y1 = edge_point
-            x2, y2 = internal
-            if y1 > y2:
-                all_points.extend([(x1, y2), (x2, y2), (x2, y1), (x1, y1)])
-            else:
-                all_points.extend([(x1, y1), (x2, y1), (x2, y2), (x1, y2)])
-
-    if len(top_left_pairs) == 0:
-        all_points.append((x0, h))
-    else:
-        for corner, internal in top_left_pairs:
-            x1, y1 = corner
-            x2, y2 = internal
-            all_points.extend([(x0, y2), (x2, y2), (x2, h)])
-
-    if len(top_edge_pairs) > 0:
-        for edge_point, internal in top_edge_pairs:
-            x1, y1 = edge_point
-            x2, y2 = internal
-            if x1 > x2:
-                all_points.extend([(x2, y1), (x2, y2), (x1, y2), (x1, y1)])
-            else:
-                all_points.extend([(x1, y1), (x1, y2), (x2, y2), (x2, y1)])
-    
-    if len(top_right_pairs) == 0:
-        all_points.append((w, h))
-    else:
-        for corner, internal in top_right_pairs:
-            x1, y1 = corner
-            x2, y2 = internal
-            all_points.extend([(x2, h), (x2, y2), (w, y2)])
-
-    if len(right_edge_pairs) > 0:
-        for edge_point, internal in right_edge_pairs:
-            x1, y1 = edge_point
-            x2, y2 = internal
-            if y1 > y2:
-                all_points.extend([(x1, y1), (x2, y1), (x2, y2), (x1, y2)])
-            else:
-                all_points.extend([(x1, y2), (x2, y2), (x2, y1), (x1, y1)])
-
-    if len(bottom_right_pairs) == 0:
-        all_points.append((w, y0))
-    else:
-        for corner, internal in bottom_right_pairs:
-            x1, y1 = corner
-            x2, y2 = internal
-            all_points.extend([(w, y2), (x2, y2), (x2, y0)])
-
-    if len(bottom_edge_pairs) > 0:
-        for edge_point, internal in bottom_edge_pairs:
-            x1, y1 = edge_point
-            x2, y2 = internal
-            if x1 > x2:
-                all_points.extend([(x1, y1), (x1, y2), (x2, y2), (x2, y1)])
-            else:
-                all_points.extend([(x2, y1), (x2, y2), (x1, y2), (x1, y1)])
-
-    # Clean up duplicate points - loop until stable
-    while True:
-        # Step 1: Remove head and tail if they are the same
-        if len(all_points) > 1 and all_points[0] == all_points[-1]:
-            all_points = all_points[1:-1]
-
-        # Step 2: Remove touching duplicates entirely (A,B,B,C -> A,C)
-        cleaned_points = []
-        has_duplicates = False
-
-        i = 0
-        n = len(all_points)
-        while i < n:
-            if i + 1 < n and all_points[i] == all_points[i + 1]:
-                dup_point = all_points[i]
-                has_duplicates = True
-                while i < n and all_points[i] == dup_point:
-                    i += 1
-                continue
-            cleaned_points.append(all_points[i])
-            i += 1
-
-        all_points = cleaned_points
-
-        if not has_duplicates:
-            break
+    # Every (edge point, internal point) pair spans one cutout, whichever bucket it came from
+    rects = []
+    for pairs in (top_right_pairs, bottom_right_pairs, top_left_pairs, bottom_left_pairs,
+                  left_edge_pairs, top_edge_pairs, right_edge_pairs, bottom_edge_pairs):
+        rects.extend((p[0], p[1], q[0], q[1]) for p, q in pairs)
 
-    points_str = ' '.join(f'( {x} {y} )' for x, y in all_points)
+    return format_diearea(subtract_rectangles((x0, y0, w, h), rects))
+
+def format_diearea(points):
+    """DIEAREA statement for a vertex list"""
+    points_str = ' '.join(f'( {x} {y} )' for x, y in points)
     return f"DIEAREA {points_str} ;"
 
 def write_def_file(output_file, lines, new_diearea, diearea_index):
@@ -434,33 +666,56 @@ def sort_points_clockwise(points):
     centroid_y = sum(y for x, y in points) / len(points)
     
     # Sort points based on the angle they make with the centroid
-    points.sort(key=lambda p: np.arctan2(p[1] - centroid_y, p[0] - centroid_x))
+    points.sort(key=lambda p: math.atan2(p[1] - centroid_y, p[0] - centroid_x))
     
     return points
 
-def dedup_pairs(pairs):
-    """Remove duplicate (edge_point, internal_point) pairs while preserving first occurrence order."""
-    seen = set()
-    deduped = []
-    for pair in pairs:
-        if pair not in seen:
-            deduped.append(pair)
-            seen.add(pair)
-    return deduped
+def generate_cutout_diearea(original_corners, coordinates):
+    """
+    Build the rectilinear DIEAREA line for a flat list of cutout coordinates
+    (x1 y1 x2 y2 per rectangle, two opposite corners such as an edge point and
+    an internal point). Cutouts may overlap, nest or touch several die edges;
+    notches already present in a rectilinear DIEAREA are kept.
+    Raises ValueError if the remaining die is not a single simple polygon.
+    """
+    if len(original_corners) < 2:
+        raise ValueError("DIEAREA needs at least two points")
+    if len(original_corners) == 2:
+        (x0, y0), (w, h) = original_corners
+        rects = []
+    else:
+        x0 = min(x for x, _ in original_corners)
+        y0 = min(y for _, y in original_corners)
+        w = max(x for x, _ in original_corners)
+        h = max(y for _, y in original_corners)
+        rects = notch_rects(original_corners)
+
+    rects.extend(tuple(coordinates[i:i+4]) for i in range(0, len(coordinates), 4))
+    return format_diearea(subtract_rectangles((x0, y0, w, h), rects))
 
 def process_def_file(args):
     """Main logic for processing the .def file"""
-    lines = read_def_file(args.input)
+    # ROW clipping and blockages edit other sections, so only those need the whole file in memory
+    streaming = not (args.clip_rows or args.add_blockages)
 
-    diearea_index = -1
-    for i, line in enumerate(lines):
-        if line.strip().startswith("DIEAREA"):
-            diearea_index = i
-            break
-
-    if diearea_index == -1:
-        print("Error: DIEAREA line not found")
-        sys.exit(1)
+    if streaming:
+        if not os.path.exists(args.input):
+            print(f"Error: File {args.input} does not exist")
+            sys.exit(1)
+        try:
+            with instrumentation.stage("read_def"):
+                diearea_start, diearea_end, diearea_statement = locate_diearea(args.input)
+        except ValueError as e:
+            print(f"Error: {str(e)}")
+            sys.exit(1)
+    else:
+        with instrumentation.stage("read_def"):
+            lines = read_def_file(args.input)
+            diearea_index = find_diearea(lines)
+        if diearea_index == -1:
+            print("Error: DIEAREA line not found")
+            sys.exit(1)
+        diearea_statement = lines[diearea_index]
 
     new_diearea = ""
 
@@ -470,7 +725,8 @@ def process_def_file(args):
             args.generate_from_image,
             args.width,
             args.height,
-            args.origin_at_zero
+            args.origin_at_zero,
+            make_image_cache(args.image_cache_dir, args.image_cache_size_mb)
         )
         if new_diearea is None:
             sys.exit(1)
@@ -486,79 +742,263 @@ def process_def_file(args):
             sys.exit(1)
 
         try:
-            original_corners = parse_diearea(lines[diearea_index])
+            original_corners = parse_diearea(diearea_statement)
         except ValueError:
             print("Error: Invalid DIEAREA line format")
             sys.exit(1)
 
-        top_right_pairs = []
-        bottom_right_pairs = []
-        top_left_pairs = []
-        bottom_left_pairs = []
-        left_edge_pairs = []
-        top_edge_pairs = []
-        right_edge_pairs = []
-        bottom_edge_pairs = []
         try:
-            for i in range(0, len(args.coordinates), 4):
-                x1, y1, x2, y2 = args.coordinates[i:i+4]
-                edge_point, internal = identify_edge_and_internal(original_corners, (x1, y1), (x2, y2))
-                x0, y0 = original_corners[0]
-                w, h = original_corners[1]
-                if edge_point == (w, h):
-                    top_right_pairs.append((edge_point, internal))
-                elif edge_point == (w, y0):
-                    bottom_right_pairs.append((edge_point, internal))
-                elif edge_point == (x0, h):
-                    top_left_pairs.append((edge_point, internal))
-                elif edge_point == (x0, y0):
-                    bottom_left_pairs.append((edge_point, internal))
-                elif edge_point[0] == x0 and 0 < edge_point[1] < h:
-                    left_edge_pairs.append((edge_point, internal))
-                elif edge_point[1] == h and 0 < edge_point[0] < w:
-                    top_edge_pairs.append((edge_point, internal))
-                elif edge_point[0] == w and 0 < edge_point[1] < h:
-                    right_edge_pairs.append((edge_point, internal))
-                elif edge_point[1] == y0 and 0 < edge_point[0] < w:
-                    bottom_edge_pairs.append((edge_point, internal))
+            with instrumentation.stage("diearea"):
+                new_diearea = generate_cutout_diearea(original_corners, args.coordinates)
         except ValueError as e:
             print(f"Error: {str(e)}")
             sys.exit(1)
 
-        top_right_pairs   = dedup_pairs(top_right_pairs)
-        top_left_pairs    = dedup_pairs(top_left_pairs)
-        bottom_left_pairs = dedup_pairs(bottom_left_pairs)
-        bottom_right_pairs= dedup_pairs(bottom_right_pairs)
+    if streaming:
+        with instrumentation.stage("write_def"):
+            stream_def_file(args.input, args.output, new_diearea, diearea_start, diearea_end)
+    else:
+        if args.clip_rows:
+            try:
+                with instrumentation.stage("clip_rows"):
+                    lines = clip_def_rows(lines, new_diearea, args.row_height)
+            except ValueError as e:
+                print(f"Error: {str(e)}")
+                sys.exit(1)
+
+        if args.add_blockages:
+            try:
+                with instrumentation.stage("add_blockages"):
+                    lines = add_def_blockages(lines, new_diearea)
+            except ValueError as e:
+                print(f"Error: {str(e)}")
+                sys.exit(1)
+
+        with instrumentation.stage("write_def"):
+            write_def_file(args.output, lines, new_diearea, find_diearea(lines))
+    
+    if args.verbose:
+        print(f"Successfully processed file {args.input}, generated new file {args.output}")
+
+# --- Batch Processing Functions ---
 
-        left_edge_pairs   = dedup_pairs(left_edge_pairs)
-        top_edge_pairs    = dedup_pairs(top_edge_pairs)
-        right_edge_pairs  = dedup_pairs(right_edge_pairs)
-        bottom_edge_pairs = dedup_pairs(bottom_edge_pairs)
+# Template DEF parsed once per worker process: (lines, diearea_index, original_corners, options)
+_batch_template = None
 
-        top_right_pairs.sort(key=lambda p: (-p[1][1], p[1][0]))
-        top_left_pairs.sort(key=lambda p: (-p[1][1], -p[1][0]))
-        bottom_left_pairs.sort(key=lambda p: ( p[1][1], -p[1][0]))
-        bottom_right_pairs.sort(key=lambda p:( p[1][1],  p[1][0]))
+def load_batch_manifest(manifest_file):
+    """
+    Read batch jobs from a JSONL or CSV manifest.
+
+    Each job has an "output" plus exactly one of "coordinates" (x1 y1 x2 y2 ...),
+    "diearea_line", or "image" (with "width", "height" and optional "origin_at_zero").
+    Relative paths are resolved against the manifest's directory.
+    """
+    base_dir = os.path.dirname(os.path.abspath(manifest_file))
+    jobs = []
+    with open(manifest_file, 'r', encoding='utf-8', newline='') as f:
+        if manifest_file.lower().endswith('.csv'):
+            rows = [{k: v for k, v in row.items() if v not in (None, '')} for row in csv.DictReader(f)]
+        else:
+            rows = [json.loads(line) for line in f if line.strip()]
+
+    for row in rows:
+        job = dict(row)
+        if 'output' not in job:
+            raise ValueError(f"Manifest entry without an output path: {row}")
+        modes = [key for key in ('coordinates', 'diearea_line', 'image') if key in job]
+        if len(modes) != 1:
+            raise ValueError(f"Manifest entry for {job['output']} needs exactly one of coordinates, diearea_line or image")
+
+        job['output'] = os.path.join(base_dir, job['output'])
+        if 'coordinates' in job and isinstance(job['coordinates'], str):
+            job['coordinates'] = [int(v) for v in job['coordinates'].split()]
+        if 'image' in job:
+            job['image'] = os.path.join(base_dir, job['image'])
+            if 'width' not in job or 'height' not in job:
+                raise ValueError(f"Manifest entry for {job['output']} needs width and height with image")
+            job['width'] = int(job['width'])
+            job['height'] = int(job['height'])
+            origin = job.get('origin_at_zero', False)
+            if isinstance(origin, str):
+                origin = origin.strip().lower() in ('1', 'true', 'yes')
+            job['origin_at_zero'] = origin
+        jobs.append(job)
+    return jobs
+
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.bmp', '.tif', '.tiff')
+
+def image_dir_jobs(pattern, out_dir, width, height, origin_at_zero=False):
+    """
+    Build batch jobs for every outline image in a directory (or matching a glob).
+
+    outline_N.png becomes <out_dir>/generated_N.def; if the trailing numbers are
+    missing or not unique, images are numbered 1..n in sorted order instead.
+    """
+    if os.path.isdir(pattern):
+        images = [os.path.join(pattern, name) for name in os.listdir(pattern)
+                  if name.lower().endswith(IMAGE_EXTENSIONS)]
+    else:
+        images = [path for path in glob.glob(pattern) if os.path.isfile(path)]
+    if not images:
+        raise ValueError(f"No images found for {pattern}")
+
+    def trailing_number(path):
+        m = re.search(r'(\d+)$', os.path.splitext(os.path.basename(path))[0])
+        return int(m.group(1)) if m else None
+
+    numbers = [trailing_number(path) for path in images]
+    if None in numbers or len(set(numbers)) != len(numbers):
+        images.sort()
+        numbers = list(range(1, len(images) + 1))
+    else:
+        numbers, images = zip(*sorted(zip(numbers, images)))
 
+    return [{'output': os.path.join(out_dir, f"generated_{n}.def"), 'image': path,
+             'width': int(width), 'height': int(height), 'origin_at_zero': origin_at_zero}
+            for n, path in zip(numbers, images)]
+
+def make_image_cache(cache_dir, size_mb):
+    """JsonCache for --image-cache-dir, or None when caching is off"""
+    if not cache_dir:
+        return None
+    return JsonCache(cache_dir, int(size_mb * 1024 * 1024), "outlines")
+
+def _init_batch_worker(input_file, options=None):
+    """Parse the template DEF once for this worker process"""
+    global _batch_template
+    options = dict(options or {})
+    if options.get('images'):
+        # Parallelism comes from the process pool; keep OpenCV from spawning threads in every worker
+        import cv2
+        cv2.setNumThreads(1)
+    # Records are per job (the first one includes this template read); drop anything inherited from the parent
+    instrumentation.configure_from_env()
+    instrumentation.reset()
+    with instrumentation.stage("read_def"), open(input_file, 'r', encoding='utf-8') as f:
+        lines = f.readlines()
+    diearea_index = find_diearea(lines)
+    if diearea_index == -1:
+        raise ValueError(f"DIEAREA line not found in {input_file}")
+    options['image_cache'] = make_image_cache(options.get('image_cache_dir'), options.get('image_cache_size_mb', 256))
+    _batch_template = (lines, diearea_index, parse_diearea(lines[diearea_index]), options)
+
+def _run_batch_job(job):
+    """Apply one manifest entry to the worker's template; never raises"""
+    lines, diearea_index, original_corners, options = _batch_template
+    start = time.perf_counter()
+    result = {'output': job['output'], 'status': 'ok', 'message': ''}
+    if 'image' in job:
+        result['image'] = job['image']
+    try:
+        if 'coordinates' in job:
+            coordinates = job['coordinates']
+            if len(coordinates) == 0 or len(coordinates) % 4 != 0:
+                raise ValueError(f"Coordinate count must be a positive multiple of 4, got {len(coordinates)}")
+            with instrumentation.stage("diearea"):
+                new_diearea = generate_cutout_diearea(original_corners, coordinates)
+        elif 'diearea_line' in job:
+            new_diearea = job['diearea_line'].rstrip().rstrip(';').strip() + ' ;'
+        else:
+            new_diearea = generate_diearea_from_image(job['image'], job['width'], job['height'],
+                                                      job['origin_at_zero'], options['image_cache'])
+            if new_diearea is None:
+                raise ValueError(f"Could not generate DIEAREA from image {job['image']}")
+
+        if options.get('clip_rows'):
+            with instrumentation.stage("clip_rows"):
+                lines = clip_def_rows(lines, new_diearea, options.get('row_height'))
+        if options.get('add_blockages'):
+            with instrumentation.stage("add_blockages"):
+                lines = add_def_blockages(lines, new_diearea)
+        if lines is not _batch_template[0]:
+            diearea_index = find_diearea(lines)
+
+        output_dir = os.path.dirname(job['output'])
+        if output_dir:
+            os.makedirs(output_dir, exist_ok=True)
+        with instrumentation.stage("write_def"), open(job['output'], 'w', encoding='utf-8') as f:
+            f.writelines(lines[:diearea_index])
+            f.write(new_diearea + '\n')
+            f.writelines(lines[diearea_index + 1:])
+        result['vertices'] = len(parse_diearea(new_diearea))
+    except Exception as e:
+        result['status'] = 'error'
+        result['message'] = str(e)
+    result['seconds'] = round(time.perf_counter() - start, 6)
+    instrumentation.count("jobs_failed" if result['status'] != 'ok' else "jobs_succeeded")
+    instrumentation.flush("modify_def", mode="batch", output=job['output'], status=result['status'])
+    return result
+
+def process_batch(args):
+    """Fan the manifest jobs out over a process pool sharing one template DEF"""
+    if not os.path.exists(args.input):
+        print(f"Error: File {args.input} does not exist")
+        sys.exit(1)
+
+    if args.generate_from_image_dir:
+        source = args.generate_from_image_dir
         try:
-            new_diearea = generate_new_diearea(
-                original_corners, top_right_pairs, bottom_right_pairs, top_left_pairs,
-                bottom_left_pairs, left_edge_pairs, top_edge_pairs, right_edge_pairs,
-                bottom_edge_pairs
-            )
+            jobs = image_dir_jobs(source, args.output, args.width, args.height, args.origin_at_zero)
         except ValueError as e:
             print(f"Error: {str(e)}")
             sys.exit(1)
-
-    write_def_file(args.output, lines, new_diearea, diearea_index)
-    
-    if args.verbose:
-        print(f"Successfully processed file {args.input}, generated new file {args.output}")
+        os.makedirs(args.output, exist_ok=True)
+        summary_file = args.summary or os.path.join(args.output, 'manifest.json')
+    else:
+        source = args.batch
+        try:
+            jobs = load_batch_manifest(args.batch)
+        except (OSError, ValueError) as e:
+            print(f"Error: Invalid batch manifest {args.batch}: {str(e)}")
+            sys.exit(1)
+        summary_file = args.summary
+
+    from concurrent.futures import ProcessPoolExecutor
+
+    options = {'clip_rows': args.clip_rows, 'row_height': args.row_height, 'add_blockages': args.add_blockages,
+               'image_cache_dir': args.image_cache_dir, 'image_cache_size_mb': args.image_cache_size_mb,
+               'images': any('image' in job for job in jobs)}
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=args.jobs, initializer=_init_batch_worker,
+                             initargs=(args.input, options)) as pool:
+        results = list(pool.map(_run_batch_job, jobs, chunksize=max(1, len(jobs) // (args.jobs * 4))))
+    elapsed = time.perf_counter() - start
+
+    failed = [r for r in results if r['status'] != 'ok']
+    for r in results:
+        if r['status'] != 'ok' or args.verbose:
+            print(f"[{r['status']}] {r['output']} {r['message']}".rstrip())
+
+    summary = {
+        'input': args.input,
+        'manifest': source,
+        'total': len(results),
+        'succeeded': len(results) - len(failed),
+        'failed': len(failed),
+        'seconds': round(elapsed, 3),
+        'jobs': results,
+    }
+    if summary_file:
+        with open(summary_file, 'w', encoding='utf-8') as f:
+            json.dump(summary, f, indent=2)
+
+    print(f"Batch done: {summary['succeeded']}/{summary['total']} succeeded in {summary['seconds']} s")
+    if failed:
+        sys.exit(1)
 
 def main():
     """Main function"""
     args = parse_arguments()
-    process_def_file(args)
+    if args.profile:
+        instrumentation.configure(args.profile)
+    if args.batch or args.generate_from_image_dir:
+        process_batch(args)
+    else:
+        # Also record runs that stop with an error
+        try:
+            process_def_file(args)
+        finally:
+            instrumentation.flush("modify_def", mode="single", input=args.input, output=args.output)
 
 if __name__ == '__main__':
     main()
\ No newline at end of file
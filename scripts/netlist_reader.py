@@ -0,0 +1,131 @@
+import re
+from collections import Counter
+
+from json_cache import JsonCache
+
+# Bumped whenever scan_netlist output changes; part of the cache key
+NETLIST_INDEX_VERSION = 1
+
+# "  MASTER instance (" as written by Yosys; escaped identifiers start with '\'
+INSTANCE_PATTERN = re.compile(rb'^\s*([A-Za-z_\\][^\s(#]*)\s+(?:#\s*\(.*\)\s*)?(\\\S+|[A-Za-z_][\w$\[\].]*)\s*\($')
+MODULE_PATTERN = re.compile(rb'^\s*module\s+([A-Za-z_\\][^\s(;]*)')
+KEYWORDS = {b"module", b"endmodule", b"input", b"output", b"inout", b"wire", b"reg", b"assign", b"supply0",
+            b"supply1", b"tri", b"parameter", b"localparam", b"function", b"task", b"always", b"initial"}
+
+# --- Structural Verilog Scanning ---
+
+def scan_netlist(path):
+    """
+    Count the instances of a gate-level netlist per master, line by line.
+
+    Hierarchy is flattened from the top module (the one no other module
+    instantiates); a master that is not a module of the file is a leaf cell
+    or macro.
+
+    Args:
+        path (str): Structural Verilog file
+
+    Returns:
+        dict: {"top": name, "modules": number of modules,
+               "cells": {master: flattened instance count}}
+    """
+    modules = {}
+    current = None
+    with open(path, 'rb') as f:
+        for line in f:
+            line = line.rstrip()
+            if not line.endswith(b'(') and not line.lstrip().startswith(b'module'):
+                continue
+            m = MODULE_PATTERN.match(line)
+            if m:
+                current = modules.setdefault(m.group(1).decode(), Counter())
+                continue
+            if current is None:
+                continue
+            m = INSTANCE_PATTERN.match(line)
+            if m and m.group(1) not in KEYWORDS:
+                current[m.group(1).decode()] += 1
+
+    if not modules:
+        raise ValueError(f"No module found in {path}")
+    instantiated = {master for counts in modules.values() for master in counts}
+    tops = [name for name in modules if name not in instantiated]
+    # With several candidates the last one is the top in synthesis output
+    top = tops[-1] if tops else list(modules)[-1]
+
+    flat = {}
+    def expand(name, stack=()):
+        if name in flat:
+            return flat[name]
+        if name in stack:
+            raise ValueError(f"Recursive instantiation of module {name}")
+        cells = Counter()
+        for master, count in modules[name].items():
+            if master in modules:
+                for leaf, n in expand(master, stack + (name,)).items():
+                    cells[leaf] += n * count
+            else:
+                cells[master] += count
+        flat[name] = cells
+        return cells
+
+    return {"top": top, "modules": len(modules), "cells": dict(sorted(expand(top).items()))}
+
+def netlist_summary(path, cache_dir=None):
+    """scan_netlist, looked up first in a JsonCache keyed by the netlist content"""
+    if not cache_dir:
+        return scan_netlist(path)
+    cache = JsonCache(cache_dir, namespace="netlist")
+    key = cache.key_for_file(path, {"netlist_index": NETLIST_INDEX_VERSION})
+    summary = cache.get(key)
+    if summary is None:
+        summary = scan_netlist(path)
+        try:
+            cache.put(key, summary)
+        except OSError as e:
+            print(f"Warning: Could not write netlist cache entry: {str(e)}")
+    return summary
+
+# --- Areas ---
+
+def netlist_area(summary, macros, dbu_per_micron):
+    """
+    Standard-cell and macro area of a netlist summary.
+
+    Args:
+        summary (dict): netlist_summary result
+        macros (dict): LEF macros as in DEFGenerator.config["macros"] (DBU)
+        dbu_per_micron (int): DBU of the macro sizes
+
+    Returns:
+        dict: "cell_area" and "macro_area" in um^2, "cell_instances",
+              "macro_instances", "largest_macro" (width, height) in DBU and
+              "unknown" (masters missing from the LEF)
+    """
+    area = {"cell_area": 0.0, "macro_area": 0.0, "cell_instances": 0, "macro_instances": 0,
+            "largest_macro": (0, 0), "unknown": []}
+    scale = 1.0 / (dbu_per_micron * dbu_per_micron)
+    for master, count in summary["cells"].items():
+        macro = macros.get(master)
+        if macro is None:
+            area["unknown"].append(master)
+            continue
+        cell_area = macro["width"] * macro["height"] * scale * count
+        if (macro.get("class") or "").startswith("BLOCK"):
+            area["macro_area"] += cell_area
+            area["macro_instances"] += count
+            area["largest_macro"] = (max(area["largest_macro"][0], macro["width"]),
+                                     max(area["largest_macro"][1], macro["height"]))
+        else:
+            area["cell_area"] += cell_area
+            area["cell_instances"] += count
+    return area
+
+def netlist_macros(summary, macros):
+    """(width, height) in DBU per instantiated BLOCK macro, largest first"""
+    sizes = []
+    for master, count in summary["cells"].items():
+        macro = macros.get(master)
+        if macro is not None and (macro.get("class") or "").startswith("BLOCK"):
+            sizes.extend([(macro["width"], macro["height"])] * count)
+    return sorted(sizes, key=lambda s: s[0] * s[1], reverse=True)
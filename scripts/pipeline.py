@@ -0,0 +1,421 @@
+import argparse
+import io
+import json
+import os
+import queue
+import sys
+import tarfile
+import threading
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+
+from check_diearea import check_polygon
+from modify_def import add_def_blockages, clip_def_rows, find_diearea, parse_diearea
+from rectilinear import polygon_points
+from variant_generator import VariantGenerator
+
+# --- Bounded-Queue Stages ---
+
+_DONE = object()
+
+class Stage:
+    """
+    One pipeline step: a pool of worker threads taking items from the queue
+    before it and putting their results on the queue after it.
+
+    fn(item) returns the item to pass on (a list of items when fan_out is
+    set). An item it raises on gets an "error" and is passed on untouched by
+    the later stages, except those with handles_errors set (the last one),
+    whose fn sees failed items too so that they are reported.
+    """
+
+    def __init__(self, name, fn, workers=1, fan_out=False, handles_errors=False):
+        self.name = name
+        self.fn = fn
+        self.workers = max(1, workers)
+        self.fan_out = fan_out
+        self.handles_errors = handles_errors
+        self.items = 0          # items taken in and processed
+        self.outputs = 0        # items put on the next queue
+        self.errors = 0         # items that leave the stage failed here
+        self.busy = 0.0         # seconds inside fn, summed over workers
+        self.starved = 0.0      # seconds waiting for input
+        self.blocked = 0.0      # seconds waiting on a full output queue (backpressure)
+        self.finished = None
+        self._lock = threading.Lock()
+
+    def stats(self, wall):
+        """Per-stage counters; capacity is the rate the stage could sustain if never starved or blocked"""
+        return {"stage": self.name, "workers": self.workers, "items": self.items, "outputs": self.outputs,
+                "errors": self.errors, "busy_s": round(self.busy, 3), "starved_s": round(self.starved, 3),
+                "blocked_s": round(self.blocked, 3),
+                "items_per_s": round(self.outputs / wall, 1) if wall > 0 else 0.0,
+                "capacity_per_s": round(self.outputs * self.workers / self.busy, 1) if self.busy > 0 else 0.0,
+                "utilization": round(self.busy / (wall * self.workers), 3) if wall > 0 else 0.0}
+
+def _run_worker(stage, inbox, outbox, downstream_workers, remaining):
+    while True:
+        start = time.perf_counter()
+        item = inbox.get()
+        got = time.perf_counter()
+        if item is _DONE:
+            break
+        failed = 0
+        carried = item.get("error") is not None
+        if not carried or stage.handles_errors:
+            try:
+                result = stage.fn(item)
+            except Exception as e:
+                item["error"] = str(e) if isinstance(e, (OSError, ValueError)) else f"{type(e).__name__}: {e}"
+                result = item
+            outputs = result if stage.fan_out and isinstance(result, list) else [result]
+            failed = sum(1 for output in outputs if output.get("error") is not None) - carried
+        else:
+            outputs = [item]
+        done = time.perf_counter()
+        if outbox is not None:
+            for output in outputs:
+                outbox.put(output)
+        end = time.perf_counter()
+        with stage._lock:
+            stage.items += 1
+            stage.outputs += len(outputs)
+            stage.errors += failed
+            stage.starved += got - start
+            stage.busy += done - got
+            stage.blocked += end - done
+
+    with stage._lock:
+        remaining[0] -= 1
+        last = remaining[0] == 0
+        if last:
+            stage.finished = time.perf_counter()
+    if last and outbox is not None:
+        for _ in range(downstream_workers):
+            outbox.put(_DONE)
+
+def run_stages(source, stages, queue_size=8):
+    """
+    Stream the items of source through stages connected by bounded queues.
+
+    A stage whose output queue is full stops its workers until the next stage
+    catches up, so a slow stage holds back the ones before it (backpressure)
+    and at most queue_size items wait between two stages.
+
+    Returns:
+        float: Wall time in seconds
+    """
+    queues = [queue.Queue(maxsize=queue_size) for _ in stages]
+    threads = []
+    for k, stage in enumerate(stages):
+        outbox = queues[k + 1] if k + 1 < len(stages) else None
+        downstream = stages[k + 1].workers if k + 1 < len(stages) else 0
+        remaining = [stage.workers]
+        for n in range(stage.workers):
+            threads.append(threading.Thread(target=_run_worker, name=f"{stage.name}-{n}", daemon=True,
+                                            args=(stage, queues[k], outbox, downstream, remaining)))
+
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for item in source:
+        queues[0].put(item)
+    for _ in range(stages[0].workers):
+        queues[0].put(_DONE)
+    for thread in threads:
+        thread.join()
+    return time.perf_counter() - start
+
+# --- DEF Stage Work ---
+#
+# Runs in the pipeline's threads, or in worker processes with --processes;
+# each process receives the template once through _init_worker.
+
+_template = None
+_local = threading.local()
+
+def _init_worker(lines, config, options):
+    """Share the template DEF, variant settings and modify options with this process"""
+    global _template
+    diearea_index = find_diearea(lines)
+    if diearea_index == -1:
+        raise ValueError("DIEAREA line not found in the template")
+    _template = {"lines": lines, "diearea_index": diearea_index, "config": config, "options": options,
+                 "head": "".join(lines[:diearea_index]), "tail": "".join(lines[diearea_index + 1:])}
+
+def generate_chunk(indices):
+    """(i, DIEAREA line or None, error or None) per variant; one VariantGenerator per thread"""
+    generator = getattr(_local, "generator", None)
+    if generator is None:
+        generator = _local.generator = VariantGenerator(_template["config"])
+        generator.set_base(_template["lines"])
+    return [(i, diearea, None if error is None else str(error)) for i, diearea, error in generator.dieareas(indices)]
+
+def modify_variant(diearea):
+    """Template DEF text with the variant's DIEAREA, ROWs clipped and notches blocked as configured"""
+    options = _template["options"]
+    if not (options["clip_rows"] or options["add_blockages"]):
+        return _template["head"] + diearea + "\n" + _template["tail"]
+    lines = _template["lines"]
+    if options["clip_rows"]:
+        lines = clip_def_rows(lines, diearea, options["row_height"])
+    if options["add_blockages"]:
+        lines = add_def_blockages(lines, diearea)
+    diearea_index = find_diearea(lines)
+    return "".join(lines[:diearea_index]) + diearea + "\n" + "".join(lines[diearea_index + 1:])
+
+def render_variant(points):
+    """PNG bytes of the DIEAREA plot at the configured size"""
+    import cv2
+    from render_floorplan import PNG_PARAMS, render_floorplan
+    plan = {"points": polygon_points(points), "rows": [], "tracks": {"X": [], "Y": []}}
+    ok, png = cv2.imencode(".png", render_floorplan(plan, _template["options"]["size"]), PNG_PARAMS)
+    if not ok:
+        raise ValueError("PNG encoding failed")
+    return png.tobytes()
+
+class VariantPipeline:
+    """
+    generate -> modify -> validate -> render -> package for cutout variants
+    of one template DEF, streamed through bounded queues without
+    intermediate files.
+    """
+
+    def __init__(self, lines, config, options, executor=None):
+        """
+        Args:
+            lines (list): Template DEF lines
+            config (dict): VariantGenerator settings
+            options (dict): clip_rows, row_height, add_blockages, size
+            executor (ProcessPoolExecutor): Runs the generate, modify and render
+                                            work when given (initialized with _init_worker)
+        """
+        _init_worker(lines, config, options)
+        self.options = options
+        self.executor = executor
+
+    def _call(self, fn, *args):
+        if self.executor is None:
+            return fn(*args)
+        return self.executor.submit(fn, *args).result()
+
+    def generate(self, item):
+        try:
+            produced = self._call(generate_chunk, item["indices"])
+        except Exception as e:
+            # Every variant of the chunk must still reach package and be reported
+            error = str(e) if isinstance(e, (OSError, ValueError)) else f"{type(e).__name__}: {e}"
+            produced = [(i, None, error) for i in item["indices"]]
+        return [{"index": i, "diearea": diearea, "error": error} for i, diearea, error in produced]
+
+    def modify(self, item):
+        if self.options["clip_rows"] or self.options["add_blockages"]:
+            item["def"] = self._call(modify_variant, item["diearea"])
+        else:
+            # Only a string join; cheaper here than sending the text back from a process
+            item["def"] = modify_variant(item["diearea"])
+        return item
+
+    def validate(self, item):
+        points = parse_diearea(item["diearea"])
+        violations, _ = check_polygon(points)
+        if violations:
+            categories = sorted({v["category"] for v in violations})
+            raise ValueError(f"Illegal DIEAREA ({', '.join(categories)})")
+        item["points"] = points
+        return item
+
+    def render(self, item):
+        item["png"] = self._call(render_variant, item["points"])
+        return item
+
+# --- Packaging ---
+
+class Package:
+    """Output files in a directory, or in a .zip/.tar/.tar.gz archive; written by one thread"""
+
+    def __init__(self, out_dir=None, archive=None):
+        self.out_dir = out_dir
+        self.archive = None
+        if archive and archive.endswith(".zip"):
+            self.archive = zipfile.ZipFile(archive, 'w', zipfile.ZIP_DEFLATED, compresslevel=1)
+        elif archive:
+            gz = archive.endswith((".tar.gz", ".tgz"))
+            self.archive = tarfile.open(archive, "w:gz", compresslevel=1) if gz else tarfile.open(archive, "w")
+        else:
+            os.makedirs(out_dir, exist_ok=True)
+        self._dirs = set()
+
+    def add(self, name, data):
+        if isinstance(data, str):
+            data = data.encode('utf-8')
+        if isinstance(self.archive, zipfile.ZipFile):
+            self.archive.writestr(name, data)
+        elif self.archive is not None:
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            info.mtime = int(time.time())
+            self.archive.addfile(info, io.BytesIO(data))
+        else:
+            path = os.path.join(self.out_dir, name)
+            directory = os.path.dirname(path)
+            if directory not in self._dirs:
+                os.makedirs(directory, exist_ok=True)
+                self._dirs.add(directory)
+            with open(path, 'wb') as f:
+                f.write(data)
+
+    def close(self):
+        if self.archive is not None:
+            self.archive.close()
+
+def package_stage(package, prefix, results):
+    """Write a variant's DEF and plot, or its err_<i>.log, and record the outcome"""
+    def write(item):
+        i = item["index"]
+        if item.get("error") is not None:
+            package.add(f"err_{i}.log", f"Error: {item['error']}\n")
+            results.append({"index": i, "status": "error", "message": item["error"]})
+            return item
+        package.add(f"{prefix}_{i:03d}.def", item["def"])
+        if "png" in item:
+            package.add(f"floorplan_plots/{prefix}_{i:03d}.png", item["png"])
+        results.append({"index": i, "status": "ok", "vertices": len(item["points"])})
+        return item
+    return write
+
+# --- CLI ---
+
+STAGE_NAMES = ("generate", "modify", "validate", "render", "package")
+
+def parse_workers(text, defaults):
+    """ "generate=4,render=2" style overrides of the per-stage worker counts"""
+    workers = dict(defaults)
+    for part in filter(None, (p.strip() for p in (text or "").split(","))):
+        name, _, count = part.partition("=")
+        if name not in workers or not count.isdigit() or int(count) < 1:
+            raise ValueError(f"expected STAGE=N with STAGE in {', '.join(workers)}, got {part!r}")
+        workers[name] = int(count)
+    return workers
+
+def print_stats(stats, wall):
+    print(f"{'stage':<10} {'workers':>7} {'items':>7} {'errors':>6} {'busy s':>8} {'starved s':>9} "
+          f"{'blocked s':>9} {'items/s':>8} {'capacity/s':>10}")
+    for s in stats:
+        print(f"{s['stage']:<10} {s['workers']:>7} {s['outputs']:>7} {s['errors']:>6} {s['busy_s']:>8.2f} "
+              f"{s['starved_s']:>9.2f} {s['blocked_s']:>9.2f} {s['items_per_s']:>8.1f} {s['capacity_per_s']:>10.1f}")
+    print(f"Wall time: {wall:.2f} s")
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Stream cutout variants through generate -> modify -> validate -> render -> package "
+                    "stages connected by bounded queues",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter
+    )
+    template = parser.add_argument_group("template", "Read a rectangular DEF, or generate one in memory")
+    template.add_argument("-i", "--input", type=str, help="Input rectangular .def file")
+    template.add_argument("-w", "--width", type=float, help="DIE width in DBU for a generated template")
+    template.add_argument("-t", "--height", type=float, help="DIE height in DBU for a generated template")
+    template.add_argument("-d", "--design", type=str, help="Design name of a generated template")
+    template.add_argument("-c", "--config", type=str, help="generate_def.py configuration file (JSON)")
+    template.add_argument("--lef", type=str, nargs="+", help="LEF files or directories for a generated template")
+    parser.add_argument("-o", "--out-dir", type=str, default="pipeline_out", help="Output directory")
+    parser.add_argument("--archive", type=str,
+                        help="Write the outputs into this .zip, .tar or .tar.gz archive instead of --out-dir")
+    parser.add_argument("-n", "--num-variants", type=int, help="Number of variants (default: from --from-script, else 20)")
+    parser.add_argument("--from-script", type=str,
+                        help="Read MIN_RECTS, MAX_DEPTH, ASPECT_CENTER, ... from a *_modifier.sh script")
+    parser.add_argument("--prefix", type=str, help="Output file prefix")
+    parser.add_argument("--sampler", choices=["shell", "free-space"], help="Cutout sampler (see variant_generator.py)")
+    parser.add_argument("--buffer", type=int, help="Minimum spacing between cutouts in DBU")
+    parser.add_argument("--clip-rows", action="store_true", help="Clip ROWs to each new DIEAREA")
+    parser.add_argument("--row-height", type=int, help="ROW height in DBU for --clip-rows")
+    parser.add_argument("--add-blockages", action="store_true", help="Block the notches of each new DIEAREA")
+    parser.add_argument("--no-render", action="store_true", help="Skip the floorplan plots")
+    parser.add_argument("--size", type=int, default=800, help="Plot size in pixels (longer side)")
+    parser.add_argument("--queue-size", type=int, default=8, help="Items that may wait between two stages")
+    parser.add_argument("--chunk", type=int, default=16, help="Consecutive variants per generate task")
+    parser.add_argument("--processes", type=int, default=0,
+                        help="Run the generate, modify and render work in this many worker processes (0: threads only)")
+    parser.add_argument("--workers", type=str,
+                        help='Per-stage worker threads, e.g. "render=4,validate=2" (package always uses one)')
+    parser.add_argument("--report", type=str, help="Write the per-stage statistics and per-variant results as JSON")
+    args = parser.parse_args()
+
+    if bool(args.input) == bool(args.width or args.height):
+        parser.error("Give either -i/--input or -w/-t for the template")
+    if args.queue_size < 1 or args.chunk < 1 or args.processes < 0:
+        parser.error("--queue-size and --chunk must be >= 1 and --processes >= 0")
+
+    config = {}
+    if args.from_script:
+        config.update(VariantGenerator.load_shell_profile(args.from_script))
+    if os.environ.get("ASPECT_CENTER"):
+        config["aspect_center"] = os.environ["ASPECT_CENTER"]
+    overrides = {"output_prefix": args.prefix, "num_variants": args.num_variants, "sampler": args.sampler,
+                 "buffer": args.buffer}
+    config.update({k: v for k, v in overrides.items() if v is not None})
+    config = VariantGenerator(config).config
+
+    try:
+        if args.input:
+            with open(args.input, 'r', encoding='utf-8') as f:
+                lines = f.readlines()
+        else:
+            if not (args.width and args.height):
+                parser.error("A generated template needs both -w and -t")
+            from generate_def import DEFGenerator
+            text = DEFGenerator(args.config, args.lef).build_def(args.width, args.height, args.design)
+            lines = text.splitlines(keepends=True)
+    except (OSError, ValueError) as e:
+        print(f"Error: Could not read the template: {e}")
+        sys.exit(1)
+
+    parallel = args.processes or 1
+    defaults = {"generate": parallel, "modify": parallel, "validate": 1, "render": max(2, parallel), "package": 1}
+    try:
+        workers = parse_workers(args.workers, defaults)
+    except ValueError as e:
+        parser.error(f"Invalid --workers: {e}")
+    workers["package"] = 1
+
+    options = {"clip_rows": args.clip_rows, "row_height": args.row_height, "add_blockages": args.add_blockages,
+               "size": args.size}
+    executor = None
+    if args.processes:
+        executor = ProcessPoolExecutor(args.processes, initializer=_init_worker, initargs=(lines, config, options))
+    try:
+        pipeline = VariantPipeline(lines, config, options, executor)
+        package = Package(args.out_dir, args.archive)
+    except (OSError, ValueError) as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+    results = []
+    steps = {"generate": pipeline.generate, "modify": pipeline.modify, "validate": pipeline.validate,
+             "render": pipeline.render, "package": package_stage(package, config["output_prefix"], results)}
+    stages = [Stage(name, steps[name], workers[name], fan_out=name == "generate", handles_errors=name == "package")
+              for name in STAGE_NAMES if not (name == "render" and args.no_render)]
+
+    numbers = list(range(1, config["num_variants"] + 1))
+    source = ({"indices": numbers[k:k + args.chunk]} for k in range(0, len(numbers), args.chunk))
+    try:
+        wall = run_stages(source, stages, args.queue_size)
+    finally:
+        package.close()
+        if executor is not None:
+            executor.shutdown()
+
+    stats = [stage.stats(wall) for stage in stages]
+    print_stats(stats, wall)
+    results.sort(key=lambda r: r["index"])
+    failed = [r for r in results if r["status"] != "ok"]
+    for r in failed:
+        print(f"Variant {r['index']} failed: {r['message']}")
+    print(f"{len(results) - len(failed)} variant(s) written to {args.archive or args.out_dir}, {len(failed)} failed")
+    if args.report:
+        with open(args.report, 'w', encoding='utf-8') as f:
+            json.dump({"wall_s": round(wall, 3), "stages": stats, "variants": results}, f, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,573 @@
+import bisect
+
+# --- Rectilinear Polygon Helpers ---
+
+def polygon_points(points):
+    """Return the vertex list of a DIEAREA; a two-point DIEAREA is expanded to its four corners"""
+    points = [(int(x), int(y)) for x, y in points]
+    if len(points) == 2:
+        (xa, ya), (xb, yb) = points
+        x0, x1 = min(xa, xb), max(xa, xb)
+        y0, y1 = min(ya, yb), max(ya, yb)
+        return [(x0, y0), (x0, y1), (x1, y1), (x1, y0)]
+    if len(points) < 4:
+        raise ValueError(f"DIEAREA polygon needs at least 4 points, got {len(points)}")
+    return points
+
+def vertical_edges(points):
+    """Vertical edges (y_low, y_high, x) of a rectilinear polygon"""
+    points = polygon_points(points)
+    edges = []
+    for (xa, ya), (xb, yb) in zip(points, points[1:] + points[:1]):
+        if xa == xb:
+            if ya != yb:
+                edges.append((min(ya, yb), max(ya, yb), xa))
+        elif ya != yb:
+            raise ValueError(f"DIEAREA polygon is not rectilinear: edge ( {xa} {ya} ) - ( {xb} {yb} )")
+    return edges
+
+def polygon_slabs(points):
+    """
+    Sweep the polygon bottom-up over its vertical edges.
+
+    Yields (y_low, y_high, intervals) for every horizontal slab between two
+    consecutive vertex y values, where intervals is the sorted list of
+    (x_start, x_end) ranges inside the polygon for that slab.
+    """
+    edges = vertical_edges(points)
+    ys = sorted({y for y_low, y_high, _ in edges for y in (y_low, y_high)})
+    by_start = sorted(edges)
+    by_end = sorted(edges, key=lambda e: e[1])
+    active = []
+    i_start = i_end = 0
+
+    for y_low, y_high in zip(ys, ys[1:]):
+        while i_end < len(by_end) and by_end[i_end][1] <= y_low:
+            del active[bisect.bisect_left(active, by_end[i_end][2])]
+            i_end += 1
+        while i_start < len(by_start) and by_start[i_start][0] <= y_low:
+            bisect.insort(active, by_start[i_start][2])
+            i_start += 1
+
+        # Even-odd rule: consecutive pairs of crossing edges bound the inside
+        intervals = []
+        for k in range(0, len(active) - 1, 2):
+            x_start, x_end = active[k], active[k + 1]
+            if intervals and intervals[-1][1] == x_start:
+                intervals[-1] = (intervals[-1][0], x_end)
+            elif x_start < x_end:
+                intervals.append((x_start, x_end))
+        yield y_low, y_high, intervals
+
+def intersect_intervals(a, b):
+    """Intersection of two sorted lists of disjoint (start, end) intervals"""
+    result = []
+    i = j = 0
+    while i < len(a) and j < len(b):
+        start = max(a[i][0], b[j][0])
+        end = min(a[i][1], b[j][1])
+        if start < end:
+            result.append((start, end))
+        if a[i][1] < b[j][1]:
+            i += 1
+        else:
+            j += 1
+    return result
+
+def clip_rows(points, rows, row_height):
+    """
+    Split placement rows into the segments that lie inside a rectilinear polygon.
+
+    Args:
+        points (list): DIEAREA vertices
+        rows (list): (x, y, do_count, step) per row, as in a DEF ROW statement
+        row_height (int): Height of one row (site height) in DBU
+
+    Returns:
+        list: For every input row, a list of (x, do_count) segments whose
+              sites lie on the original site grid and fully inside the polygon
+    """
+    slabs = list(polygon_slabs(points))
+    order = sorted(range(len(rows)), key=lambda k: rows[k][1])
+    result = [[] for _ in rows]
+    first = 0
+
+    for k in order:
+        x, y, do_count, step = rows[k]
+        y_top = y + row_height
+        # Slabs are sorted by y, and so are the rows we visit
+        while first < len(slabs) and slabs[first][1] <= y:
+            first += 1
+        if first == len(slabs) or slabs[first][0] > y:
+            continue
+
+        inside = [(x, x + do_count * step)]
+        s = first
+        covered = y
+        while inside and s < len(slabs) and slabs[s][0] < y_top:
+            if slabs[s][0] > covered:
+                inside = []
+                break
+            inside = intersect_intervals(inside, slabs[s][2])
+            covered = slabs[s][1]
+            s += 1
+        if covered < y_top:
+            continue
+
+        for start, end in inside:
+            first_site = x - ((x - start) // step) * step
+            count = (end - first_site) // step
+            if count > 0:
+                result[k].append((first_site, count))
+
+    return result
+
+def notch_rects(points):
+    """
+    Rectangles covering the bounding box of a rectilinear polygon minus the polygon.
+
+    Gaps that line up in consecutive slabs are merged vertically, so every
+    notch of a DIEAREA is returned as a small number of (x0, y0, x1, y1) boxes.
+    """
+    points = polygon_points(points)
+    x_min = min(x for x, _ in points)
+    x_max = max(x for x, _ in points)
+    open_rects = {}
+    rects = []
+    last_y = None
+
+    for y_low, y_high, intervals in polygon_slabs(points):
+        gaps = []
+        x = x_min
+        for start, end in intervals:
+            if start > x:
+                gaps.append((x, start))
+            x = max(x, end)
+        if x < x_max:
+            gaps.append((x, x_max))
+
+        for gap in list(open_rects):
+            if gap not in gaps:
+                rects.append((gap[0], open_rects.pop(gap), gap[1], y_low))
+        for gap in gaps:
+            open_rects.setdefault(gap, y_low)
+        last_y = y_high
+
+    for (x0, x1), y0 in open_rects.items():
+        rects.append((x0, y0, x1, last_y))
+    return sorted(rects, key=lambda r: (r[1], r[0]))
+
+def blockage_section(rects, layers, placement=True):
+    """
+    DEF BLOCKAGES section lines for a list of notch rectangles.
+
+    Args:
+        rects (list): (x0, y0, x1, y1) boxes, e.g. from notch_rects()
+        layers (list): Routing layer names to block inside every box
+        placement (bool): Also emit a PLACEMENT blockage per box
+
+    Returns:
+        list: Section lines without trailing newlines (empty if rects is empty)
+    """
+    entries = []
+    for x0, y0, x1, y1 in rects:
+        box = f"RECT ( {x0} {y0} ) ( {x1} {y1} ) ;"
+        if placement:
+            entries.append(f"   - PLACEMENT {box}")
+        for layer in layers:
+            entries.append(f"   - LAYER {layer} {box}")
+    if not entries:
+        return []
+    return [f"BLOCKAGES {len(entries)} ;"] + entries + ["END BLOCKAGES"]
+
+# --- Rectangle Subtraction ---
+
+class _CoverTree:
+    """Segment tree over compressed x coordinates counting how many rectangles cover each elementary interval"""
+
+    def __init__(self, xs):
+        self.xs = xs
+        size = 4 * max(1, len(xs) - 1)
+        self.count = [0] * size
+        # True when no part of the node's range is covered
+        self.empty = [True] * size
+
+    def update(self, lo, hi, delta, node=1, left=0, right=None):
+        """Add delta to the cover count of elementary intervals [lo, hi)"""
+        if right is None:
+            right = len(self.xs) - 1
+        if hi <= left or right <= lo:
+            return
+        if lo <= left and right <= hi:
+            self.count[node] += delta
+        else:
+            mid = (left + right) // 2
+            self.update(lo, hi, delta, 2 * node, left, mid)
+            self.update(lo, hi, delta, 2 * node + 1, mid, right)
+        if self.count[node] > 0:
+            self.empty[node] = False
+        elif right - left == 1:
+            self.empty[node] = True
+        else:
+            self.empty[node] = self.empty[2 * node] and self.empty[2 * node + 1]
+
+    def free_intervals(self, lo=0, hi=None):
+        """Sorted, merged (x_start, x_end) ranges not covered by any rectangle within elementary intervals [lo, hi)"""
+        if hi is None:
+            hi = len(self.xs) - 1
+        result = []
+        stack = [(1, 0, len(self.xs) - 1)]
+        while stack:
+            node, left, right = stack.pop()
+            if hi <= left or right <= lo or self.count[node] > 0:
+                continue
+            if self.empty[node] or right - left == 1:
+                x_start, x_end = self.xs[max(left, lo)], self.xs[min(right, hi)]
+                if result and result[-1][1] == x_start:
+                    result[-1] = (result[-1][0], x_end)
+                else:
+                    result.append((x_start, x_end))
+                continue
+            mid = (left + right) // 2
+            # Right child first so the left one is popped (and emitted) first
+            stack.append((2 * node + 1, mid, right))
+            stack.append((2 * node, left, mid))
+        return result
+
+def _subtract_intervals(a, b):
+    """Parts of the sorted disjoint intervals a that are not covered by b"""
+    result = []
+    j = 0
+    for start, end in a:
+        while j < len(b) and b[j][1] <= start:
+            j += 1
+        k = j
+        while k < len(b) and b[k][0] < end:
+            if b[k][0] > start:
+                result.append((start, b[k][0]))
+            start = max(start, b[k][1])
+            k += 1
+        if start < end:
+            result.append((start, end))
+    return result
+
+def _merge_ranges(ranges):
+    """Union of (start, end) ranges as a sorted list of disjoint ranges"""
+    merged = []
+    for start, end in sorted(ranges):
+        if merged and start <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+def subtract_rectangles(die, rects):
+    """
+    Subtract axis-aligned rectangles from a rectangular die.
+
+    Rectangles may overlap, nest, extend past the die and touch several die
+    edges. A scanline over the rectangle y coordinates keeps a segment tree of
+    x coverage; at every event y only the x ranges of the rectangles starting
+    or ending there are queried before and after the update, and their
+    difference gives the horizontal boundary edges. Vertical edges pair up the
+    resulting vertices column by column, so the work is O((n + k) log n) for n
+    rectangles and k output vertices.
+
+    Args:
+        die (tuple): (x0, y0, x1, y1) of the die
+        rects (list): (x0, y0, x1, y1) cutouts; corners may be given in any order
+
+    Returns:
+        list: Clockwise vertices without collinear points, starting at the
+              lowest, then leftmost vertex (the next vertex is above it)
+
+    Raises:
+        ValueError: If nothing remains, or the remainder is not one simple polygon
+                    (a cutout leaves a hole, splits the die or pinches it at a point)
+    """
+    dx0, dy0, dx1, dy1 = min(die[0], die[2]), min(die[1], die[3]), max(die[0], die[2]), max(die[1], die[3])
+    clipped = []
+    for rx0, ry0, rx1, ry1 in rects:
+        rx0, rx1 = max(min(rx0, rx1), dx0), min(max(rx0, rx1), dx1)
+        ry0, ry1 = max(min(ry0, ry1), dy0), min(max(ry0, ry1), dy1)
+        if rx0 < rx1 and ry0 < ry1:
+            clipped.append((rx0, ry0, rx1, ry1))
+
+    xs = sorted({dx0, dx1} | {x for r in clipped for x in (r[0], r[2])})
+    x_index = {x: i for i, x in enumerate(xs)}
+    events = {}
+    for rx0, ry0, rx1, ry1 in clipped:
+        events.setdefault(ry0, []).append((x_index[rx0], x_index[rx1], 1))
+        events.setdefault(ry1, []).append((x_index[rx0], x_index[rx1], -1))
+    events.setdefault(dy0, [])
+    events.setdefault(dy1, [])
+
+    # Directed horizontal edges, clockwise with the region on the right:
+    # tops of the region go right, bottoms go left
+    horizontal = {}
+    incoming = set()
+
+    def add_horizontal(start, end):
+        for point in (start, end):
+            if point in horizontal or point in incoming:
+                raise ValueError(f"Cutouts pinch the die at ( {point[0]} {point[1]} )")
+        horizontal[start] = end
+        incoming.add(end)
+
+    tree = _CoverTree(xs)
+    full = [(0, len(xs) - 1)]
+    for y in sorted(events):
+        changed = full if y in (dy0, dy1) else _merge_ranges((lo, hi) for lo, hi, _ in events[y])
+        if y == dy0:
+            below = []
+        else:
+            below = [iv for lo, hi in changed for iv in tree.free_intervals(lo, hi)]
+        for lo, hi, delta in events[y]:
+            tree.update(lo, hi, delta)
+        if y == dy1:
+            above = []
+        else:
+            above = [iv for lo, hi in changed for iv in tree.free_intervals(lo, hi)]
+
+        for x_start, x_end in _merge_ranges(_subtract_intervals(below, above)):
+            add_horizontal((x_start, y), (x_end, y))
+        for x_start, x_end in _merge_ranges(_subtract_intervals(above, below)):
+            add_horizontal((x_end, y), (x_start, y))
+
+    if not horizontal:
+        raise ValueError("Cutouts remove the whole die")
+
+    # Vertical edges: vertices on one x pair up bottom-to-top; the edge leaves
+    # whichever end has its horizontal edge coming in
+    columns = {}
+    for point in list(horizontal) + list(incoming):
+        columns.setdefault(point[0], []).append(point)
+    edges = dict(horizontal)
+    for column in columns.values():
+        column.sort(key=lambda p: p[1])
+        for low, high in zip(column[::2], column[1::2]):
+            if low in incoming:
+                edges[low] = high
+            else:
+                edges[high] = low
+
+    start = min(edges, key=lambda p: (p[1], p[0]))
+    loop = [start]
+    point = edges.pop(start)
+    while point != start:
+        loop.append(point)
+        point = edges.pop(point)
+    if edges:
+        raise ValueError("Cutouts leave a hole or split the die into several parts")
+
+    # Drop vertices where the boundary goes straight on
+    n = len(loop)
+    polygon = []
+    for i, (x, y) in enumerate(loop):
+        (xp, yp), (xn, yn) = loop[i - 1], loop[(i + 1) % n]
+        if not ((xp == x == xn) or (yp == y == yn)):
+            polygon.append((x, y))
+    return polygon
+
+# --- Rectangle Index ---
+
+class RectIndex:
+    """
+    Uniform bucket grid for finding stored rectangles near a query rectangle.
+
+    Rectangles are (x1, y1, x2, y2) with corners in any order and are kept
+    under a caller-chosen key. With a cell size around the typical rectangle
+    size, each insert, move and query touches a handful of buckets instead of
+    every stored rectangle.
+    """
+
+    def __init__(self, cell_size):
+        self.cell_size = max(1, int(cell_size))
+        self.buckets = {}
+        self.rects = {}
+
+    def _cells(self, rect):
+        x1, y1, x2, y2 = rect
+        c = self.cell_size
+        for cx in range(min(x1, x2) // c, max(x1, x2) // c + 1):
+            for cy in range(min(y1, y2) // c, max(y1, y2) // c + 1):
+                yield cx, cy
+
+    def insert(self, key, rect):
+        """Store rect under key (replacing any previous rect for key)"""
+        if key in self.rects:
+            self.remove(key)
+        self.rects[key] = rect
+        for cell in self._cells(rect):
+            self.buckets.setdefault(cell, set()).add(key)
+
+    def remove(self, key):
+        """Forget the rect stored under key"""
+        for cell in self._cells(self.rects.pop(key)):
+            bucket = self.buckets[cell]
+            bucket.discard(key)
+            if not bucket:
+                del self.buckets[cell]
+
+    def query(self, rect, margin_x=0, margin_y=0):
+        """
+        Keys of stored rects that intersect rect grown by the margins
+        (closed test, so touching rects are included).
+        """
+        x1, y1, x2, y2 = rect
+        qx1, qx2 = min(x1, x2) - margin_x, max(x1, x2) + margin_x
+        qy1, qy2 = min(y1, y2) - margin_y, max(y1, y2) + margin_y
+        found = set()
+        for cell in self._cells((qx1, qy1, qx2, qy2)):
+            for key in self.buckets.get(cell, ()):
+                if key in found:
+                    continue
+                bx1, by1, bx2, by2 = self.rects[key]
+                if (min(bx1, bx2) <= qx2 and max(bx1, bx2) >= qx1 and
+                        min(by1, by2) <= qy2 and max(by1, by2) >= qy1):
+                    found.add(key)
+        return found
+
+# --- Boundary Free Space ---
+
+def boundary_free_rects(die, rects, max_depth, margins=(0, 0, 0, 0), spacing=0):
+    """
+    Maximal empty rectangles of a die that stay anchored to an edge or corner.
+
+    Each die edge is swept inward over the distinct depths at which a stored
+    rectangle starts to block it; the free spans along the edge at one depth
+    that shrink at the next are maximal. Corner entries are the spans that
+    still start at the corner. Types follow the variant generators: 0 left,
+    1 right, 2 bottom, 3 top edge, 4 bottom-left, 5 bottom-right, 6 top-right,
+    7 top-left corner.
+
+    Args:
+        die (tuple): (x0, y0, x1, y1)
+        rects (list): Occupied rectangles (x1, y1, x2, y2), corners in any order
+        max_depth (int): Largest inward depth of interest
+        margins (tuple): Distance kept from the die corners by edge entries (left, right, bottom, top)
+        spacing (int): Clearance to keep around the occupied rectangles
+
+    Returns:
+        dict: type -> list of (lo, hi, depth), the free span along the edge and how far inward it stays free
+    """
+    x0, y0, x1, y1 = die
+    boxes = [(min(a, c) - spacing, min(b, d) - spacing, max(a, c) + spacing, max(b, d) + spacing)
+             for a, b, c, d in rects]
+    # Per side: span along the edge, obstacles as (inward offset, lo, hi), corner types at lo and hi
+    sides = {
+        0: ((y0, y1), [(bx0 - x0, by0, by1) for bx0, by0, bx1, by1 in boxes], None),
+        1: ((y0, y1), [(x1 - bx1, by0, by1) for bx0, by0, bx1, by1 in boxes], None),
+        2: ((x0, x1), [(by0 - y0, bx0, bx1) for bx0, by0, bx1, by1 in boxes], (4, 5)),
+        3: ((x0, x1), [(y1 - by1, bx0, bx1) for bx0, by0, bx1, by1 in boxes], (7, 6)),
+    }
+
+    free = {typ: [] for typ in range(8)}
+    if max_depth <= 0:
+        return free
+    for side, ((lo, hi), obstacles, corners) in sides.items():
+        levels = sorted({v for v, _, _ in obstacles if 0 < v < max_depth} | {max_depth})
+        edge = (lo + margins[side], hi - margins[side])
+        previous = None
+        for depth in levels + [None]:
+            if depth is None:
+                spans, edge_spans = [], []
+            else:
+                blocked = _merge_ranges((a, b) for v, a, b in obstacles if v < depth)
+                spans = _subtract_intervals([(lo, hi)], blocked)
+                edge_spans = _subtract_intervals([edge], blocked) if edge[0] < edge[1] else []
+            if previous is not None:
+                prev_depth, prev_spans, prev_edge_spans = previous
+                free[side].extend((a, b, prev_depth) for a, b in prev_edge_spans if (a, b) not in edge_spans)
+                if corners:
+                    for a, b in prev_spans:
+                        if (a, b) in spans:
+                            continue
+                        if a == lo:
+                            free[corners[0]].append((a, b, prev_depth))
+                        if b == hi:
+                            free[corners[1]].append((a, b, prev_depth))
+            previous = (depth, spans, edge_spans)
+    return free
+
+# --- Macro Packing ---
+
+def _carve_free(free, used):
+    """
+    MaxRects update: every free rectangle overlapping used is replaced by its up
+    to four maximal remainders, then rectangles inside another one are dropped.
+    """
+    ux0, uy0, ux1, uy1 = used
+    carved = set()
+    for rect in free:
+        fx0, fy0, fx1, fy1 = rect
+        if ux0 >= fx1 or ux1 <= fx0 or uy0 >= fy1 or uy1 <= fy0:
+            carved.add(rect)
+            continue
+        if ux0 > fx0:
+            carved.add((fx0, fy0, ux0, fy1))
+        if ux1 < fx1:
+            carved.add((ux1, fy0, fx1, fy1))
+        if uy0 > fy0:
+            carved.add((fx0, fy0, fx1, uy0))
+        if uy1 < fy1:
+            carved.add((fx0, uy1, fx1, fy1))
+
+    kept = []
+    for rect in sorted(carved, key=lambda r: (r[2] - r[0]) * (r[3] - r[1]), reverse=True):
+        x0, y0, x1, y1 = rect
+        if not any(k[0] <= x0 and k[1] <= y0 and k[2] >= x1 and k[3] >= y1 for k in kept):
+            kept.append(rect)
+    return kept
+
+def pack_macros(points, macros, halo=0):
+    """
+    Place fixed-orientation macros inside a rectilinear polygon (MaxRects,
+    best short side fit, largest macro first).
+
+    The free list starts as the maximal empty rectangles of the polygon (its
+    bounding box carved by notch_rects) and is carved again after each
+    placement. This is a heuristic: None means no packing was found, not
+    that none exists.
+
+    Args:
+        points (list): DIEAREA vertices
+        macros (list): (width, height) per macro instance
+        halo (int): Clearance kept around every macro, also from the die boundary
+
+    Returns:
+        list: (x0, y0, x1, y1) per macro in input order (halo excluded), or None
+    """
+    points = polygon_points(points)
+    x_min = min(x for x, _ in points)
+    y_min = min(y for _, y in points)
+    x_max = max(x for x, _ in points)
+    y_max = max(y for _, y in points)
+    notches = notch_rects(points) if len(points) > 4 else []
+
+    sizes = [(w + 2 * halo, h + 2 * halo) for w, h in macros]
+    area = (x_max - x_min) * (y_max - y_min) - sum((x1 - x0) * (y1 - y0) for x0, y0, x1, y1 in notches)
+    if sum(w * h for w, h in sizes) > area:
+        return None
+
+    free = [(x_min, y_min, x_max, y_max)]
+    for notch in notches:
+        free = _carve_free(free, notch)
+
+    placed = [None] * len(macros)
+    for k in sorted(range(len(sizes)), key=lambda k: (sizes[k][0] * sizes[k][1], max(sizes[k])), reverse=True):
+        w, h = sizes[k]
+        best = None
+        for x0, y0, x1, y1 in free:
+            dw, dh = (x1 - x0) - w, (y1 - y0) - h
+            if dw < 0 or dh < 0:
+                continue
+            score = (min(dw, dh), max(dw, dh), y0, x0)
+            if best is None or score < best[0]:
+                best = (score, x0, y0)
+        if best is None:
+            return None
+        _, x0, y0 = best
+        free = _carve_free(free, (x0, y0, x0 + w, y0 + h))
+        placed[k] = (x0 + halo, y0 + halo, x0 + w - halo, y0 + h - halo)
+    return placed
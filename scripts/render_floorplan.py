@@ -0,0 +1,303 @@
+import argparse
+import os
+import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import cv2
+import numpy as np
+
+from check_diearea import collect_def_files
+from modify_def import ROW_PATTERN, locate_diearea, parse_diearea
+from rectilinear import polygon_points, polygon_slabs
+
+# --- Colors (BGR) ---
+
+BACKGROUND = (255, 255, 255)
+DIE_FILL = (198, 190, 190)
+CUTOUT_FILL = (128, 128, 255)
+ROW_LINE = (160, 152, 152)
+TRACK_LINE = (226, 200, 170)
+GRID_LINE = (220, 214, 208)
+LABEL_COLOR = (40, 40, 40)
+
+TRACKS_PATTERN = re.compile(
+    rb'^\s*TRACKS\s+([XY])\s+(-?\d+)\s+DO\s+(\d+)\s+STEP\s+(\d+)\s+LAYER\s+(\S+)'
+)
+ROW_BYTES_PATTERN = re.compile(ROW_PATTERN.pattern.encode())
+# ROW and TRACKS statements come before these sections, so reading stops there
+SECTION_END_PATTERN = re.compile(rb'^\s*(COMPONENTS|PINS|NETS|SPECIALNETS|BLOCKAGES)\b')
+
+# --- DEF Reading ---
+
+def read_floorplan(def_file, rows=False, tracks=False):
+    """
+    Read the parts of a DEF needed for a floorplan plot.
+
+    The DIEAREA is located through a memory map; the file is only read line
+    by line when rows or tracks are requested, and then only up to the first
+    COMPONENTS/PINS/NETS section.
+
+    Returns:
+        dict: points (DIEAREA vertices), rows [(x, y, length)], tracks {"X"/"Y": [(start, count, step)]}
+    """
+    _, _, statement = locate_diearea(def_file)
+    plan = {"points": polygon_points(parse_diearea(statement)), "rows": [], "tracks": {"X": [], "Y": []}}
+    if not rows and not tracks:
+        return plan
+
+    track_layer = None
+    with open(def_file, 'rb') as f:
+        for line in f:
+            if SECTION_END_PATTERN.match(line):
+                break
+            if rows and line.lstrip().startswith(b'ROW'):
+                m = ROW_BYTES_PATTERN.match(line)
+                if m:
+                    plan["rows"].append((int(m.group(4)), int(m.group(5)), int(m.group(7)) * int(m.group(8))))
+            elif tracks and line.lstrip().startswith(b'TRACKS'):
+                m = TRACKS_PATTERN.match(line)
+                # Only the first layer: every layer at once is a solid wash at plot resolution
+                if m and track_layer in (None, m.group(5)):
+                    track_layer = m.group(5)
+                    plan["tracks"][m.group(1).decode()].append((int(m.group(2)), int(m.group(3)), int(m.group(4))))
+    return plan
+
+# --- Rasterization ---
+
+MIN_LINE_GAP = 4  # pixels between drawn row/track lines; denser lines are thinned
+
+def _thin(pixels, gap=MIN_LINE_GAP):
+    """Keep one pixel position per gap-wide bucket so dense lines stay distinguishable"""
+    pixels = np.unique(pixels)
+    _, first = np.unique(pixels // gap, return_index=True)
+    return pixels[first]
+
+def _bounding_box(points):
+    """(x0, y0, x1, y1) of the DIEAREA; a die without width or height has nothing to draw"""
+    xs = [x for x, _ in points]
+    ys = [y for _, y in points]
+    bx0, by0, bx1, by1 = min(xs), min(ys), max(xs), max(ys)
+    if bx1 <= bx0 or by1 <= by0:
+        raise ValueError(f"DIEAREA has zero width or height: {bx1 - bx0} x {by1 - by0}")
+    return bx0, by0, bx1, by1
+
+def render_floorplan(plan, size=800, margin=0):
+    """
+    Rasterize a floorplan into a BGR image whose longer side is size pixels.
+
+    The DIEAREA is scanline-filled slab by slab (polygon_slabs): everything
+    in the die bounding box outside the polygon intervals of a slab is painted
+    as cut-out, so the cost depends on the number of vertices and drawn lines,
+    not on the number of pixels.
+
+    Args:
+        plan (dict): As returned by read_floorplan
+        size (int): Length of the longer side of the die in pixels
+        margin (int): White border around the die in pixels
+    """
+    points = plan["points"]
+    bx0, by0, bx1, by1 = _bounding_box(points)
+    scale = size / max(bx1 - bx0, by1 - by0)
+    width = max(1, int(round((bx1 - bx0) * scale)))
+    height = max(1, int(round((by1 - by0) * scale)))
+
+    def px(x):
+        return int(round((x - bx0) * scale))
+
+    def py(y):
+        # Image rows grow downwards
+        return height - int(round((y - by0) * scale))
+
+    img = np.empty((height + 2 * margin, width + 2 * margin, 3), dtype=np.uint8)
+
+    def fill(x_start, x_end, r0, r1, color):
+        # Pixel ranges are half-open; cv2.rectangle corners are inclusive
+        if x_start < x_end and r0 < r1:
+            cv2.rectangle(img, (margin + x_start, margin + r0), (margin + x_end - 1, margin + r1 - 1), color, -1)
+
+    cv2.rectangle(img, (0, 0), (img.shape[1] - 1, img.shape[0] - 1), BACKGROUND, -1)
+    fill(0, width, 0, height, DIE_FILL)
+
+    # Lines go over the whole die first; the cut-outs are painted over them afterwards
+    for axis, specs in plan["tracks"].items():
+        for start, count, step in specs:
+            coords = start + step * np.arange(count, dtype=np.int64)
+            if axis == "X":
+                for c in _thin(np.clip(np.round((coords - bx0) * scale).astype(np.int64), 0, width - 1)).tolist():
+                    fill(c, c + 1, 0, height, TRACK_LINE)
+            else:
+                for r in _thin(np.clip(height - np.round((coords - by0) * scale).astype(np.int64), 0, height - 1)).tolist():
+                    fill(0, width, r, r + 1, TRACK_LINE)
+
+    if plan["rows"]:
+        x, y, length = np.array(plan["rows"], dtype=np.int64).T
+        r = np.clip(height - np.round((y - by0) * scale).astype(np.int64), 0, height - 1)
+        c0 = np.clip(np.round((x - bx0) * scale).astype(np.int64), 0, width)
+        c1 = np.clip(np.round((x + length - bx0) * scale).astype(np.int64), 0, width)
+        keep = np.isin(r, _thin(r))
+        segments = np.unique(np.stack([r[keep], c0[keep], c1[keep]], axis=1), axis=0)
+        for row, start, end in segments.tolist():
+            fill(start, end, row, row + 1, ROW_LINE)
+
+    # Cut-outs: the parts of each slab between the die bounding box and the polygon
+    for y_low, y_high, intervals in polygon_slabs(points):
+        r0, r1 = py(y_high), py(y_low)
+        left = 0
+        for x_start, x_end in intervals:
+            fill(left, px(x_start), r0, r1, CUTOUT_FILL)
+            left = px(x_end)
+        fill(left, width, r0, r1, CUTOUT_FILL)
+
+    return img
+
+def render_tile(plan, tile_w, tile_h):
+    """
+    Render a plan directly at the largest size fitting a tile_w x tile_h box.
+
+    Rasterizing again at tile scale is cheaper than resizing the full plot
+    and keeps row/track lines crisp.
+    """
+    bx0, by0, bx1, by1 = _bounding_box(plan["points"])
+    w, h = bx1 - bx0, by1 - by0
+    return render_floorplan(plan, max(1, int(min(tile_w * max(w, h) / w, tile_h * max(w, h) / h))))
+
+def contact_sheet(tiles, columns=6, tile_size=(320, 400), label_height=44, pad=16):
+    """
+    Lay out (label, image) tiles in a grid with a caption under each image.
+
+    Args:
+        tiles (list): (label, BGR image) pairs, images already fitted to tile_size
+        columns (int): Tiles per row
+        tile_size (tuple): (width, height) reserved for each image
+        label_height (int): Pixels reserved for the caption
+        pad (int): Padding around each image inside its cell
+    """
+    tile_w, tile_h = tile_size
+    cell_w, cell_h = tile_w + 2 * pad, tile_h + 2 * pad + label_height
+    rows = max(1, -(-len(tiles) // columns))
+    sheet = np.empty((rows * cell_h + 1, columns * cell_w + 1, 3), dtype=np.uint8)
+    sheet[:] = BACKGROUND
+
+    for k, (label, img) in enumerate(tiles):
+        top, left = (k // columns) * cell_h, (k % columns) * cell_w
+        h, w = img.shape[:2]
+        y = top + pad + (tile_h - h)
+        x = left + pad + (tile_w - w) // 2
+        sheet[y:y + h, x:x + w] = img
+        (text_w, text_h), _ = cv2.getTextSize(label, cv2.FONT_HERSHEY_SIMPLEX, 0.6, 1)
+        cv2.putText(sheet, label, (left + (cell_w - text_w) // 2, top + pad + tile_h + (label_height + text_h) // 2),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.6, LABEL_COLOR, 1, cv2.LINE_AA)
+
+    for r in range(rows + 1):
+        sheet[r * cell_h, :] = GRID_LINE
+    for c in range(columns + 1):
+        sheet[:, c * cell_w] = GRID_LINE
+    return sheet
+
+# --- Batch Rendering ---
+
+# Flat-colored plots compress well at the fastest setting; PNG row filters
+# (OpenCV >= 4.11) only cost time on them
+PNG_PARAMS = [cv2.IMWRITE_PNG_COMPRESSION, 1]
+if hasattr(cv2, "IMWRITE_PNG_FILTER"):
+    PNG_PARAMS += [cv2.IMWRITE_PNG_FILTER, cv2.IMWRITE_PNG_FILTER_NONE]
+
+def render_job(job):
+    """
+    Render one DEF: write its thumbnail (if out_file is set) and return the mosaic tile.
+
+    Never raises, so one bad file does not stop a batch.
+
+    Returns:
+        tuple: (def_file, tile or None, error or None)
+    """
+    def_file, out_file, options = job
+    try:
+        plan = read_floorplan(def_file, options["rows"], options["tracks"])
+        if out_file:
+            img = render_floorplan(plan, options["size"])
+            if not cv2.imwrite(out_file, img, PNG_PARAMS):
+                raise OSError(f"could not write {out_file}")
+        tile = render_tile(plan, *options["tile_size"]) if options["mosaic"] else None
+        return def_file, tile, None
+    except (OSError, ValueError) as e:
+        return def_file, None, str(e)
+
+def write_mosaics(mosaic_file, tiles, columns, tile_size, per_sheet):
+    """Write the tiles as one contact sheet, or several numbered sheets of per_sheet tiles each"""
+    if len(tiles) <= per_sheet:
+        sheets = [(mosaic_file, tiles)]
+    else:
+        stem, ext = os.path.splitext(mosaic_file)
+        sheets = [(f"{stem}_{k // per_sheet + 1:03d}{ext}", tiles[k:k + per_sheet])
+                  for k in range(0, len(tiles), per_sheet)]
+    for path, chunk in sheets:
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        cv2.imwrite(path, contact_sheet(chunk, columns, tile_size), [cv2.IMWRITE_JPEG_QUALITY, 90])
+    return [path for path, _ in sheets]
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Render DEF floorplans (DIEAREA, optionally ROW/TRACKS) to PNG thumbnails and JPEG contact sheets",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter
+    )
+    parser.add_argument("paths", nargs="+", help="DEF files, directories or glob patterns")
+    parser.add_argument("-o", "--out-dir", type=str, help="Write one <name>.png per DEF into this directory")
+    parser.add_argument("--mosaic", type=str, help="Write a contact sheet of all plots to this file (e.g. gallery/gallery_tr.jpg)")
+    parser.add_argument("--size", type=int, default=800, help="Longer side of each plot in pixels")
+    parser.add_argument("--rows", action="store_true", help="Draw ROW statements")
+    parser.add_argument("--tracks", action="store_true", help="Draw the TRACKS of the first routing layer")
+    parser.add_argument("--columns", type=int, default=6, help="Tiles per contact-sheet row")
+    parser.add_argument("--tile-size", type=int, nargs=2, default=[320, 400], metavar=("W", "H"),
+                        help="Image area of each contact-sheet tile")
+    parser.add_argument("--per-sheet", type=int, default=60,
+                        help="Tiles per contact sheet; more plots are split into numbered sheets")
+    parser.add_argument("-j", "--jobs", type=int, default=os.cpu_count(), help="Number of worker processes")
+
+    args = parser.parse_args()
+    if not args.out_dir and not args.mosaic:
+        parser.error("nothing to do: give --out-dir and/or --mosaic")
+    if args.jobs < 1 or args.size < 1 or args.columns < 1 or args.per_sheet < 1:
+        parser.error("--jobs, --size, --columns and --per-sheet must be >= 1")
+
+    files = collect_def_files(args.paths)
+    if not files:
+        print("Error: No DEF files found")
+        sys.exit(1)
+    if args.out_dir:
+        os.makedirs(args.out_dir, exist_ok=True)
+
+    options = {
+        "rows": args.rows,
+        "tracks": args.tracks,
+        "size": args.size,
+        "mosaic": bool(args.mosaic),
+        "tile_size": tuple(args.tile_size),
+    }
+    jobs = [(f, os.path.join(args.out_dir, os.path.splitext(os.path.basename(f))[0] + ".png") if args.out_dir else None,
+             options) for f in files]
+
+    start = time.perf_counter()
+    if args.jobs == 1 or len(jobs) == 1:
+        results = [render_job(job) for job in jobs]
+    else:
+        with ProcessPoolExecutor(max_workers=args.jobs) as pool:
+            results = list(pool.map(render_job, jobs, chunksize=max(1, len(jobs) // (args.jobs * 4))))
+
+    failed = [(f, error) for f, _, error in results if error]
+    for f, error in failed:
+        print(f"Error: {f}: {error}")
+    if args.mosaic:
+        tiles = [(os.path.basename(f), tile) for f, tile, error in results if not error]
+        for path in write_mosaics(args.mosaic, tiles, args.columns, tuple(args.tile_size), args.per_sheet):
+            print(f"Contact sheet: {path}")
+
+    print(f"Rendered {len(results) - len(failed)}/{len(results)} floorplans in {time.perf_counter() - start:.3f} s")
+    if failed:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
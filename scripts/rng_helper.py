@@ -4,38 +4,153 @@ rng_helper.py
 Small helper to produce a truncated normal (or uniform) RNG value reproducibly from an integer seed.
 Usage:
   rng_helper.py --seed N [--mu 1.0] [--sigma 0.3] [--min 0.5] [--max 2.0]
+  rng_helper.py --stream DESIGN SIZE VARIANT RECT TRY [--uniform MIN MAX]
 Prints a single floating value to stdout.
+
+The same draws are available in-process through derive_seed(), uniform_int()
+and truncated_normal(), so Python drivers do not need to spawn this script.
+uniform_array() and truncated_normal_array() return many draws at once as NumPy
+arrays; with compat=True they reproduce the scalar outputs seed by seed.
+
+stream_key(), stream() and stream_generator() give every key path, e.g.
+(design, size class, variant, rectangle, try), its own independent stream, so
+draws do not depend on the order or process in which variants are generated.
 """
 import argparse
 import hashlib
+import json
 import random
 import sys
 
-p = argparse.ArgumentParser()
-p.add_argument('--seed', type=str, required=True, help='seed (int or string)')
-p.add_argument('--mu', type=float, default=1.0)
-p.add_argument('--sigma', type=float, default=0.30)
-p.add_argument('--min', dest='mn', type=float, default=0.5)
-p.add_argument('--max', dest='mx', type=float, default=2.0)
-p.add_argument('--uniform', nargs=2, type=int, metavar=('MIN','MAX'),
-               help='If provided, output a single integer uniformly between MIN and MAX (inclusive)')
-args = p.parse_args()
-
-# Create a large integer seed from provided seed string using sha256
-h = hashlib.sha256(args.seed.encode('utf-8')).digest()
-seed_int = int.from_bytes(h, 'big') & ((1<<63)-1)
-rnd = random.Random(seed_int)
-if args.uniform:
-  mn, mx = args.uniform
+def derive_seed(seed):
+  """Create a large integer seed from provided seed string using sha256"""
+  h = hashlib.sha256(str(seed).encode('utf-8')).digest()
+  return int.from_bytes(h, 'big') & ((1<<63)-1)
+
+def stream_key(*keys):
+  """Unambiguous seed string for a key path (no two paths share one)"""
+  return "stream:" + json.dumps([str(k) for k in keys], separators=(',', ':'))
+
+def stream(*keys):
+  """random.Random for one key path"""
+  return random.Random(derive_seed(stream_key(*keys)))
+
+def stream_generator(*keys):
+  """NumPy generator for one key path"""
+  return numpy_generator(stream_key(*keys))
+
+def uniform_int(seed, mn, mx):
+  """Integer uniformly between mn and mx (inclusive), as printed by --uniform"""
+  rnd = random.Random(derive_seed(seed))
   # randint is inclusive
-  v = rnd.randint(mn, mx)
-  print(str(v))
-  sys.exit(0)
+  return rnd.randint(mn, mx)
+
+def truncated_normal(seed, mu=1.0, sigma=0.30, mn=0.5, mx=2.0):
+  """Gaussian draw truncated to [mn, mx] by rejection"""
+  rnd = random.Random(derive_seed(seed))
+  while True:
+    v = rnd.gauss(mu, sigma)
+    if v >= mn and v <= mx:
+      return v
+    # If it's outside, draw again (loop until truncated)
+
+def numpy_generator(seed):
+  """NumPy generator keyed by the same sha256 seed derivation"""
+  import numpy as np
+  return np.random.default_rng(derive_seed(seed))
+
+def uniform_array(seed, mn, mx, size=None, compat=False):
+  """
+  Integers uniformly between mn and mx (inclusive) as a NumPy array.
+
+  By default `size` draws come from one generator keyed by `seed`.
+  With compat=True, `seed` is a sequence of seeds and element i equals
+  uniform_int(seed[i], mn, mx), i.e. what the shell drivers get today.
+  """
+  import numpy as np
+  if compat:
+    seeds = np.asarray(seed, dtype=object)
+    out = [uniform_int(s, mn, mx) for s in seeds.ravel()]
+    return np.array(out, dtype=np.int64).reshape(seeds.shape)
+  return numpy_generator(seed).integers(mn, mx, size=size, endpoint=True)
 
-# Draw gaussian and truncate
-while True:
-  v = rnd.gauss(args.mu, args.sigma)
-  if v >= args.mn and v <= args.mx:
-    print(f"{v:.6f}")
+def truncated_normal_array(seed, mu=1.0, sigma=0.30, mn=0.5, mx=2.0, size=None, compat=False, max_rounds=1000):
+  """
+  Truncated Gaussian draws as a NumPy array.
+
+  mu, sigma, mn and mx broadcast against each other, so a sweep over several
+  centers is one call; the result has shape broadcast(mu, sigma, mn, mx) + (size,)
+  (the trailing axis is dropped when size is None). Out-of-range draws are
+  redrawn in batches rather than one at a time.
+
+  With compat=True, `seed` is a sequence of seeds and each element equals
+  truncated_normal() for that seed (parameters broadcast against the seeds).
+  """
+  import numpy as np
+  if compat:
+    seeds, *params = np.broadcast_arrays(np.asarray(seed, dtype=object),
+                                         *(np.asarray(v, dtype=float) for v in (mu, sigma, mn, mx)))
+    out = np.empty(seeds.shape)
+    for idx in np.ndindex(seeds.shape):
+      out[idx] = truncated_normal(seeds[idx], *(float(p[idx]) for p in params))
+    return out
+
+  mu, sigma, mn, mx = np.broadcast_arrays(*(np.asarray(v, dtype=float) for v in (mu, sigma, mn, mx)))
+  if np.any(mn > mx):
+    raise ValueError("Truncation bounds must satisfy min <= max")
+  shape = mu.shape + ((size,) if size is not None else ())
+  mu, sigma, mn, mx = (np.broadcast_to(v[..., None], shape) if size is not None else v
+                       for v in (mu, sigma, mn, mx))
+
+  rng = numpy_generator(seed)
+  out = np.empty(shape)
+  pending = np.ones(shape, dtype=bool)
+  for _ in range(max_rounds):
+    n = int(pending.sum())
+    if n == 0:
+      return out
+    v = rng.normal(mu[pending], sigma[pending], size=n)
+    ok = (v >= mn[pending]) & (v <= mx[pending])
+    idx = np.flatnonzero(pending)[ok]
+    out.flat[idx] = v[ok]
+    pending.flat[idx] = False
+  raise ValueError(f"Truncated normal did not converge after {max_rounds} rounds; check --min/--max against --mu/--sigma")
+
+def main():
+  p = argparse.ArgumentParser()
+  source = p.add_mutually_exclusive_group(required=True)
+  source.add_argument('--seed', type=str, help='seed (int or string)')
+  source.add_argument('--stream', nargs='+', metavar='KEY',
+                      help='key path of an independent stream, e.g. DESIGN SIZE VARIANT RECT TRY')
+  p.add_argument('--mu', type=float, default=1.0)
+  p.add_argument('--sigma', type=float, default=0.30)
+  p.add_argument('--min', dest='mn', type=float, default=0.5)
+  p.add_argument('--max', dest='mx', type=float, default=2.0)
+  p.add_argument('--uniform', nargs=2, type=int, metavar=('MIN','MAX'),
+                 help='If provided, output a single integer uniformly between MIN and MAX (inclusive)')
+  p.add_argument('--count', type=int,
+                 help='If provided, output COUNT values (one per line) drawn with the vectorized sampler')
+  args = p.parse_args()
+  if args.stream:
+    args.seed = stream_key(*args.stream)
+
+  if args.count is not None:
+    if args.uniform:
+      values = [str(v) for v in uniform_array(args.seed, *args.uniform, size=args.count)]
+    else:
+      values = [f"{v:.6f}" for v in truncated_normal_array(args.seed, args.mu, args.sigma, args.mn, args.mx, size=args.count)]
+    print("\n".join(values))
     sys.exit(0)
-  # If it's outside, draw again (loop until truncated)
+
+  if args.uniform:
+    mn, mx = args.uniform
+    print(str(uniform_int(args.seed, mn, mx)))
+    sys.exit(0)
+
+  # Draw gaussian and truncate
+  v = truncated_normal(args.seed, args.mu, args.sigma, args.mn, args.mx)
+  print(f"{v:.6f}")
+  sys.exit(0)
+
+if __name__ == '__main__':
+  main()
@@ -0,0 +1,37 @@
+import pytest
+
+from check_diearea import check_polygon
+
+SQUARE = [(0, 0), (0, 10), (10, 10), (10, 0)]
+
+def categories(issues):
+    return [issue["category"] for issue in issues]
+
+@pytest.mark.parametrize("points, expected", [
+    # Legal clockwise L shape
+    ([(0, 0), (0, 10), (5, 10), (5, 5), (10, 5), (10, 0)], []),
+    # Legal notch in the bottom edge
+    ([(0, 0), (0, 10), (10, 10), (10, 0), (7, 0), (7, 5), (3, 5), (3, 0)], []),
+    (SQUARE + [(0, 0)], ["repeated_closing_vertex"]),
+    ([(0, 0), (0, 10), (0, 10), (10, 10), (10, 0)], ["zero_length_edge"]),
+    ([(0, 0), (0, 5), (0, 10), (10, 10), (10, 0)], ["collinear_edges"]),
+    ([(0, 0), (0, 10), (10, 10), (12, 0)], ["non_rectilinear"]),
+    ([(0, 0), (0, 10), (6, 10), (6, 4), (12, 4), (12, 7), (3, 7), (3, 0)], ["self_intersection"]),
+    # Two squares pinched together at ( 5 5 )
+    ([(0, 0), (0, 5), (5, 5), (5, 10), (10, 10), (10, 5), (5, 5), (5, 0)],
+     ["repeated_vertex", "self_touching", "self_touching", "self_touching", "self_touching"]),
+    ([(0, 0), (0, 10)], ["zero_area"]),
+    ([(0, 0), (0, 10), (10, 10)], ["too_few_vertices"]),
+])
+def test_violation_categories(points, expected):
+    violations, warnings = check_polygon(points)
+    assert categories(violations) == expected
+    assert warnings == []
+
+def test_counter_clockwise_is_only_a_warning():
+    violations, warnings = check_polygon(SQUARE[::-1])
+    assert violations == []
+    assert categories(warnings) == ["orientation"]
+
+def test_rectangle_diearea_is_legal():
+    assert check_polygon([(0, 0), (4000000, 3000000)]) == ([], [])
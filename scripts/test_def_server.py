@@ -0,0 +1,69 @@
+import os
+
+import pytest
+
+import def_server
+from def_server import DEFService
+from generate_def import DEFGenerator
+
+DIEAREA = "DIEAREA ( 0 0 ) ( 0 1600000 ) ( 2000000 1600000 ) ( 2000000 0 ) ;"
+
+@pytest.fixture
+def roots(tmp_path):
+    """(service, input root, a template DEF outside the input root)"""
+    input_root = tmp_path / "in"
+    input_root.mkdir()
+    outside = tmp_path / "outside.def"
+    DEFGenerator().generate_def_file(2000000, 1600000, str(outside), "outside")
+    (input_root / "template.def").write_bytes(outside.read_bytes())
+    service = DEFService(input_root=str(input_root), output_root=str(tmp_path))
+    return service, input_root, outside
+
+def test_template_inside_input_root(roots):
+    service, _, _ = roots
+    response = service.handle({"op": "modify", "template": "template.def", "diearea": DIEAREA})
+    assert response["ok"], response
+    assert response["diearea"] == DIEAREA
+
+@pytest.mark.parametrize("template", ["../outside.def", "sub/../../outside.def", "absolute"])
+def test_template_outside_input_root_is_rejected(roots, template):
+    service, _, outside = roots
+    if template == "absolute":
+        template = str(outside)
+    response = service.handle({"op": "modify", "template": template, "diearea": DIEAREA})
+    assert not response["ok"]
+    assert "template must be a relative path" in response["error"]
+
+def test_symlink_out_of_input_root_is_rejected(roots):
+    service, input_root, outside = roots
+    os.symlink(outside, input_root / "link.def")
+    response = service.handle({"op": "validate", "def_file": "link.def"})
+    assert not response["ok"]
+    assert "leads outside its root" in response["error"]
+
+@pytest.mark.parametrize("fields", [
+    {"op": "validate", "def_file": "../outside.def"},
+    {"op": "render", "def_file": "../outside.def"},
+    {"op": "modify", "template": "template.def", "image": "../floorplan.png", "width": 10, "height": 10},
+    {"op": "generate", "width": 2000000, "height": 1600000, "config": "../config.json"},
+    {"op": "generate", "width": 2000000, "height": 1600000, "lef": ["../cells.lef"]},
+])
+def test_every_input_path_is_confined(roots, fields):
+    service, _, _ = roots
+    response = service.handle(fields)
+    assert not response["ok"]
+    assert "must be a relative path" in response["error"]
+
+def test_warm_state_is_bounded(roots, monkeypatch):
+    service, input_root, _ = roots
+    monkeypatch.setattr(def_server, "MAX_GENERATORS", 2)
+    monkeypatch.setattr(def_server, "MAX_TEMPLATES", 2)
+    for i in range(4):
+        (input_root / f"config{i}.json").write_text("{}")
+        (input_root / f"template{i}.def").write_bytes((input_root / "template.def").read_bytes())
+        for op, field, name in (("generate", "config", f"config{i}.json"), ("modify", "template", f"template{i}.def")):
+            response = service.handle({"op": op, field: name, "width": 2000000, "height": 1600000,
+                                       "diearea": DIEAREA})
+            assert response["ok"], response
+    assert [os.path.basename(key[0]) for key in service._generators] == ["config2.json", "config3.json"]
+    assert [os.path.basename(key) for key in service._templates] == ["template2.def", "template3.def"]
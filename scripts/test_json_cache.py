@@ -0,0 +1,20 @@
+import os
+
+from json_cache import JsonCache
+
+def test_namespaces_do_not_evict_each_other(tmp_path):
+    outlines = JsonCache(str(tmp_path), 200, "outlines")
+    lef = JsonCache(str(tmp_path), 200, "lef")
+    lef.put("cells", {"macros": ["a"]})
+    for k in range(20):
+        outlines.put(f"image{k}", {"corners": [[k, k], [k + 1, k + 1]]})
+    # The outline budget forced evictions, none of them in the lef namespace
+    assert len(os.listdir(tmp_path / "outlines")) < 20
+    assert lef.get("cells") == {"macros": ["a"]}
+    assert sorted(os.listdir(tmp_path)) == ["lef", "outlines"]
+
+def test_writes_stay_within_budget(tmp_path):
+    cache = JsonCache(str(tmp_path), 100)
+    for k in range(10):
+        cache.put(f"entry{k}", list(range(10)))
+    assert sum(entry.stat().st_size for entry in os.scandir(tmp_path)) <= 100
@@ -0,0 +1,135 @@
+import random
+
+import pytest
+
+from rectilinear import subtract_rectangles
+
+DIE = (0, 0, 1000, 800)
+
+def raster_free(die, rects):
+    """Unit cells of an integer die left uncovered by rects"""
+    x0, y0, x1, y1 = die
+    free = {(x, y) for x in range(x0, x1) for y in range(y0, y1)}
+    for rx0, ry0, rx1, ry1 in rects:
+        for x in range(max(min(rx0, rx1), x0), min(max(rx0, rx1), x1)):
+            for y in range(max(min(ry0, ry1), y0), min(max(ry0, ry1), y1)):
+                free.discard((x, y))
+    return free
+
+def _components(cells):
+    cells = set(cells)
+    count = 0
+    while cells:
+        count += 1
+        stack = [cells.pop()]
+        while stack:
+            x, y = stack.pop()
+            for n in ((x + 1, y), (x - 1, y), (x, y + 1), (x, y - 1)):
+                if n in cells:
+                    cells.remove(n)
+                    stack.append(n)
+    return count
+
+def raster_is_simple(die, free):
+    """
+    The free cells form one simple polygon: they are 4-connected, the covered
+    cells plus a ring around the die are 4-connected (no hole), and no 2x2
+    block is a diagonal checkerboard (no pinch).
+    """
+    x0, y0, x1, y1 = die
+    if not free or _components(free) != 1:
+        return False
+    covered = {(x, y) for x in range(x0 - 1, x1 + 1) for y in range(y0 - 1, y1 + 1)} - free
+    if _components(covered) != 1:
+        return False
+    for x in range(x0 - 1, x1):
+        for y in range(y0 - 1, y1):
+            a, b, c, d = ((x, y) in free, (x + 1, y + 1) in free, (x + 1, y) in free, (x, y + 1) in free)
+            if a == b and c == d and a != c:
+                return False
+    return True
+
+def raster_polygon(points, die):
+    """Unit cells whose centers lie inside the polygon (crossings of the vertical edges)"""
+    x0, y0, x1, y1 = die
+    vertical = [(xa, min(ya, yb), max(ya, yb)) for (xa, ya), (xb, yb) in zip(points, points[1:] + points[:1])
+                if xa == xb]
+    inside = set()
+    for y in range(y0, y1):
+        cy = y + 0.5
+        crossings = sorted(x for x, lo, hi in vertical if lo < cy < hi)
+        for left, right in zip(crossings[::2], crossings[1::2]):
+            inside.update((x, y) for x in range(left, right))
+    return inside
+
+def assert_well_formed(points):
+    """Clockwise, rectilinear, no repeated or collinear vertices, starting at the lowest then leftmost vertex"""
+    n = len(points)
+    assert n >= 4 and len(set(points)) == n
+    assert points[0] == min(points, key=lambda p: (p[1], p[0]))
+    for i in range(n):
+        (xp, yp), (x, y), (xn, yn) = points[i - 1], points[i], points[(i + 1) % n]
+        assert (x == xn) != (y == yn), f"edge {i} is not axis-parallel"
+        assert not (xp == x == xn or yp == y == yn), f"vertex {i} is collinear"
+    area2 = sum(xa * yb - xb * ya for (xa, ya), (xb, yb) in zip(points, points[1:] + points[:1]))
+    assert area2 < 0, "vertices are not clockwise"
+
+# Outputs of the original edge/corner bucket stitching for one cutout per bucket
+@pytest.mark.parametrize("rects, expected", [
+    ([(1000, 800, 700, 600)], [(0, 0), (0, 800), (700, 800), (700, 600), (1000, 600), (1000, 0)]),
+    ([(1000, 0, 700, 200)], [(0, 0), (0, 800), (1000, 800), (1000, 200), (700, 200), (700, 0)]),
+    ([(0, 800, 300, 600)], [(0, 0), (0, 600), (300, 600), (300, 800), (1000, 800), (1000, 0)]),
+    ([(0, 0, 300, 200)], [(300, 0), (300, 200), (0, 200), (0, 800), (1000, 800), (1000, 0)]),
+    ([(0, 300, 200, 500)], [(0, 0), (0, 300), (200, 300), (200, 500), (0, 500), (0, 800), (1000, 800), (1000, 0)]),
+    ([(400, 800, 600, 600)], [(0, 0), (0, 800), (400, 800), (400, 600), (600, 600), (600, 800), (1000, 800),
+                              (1000, 0)]),
+    ([(1000, 300, 800, 500)], [(0, 0), (0, 800), (1000, 800), (1000, 500), (800, 500), (800, 300), (1000, 300),
+                               (1000, 0)]),
+    ([(400, 0, 600, 200)], [(0, 0), (0, 800), (1000, 800), (1000, 0), (600, 0), (600, 200), (400, 200), (400, 0)]),
+    ([(0, 0, 300, 200), (1000, 800, 700, 600)],
+     [(300, 0), (300, 200), (0, 200), (0, 800), (700, 800), (700, 600), (1000, 600), (1000, 0)]),
+])
+def test_bucket_cases_match_baseline(rects, expected):
+    assert subtract_rectangles(DIE, rects) == expected
+
+def test_edge_notch_reaching_a_corner():
+    # A left-edge notch that runs up to the top-left corner becomes a corner notch
+    points = subtract_rectangles(DIE, [(0, 300, 200, 800)])
+    assert points == [(0, 0), (0, 300), (200, 300), (200, 800), (1000, 800), (1000, 0)]
+
+def test_notches_touching_at_a_corner_merge():
+    points = subtract_rectangles(DIE, [(0, 0, 300, 200), (300, 0, 500, 100)])
+    assert points == [(500, 0), (500, 100), (300, 100), (300, 200), (0, 200), (0, 800), (1000, 800), (1000, 0)]
+
+@pytest.mark.parametrize("rects, message", [
+    ([(400, 300, 600, 500)], "hole"),
+    ([(400, 0, 600, 800)], "split"),
+    ([(0, 0, 500, 400), (500, 400, 1000, 800)], "pinch"),
+    ([(0, 0, 1000, 800)], "whole die"),
+])
+def test_rejected_remainders(rects, message):
+    with pytest.raises(ValueError, match=message):
+        subtract_rectangles(DIE, rects)
+
+def test_random_rectangles_against_raster():
+    rng = random.Random(12)
+    die = (0, 0, 24, 18)
+    accepted = rejected = 0
+    for _ in range(600):
+        rects = []
+        for _ in range(rng.randint(1, 6)):
+            x, y = rng.randint(-2, die[2] + 1), rng.randint(-2, die[3] + 1)
+            rects.append((x, y, x + rng.randint(-10, 10), y + rng.randint(-8, 8)))
+        free = raster_free(die, rects)
+        try:
+            points = subtract_rectangles(die, rects)
+        except ValueError:
+            assert not raster_is_simple(die, free), rects
+            rejected += 1
+            continue
+        assert raster_is_simple(die, free), rects
+        assert_well_formed(points)
+        assert raster_polygon(points, die) == free, rects
+        accepted += 1
+    # Both outcomes are exercised
+    assert accepted > 100 and rejected > 50
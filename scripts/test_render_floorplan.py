@@ -0,0 +1,21 @@
+import pytest
+
+from render_floorplan import render_floorplan, render_job, render_tile
+
+ZERO_HEIGHT = {"points": [(0, 0), (0, 0), (1000, 0), (1000, 0)], "rows": [], "tracks": {"X": [], "Y": []}}
+OPTIONS = {"rows": False, "tracks": False, "size": 100, "mosaic": True, "tile_size": (40, 30)}
+
+@pytest.mark.parametrize("render", [lambda plan: render_floorplan(plan, 100), lambda plan: render_tile(plan, 40, 30)])
+def test_zero_height_plan_is_a_value_error(render):
+    with pytest.raises(ValueError, match="zero width or height"):
+        render(ZERO_HEIGHT)
+
+def test_zero_height_def_is_reported_per_job(tmp_path):
+    def_file = tmp_path / "flat.def"
+    def_file.write_text("VERSION 5.8 ;\nDESIGN flat ;\nDIEAREA ( 0 0 ) ( 1000 0 ) ;\nEND DESIGN\n")
+    error = "DIEAREA has zero width or height: 1000 x 0"
+    assert render_job((str(def_file), None, OPTIONS)) == (str(def_file), None, error)
+
+def test_tile_fits_the_box():
+    plan = dict(ZERO_HEIGHT, points=[(0, 0), (0, 500), (1000, 500), (1000, 0)])
+    assert render_tile(plan, 40, 30).shape[:2] == (20, 40)
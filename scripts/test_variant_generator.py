@@ -0,0 +1,64 @@
+import json
+import os
+import shutil
+import subprocess
+import sys
+from collections import Counter
+
+import pytest
+
+import instrumentation
+from generate_def import DEFGenerator
+from variant_generator import VariantGenerator
+
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+NUM_VARIANTS = 3
+
+@pytest.mark.skipif(shutil.which("bash") is None, reason="bash is not available")
+def test_matches_default_modifier_sh(tmp_path):
+    """default_modifier.sh and VariantGenerator write byte-identical variants for the same seeds"""
+    input_def = tmp_path / "input.def"
+    DEFGenerator().generate_def_file(2000000, 1600000, str(input_def), "parity")
+
+    # The driver's settings live at its top; point them at the temporary files
+    with open(os.path.join(SCRIPTS_DIR, "default_modifier.sh"), 'r', encoding='utf-8') as f:
+        script = f.read()
+    script = (script.replace('PY_SCRIPT="modify_def.py"', f'PY_SCRIPT="{os.path.join(SCRIPTS_DIR, "modify_def.py")}"')
+                    .replace('INPUT_DEF="input_file.def"', f'INPUT_DEF="{input_def}"')
+                    .replace('OUT_DIR="out_defs"', f'OUT_DIR="{tmp_path / "shell"}"')
+                    .replace('$(dirname "$0")', SCRIPTS_DIR))
+    driver = tmp_path / "default_modifier.sh"
+    driver.write_text(script, encoding='utf-8')
+    env = dict(os.environ, PATH=os.path.dirname(sys.executable) + os.pathsep + os.environ.get("PATH", ""))
+    env.pop("ASPECT_CENTER", None)
+    subprocess.run(["bash", str(driver), str(NUM_VARIANTS)], cwd=tmp_path, env=env, check=True,
+                   capture_output=True)
+
+    success, fail = VariantGenerator().generate(str(input_def), str(tmp_path / "python"), NUM_VARIANTS)
+    assert (success, fail) == (NUM_VARIANTS, 0)
+    for i in range(1, NUM_VARIANTS + 1):
+        name = f"small_rects_{i:03d}.def"
+        assert (tmp_path / "shell" / name).read_bytes() == (tmp_path / "python" / name).read_bytes(), name
+
+def test_shards_profile_like_a_full_run(tmp_path, monkeypatch):
+    """Corner-state replays of sharded runs are not counted, so the shards add up to the full run"""
+    input_def = tmp_path / "input.def"
+    DEFGenerator().generate_def_file(2000000, 1600000, str(input_def), "profile")
+    monkeypatch.setattr(instrumentation, "_recorder", None)
+    for name in (instrumentation.PROFILE_ENV, instrumentation.PROFILE_FORMAT_ENV):
+        monkeypatch.delenv(name, raising=False)
+    profile = tmp_path / "profile.jsonl"
+    instrumentation.configure(str(profile))
+
+    VariantGenerator().generate(str(input_def), str(tmp_path / "full"), 30)
+    for k in range(3):
+        VariantGenerator().generate(str(input_def), str(tmp_path / "shards"), indices=range(k + 1, 31, 3))
+    full, *shards = [json.loads(line) for line in profile.read_text().splitlines()]
+
+    def totals(records):
+        counters, calls = Counter(), Counter()
+        for record in records:
+            counters.update(record["counters"])
+            calls.update({name: entry["calls"] for name, entry in record["stages"].items() if name != "read_def"})
+        return counters, calls
+    assert totals(shards) == totals([full])
@@ -0,0 +1,897 @@
+import argparse
+import contextlib
+import os
+import re
+import sys
+
+import instrumentation
+from lef_reader import merge_lefs, tech_config
+from modify_def import generate_cutout_diearea, parse_diearea
+from netlist_reader import netlist_macros, netlist_summary
+from rectilinear import RectIndex, boundary_free_rects, pack_macros
+from rng_helper import stream, truncated_normal, uniform_int
+
+class _UnknownCorners(Exception):
+    """The variant being placed reads corner state left by a variant that was not generated"""
+
+class VariantGenerator:
+    """
+    In-process port of the *_modifier.sh batch drivers.
+
+    Uses the same seeded placement (eight edge/corner placement types, adjacency
+    alignment, overlap check, fallback cutout and gap snapping) and the same RNG
+    derivation as rng_helper.py, so a given configuration writes byte-identical
+    DEF files without spawning an interpreter per draw.
+
+    With sampler="free-space" the cutouts are instead drawn from the space that
+    is still free along the die boundary, so no draw is rejected; the output
+    then no longer matches the shell drivers.
+
+    Any variant can be generated on its own (variant(), or generate() with a
+    subset of indices), so runs can be sharded across processes or machines
+    and still write the same files as one serial run.
+    """
+
+    # Knobs read from the top of a *_modifier.sh script
+    PROFILE_KEYS = {
+        "OUTPUT_PREFIX": str,
+        "NUM_VARIANTS": int,
+        "MIN_RECTS": int,
+        "MAX_RECTS": int,
+        "MIN_DEPTH": int,
+        "MAX_DEPTH": int,
+        "MAX_TRIES_PER_RECT": int,
+        "MAX_ASPECT": float,
+        "CORNER_MARGIN_PCT": int,
+        "ASPECT_CENTER": str,
+    }
+
+    # Corner state of the shell drivers before the first try
+    INITIAL_CORNERS = (0, 0, 0, 0)
+
+    # Seed offset between the resampling attempts of one variant; far above any variant count
+    RESAMPLE_SEED_STRIDE = 1000003
+
+    # Start offset multipliers (s, tries) for edge types 0=left, 1=right, 2=bottom, 3=top
+    EDGE_START_MULT = {0: (97, 17), 1: (59, 23), 2: (83, 31), 3: (29, 41)}
+
+    # Span multipliers ((s, tries) for x, (s, tries) for y) for corner types
+    # 4=bottom-left, 5=bottom-right, 6=top-right, 7=top-left
+    CORNER_SPAN_MULT = {
+        4: ((11, 7), (13, 5)),
+        5: ((17, 3), (19, 11)),
+        6: ((23, 13), (29, 17)),
+        7: ((31, 19), (37, 23)),
+    }
+
+    def __init__(self, config=None):
+        """
+        Initialize with the default_modifier.sh settings
+
+        Args:
+            config (dict): Overrides for any of the default settings
+        """
+        self.config = {
+            "output_prefix": "small_rects",
+            "num_variants": 20,
+            "min_rects": 1,
+            "max_rects": 6,
+            "min_depth": 100000,
+            "max_depth": 500000,
+            "max_tries_per_rect": 80,
+            "corner_margin_pct": 30,
+            # Kept as the string the shell passes to rng_helper.py --mu
+            "aspect_center": "1.3",
+            "sigma": 0.30,
+            "seed_base": 1000,
+            # "uniform": corner spans from the seed arithmetic (default_modifier.sh)
+            # "aspect": corner spans from aspect-ratio draws (tr_modifier.sh)
+            "corner_mode": "uniform",
+            # Extra spacing enforced between cutouts (the shell's cutout_conflict buffer)
+            "buffer": 0,
+            # "shell": rejection tries as in the shell drivers
+            # "free-space": draw from the free space left along the die boundary
+            "sampler": "shell",
+            # Cap on span/depth (either way round); only the free-space sampler uses it
+            "max_aspect": 5,
+            # (width, height) in DBU per macro instance the die must still hold;
+            # variants that cannot are resampled up to macro_fit_retries times
+            "macros": [],
+            "macro_halo": 0,
+            "macro_fit_retries": 10,
+            # Design part of the free-space sampler's stream keys; None uses the DESIGN of the input DEF
+            "stream_design": None,
+        }
+        if config:
+            self.config.update(config)
+
+        # The shell drivers keep their loop variables as globals, so the
+        # top-edge branch (which never assigns the cutout corners) reuses the
+        # corners of the previous try. Keep that state for output parity.
+        self._corners = self.INITIAL_CORNERS
+        self.fallback_count = 0
+        self._base = None
+
+    @classmethod
+    def load_shell_profile(cls, script_path):
+        """Read the uncommented knob assignments from a *_modifier.sh script"""
+        profile = {}
+        with open(script_path, 'r', encoding='utf-8') as f:
+            for line in f:
+                if '--seed "$((s+tries+' in line:
+                    profile["corner_mode"] = "aspect"
+                m = re.match(r'\s*([A-Z_]+)=("?)(\S*?)\2(\s|$)', line)
+                if not m or m.group(1) not in cls.PROFILE_KEYS:
+                    continue
+                value = m.group(3)
+                # ${1:-20} / ${ASPECT_CENTER:-1.3} style defaults
+                default = re.match(r'\$\{[^:}]+:-([^}]*)\}', value)
+                if default:
+                    value = default.group(1)
+                profile[m.group(1).lower()] = cls.PROFILE_KEYS[m.group(1)](value)
+        return profile
+
+    def aspect_bounds(self):
+        """Truncation bounds as formatted by the shell's awk (center/2, center*2)"""
+        center = float(self.config["aspect_center"])
+        return float(f"{center / 2:.6f}"), float(f"{center * 2:.6f}")
+
+    def sample_aspect(self, seed):
+        """Truncated-normal aspect ratio, rounded as rng_helper.py prints it"""
+        aspect_min, aspect_max = self.aspect_bounds()
+        r = truncated_normal(str(seed), float(self.config["aspect_center"]),
+                             self.config["sigma"], aspect_min, aspect_max)
+        return float(f"{r:.6f}")
+
+    @staticmethod
+    def cutout_conflict(a, b, buffer=0):
+        """Return True if two cutouts (x1, y1, x2, y2) overlap; touching edges are allowed"""
+        ax1, ay1, ax2, ay2 = a
+        bx1, by1, bx2, by2 = b
+        ax1, ax2 = min(ax1, ax2) - buffer, max(ax1, ax2) + buffer
+        ay1, ay2 = min(ay1, ay2) - buffer, max(ay1, ay2) + buffer
+        bx1, bx2 = min(bx1, bx2) - buffer, max(bx1, bx2) + buffer
+        by1, by2 = min(by1, by2) - buffer, max(by1, by2) + buffer
+        return ax2 > bx1 and ax1 < bx2 and ay2 > by1 and ay1 < by2
+
+    def _edge_cutout(self, typ, die, depth, s, tries, adjacent):
+        """Placement types 0-3: a notch on one die edge (left, right, bottom, top)"""
+        x0, y0, x1, y1 = die
+        vertical = typ in (0, 1)
+        lo, hi = (y0, y1) if vertical else (x0, x1)
+        length = hi - lo
+
+        corner_margin = length * self.config["corner_margin_pct"] // 100
+        if corner_margin < 2:
+            corner_margin = 2
+        max_span = length // 3
+        avail = length - 2 * corner_margin
+        if avail < max_span:
+            max_span = avail
+
+        min_span = depth // 10
+        if min_span < 2:
+            min_span = 2
+        if max_span < min_span:
+            max_span = min_span
+
+        span_low = (depth + 1) // 2
+        span_high = depth * 2
+        if span_low < min_span:
+            span_low = min_span
+        if span_high > max_span:
+            span_high = max_span
+        if span_low > span_high:
+            span_low, span_high = min_span, max_span
+
+        if adjacent is not None:
+            ex_span, ey_span, ex_cx, ey_cy = adjacent
+            span = ey_span if vertical else ex_span
+            span = min(max(span, span_low), span_high)
+            center = ey_cy if vertical else ex_cx
+            if center < lo + corner_margin + span // 2:
+                center = lo + corner_margin + span // 2
+            if center > hi - corner_margin - span // 2:
+                center = hi - corner_margin - span // 2
+        else:
+            r = self.sample_aspect(s + tries)
+            span = int(r * depth + 0.5)
+            span = min(max(span, span_low), span_high)
+
+            start_min = lo + corner_margin
+            start_max = hi - corner_margin - span
+            if start_max < start_min:
+                start = start_min
+            else:
+                ms, mt = self.EDGE_START_MULT[typ]
+                start = start_min + (s * ms + tries * mt) % (start_max - start_min + 1)
+            center = start + span // 2
+
+        # Aspect coupling (span vs depth)
+        span = min(max(span, (depth + 1) // 2), depth * 2)
+        depth = min(max(depth, (span + 1) // 2), span * 2)
+
+        if typ == 3:
+            # Parity with the shell drivers: the top-edge branch leaves the
+            # corners of the previous try in place.
+            if self._corners is None:
+                raise _UnknownCorners()
+            return self._corners
+
+        near = center - span // 2
+        if near < lo:
+            near = lo
+        far = near + span
+        if far > hi:
+            far = hi
+            near = far - span
+
+        if typ == 0:
+            return (x0, near, x0 + depth, far)
+        if typ == 1:
+            return (x1, near, x1 - depth, far)
+        return (near, y0, far, y0 + depth)
+
+    def _corner_cutout(self, typ, die, depth, s, tries):
+        """Placement types 4-7: a notch anchored at one die corner"""
+        x0, y0, x1, y1 = die
+        min_depth = self.config["min_depth"]
+        max_depth = self.config["max_depth"]
+        orig_width, orig_height = x1 - x0, y1 - y0
+        (sx, tx), (sy, ty) = self.CORNER_SPAN_MULT[typ]
+
+        max_allowed_x = max_depth
+        if max_allowed_x > orig_width:
+            max_allowed_x = orig_width
+        if max_allowed_x < min_depth:
+            max_allowed_x = min_depth
+        if self.config["corner_mode"] == "aspect":
+            # Corner spans from two aspect draws (as in tr_modifier.sh)
+            span_x = int(self.sample_aspect(s + tries + sx) * depth + 0.5)
+            span_x = min(max(span_x, min_depth), max_allowed_x, orig_width)
+            span_y = int(self.sample_aspect(s + tries) * span_x + 0.5)
+        else:
+            span_x = min_depth + (s * sx + tries * tx) % (max_allowed_x - min_depth + 1)
+
+        min_y = (span_x + 1) // 2
+        if min_y < min_depth:
+            min_y = min_depth
+        max_y = span_x * 2
+        if max_y > max_depth:
+            max_y = max_depth
+        if max_y > orig_height:
+            max_y = orig_height
+        if self.config["corner_mode"] == "aspect":
+            span_y = min(max(span_y, min_y), max_y)
+        elif max_y < min_y:
+            span_y = min(min_y, max_y)
+        else:
+            span_y = min_y + (s * sy + tries * ty) % (max_y - min_y + 1)
+
+        if typ == 4:
+            return (x0, y0, x0 + span_x, y0 + span_y)
+        if typ == 5:
+            return (x1, y0, x1 - span_x, y0 + span_y)
+        if typ == 6:
+            return (x1, y1, x1 - span_x, y1 - span_y)
+        return (x0, y1, x0 + span_x, y1 - span_y)
+
+    @staticmethod
+    def normalize_cutout(die, cutout):
+        """Ensure the edge point is on the die boundary and the internal point strictly inside"""
+        x0, y0, x1, y1 = die
+        edge_x, edge_y, int_x, int_y = cutout
+
+        def on_boundary(x, y):
+            return x == x0 or x == x1 or y == y0 or y == y1
+
+        # If our "edge" is not on boundary but "internal" is, swap them.
+        if not on_boundary(edge_x, edge_y) and on_boundary(int_x, int_y):
+            edge_x, edge_y, int_x, int_y = int_x, int_y, edge_x, edge_y
+
+        # Clamp internal strictly inside (never negative; honor DIEAREA start)
+        if int_x <= x0: int_x = x0 + 1
+        if int_x >= x1: int_x = x1 - 1
+        if int_y <= y0: int_y = y0 + 1
+        if int_y >= y1: int_y = y1 - 1
+        if int_x < x0: int_x = x0
+        if int_y < y0: int_y = y0
+
+        # If degenerate (edge==internal), push internal toward die center
+        if int_x == edge_x and int_y == edge_y:
+            if edge_x == x0: int_x = edge_x + 1
+            elif edge_x == x1: int_x = edge_x - 1
+            if edge_y == y0: int_y = edge_y + 1
+            elif edge_y == y1: int_y = edge_y - 1
+            if int_x <= x0: int_x = x0 + 2
+            if int_x >= x1: int_x = x1 - 2
+            if int_y <= y0: int_y = y0 + 2
+            if int_y >= y1: int_y = y1 - 2
+
+        edge_on_boundary = on_boundary(edge_x, edge_y)
+        int_on_boundary = on_boundary(int_x, int_y)
+
+        # Case 1: both on boundary -> push internal inward safely
+        if edge_on_boundary and int_on_boundary:
+            if edge_x == x0: int_x = x0 + 2
+            if edge_x == x1: int_x = x1 - 2
+            if edge_y == y0: int_y = y0 + 2
+            if edge_y == y1: int_y = y1 - 2
+            if int_x <= x0: int_x = x0 + 2
+            if int_x >= x1: int_x = x1 - 2
+            if int_y <= y0: int_y = y0 + 2
+            if int_y >= y1: int_y = y1 - 2
+
+        # Case 2: neither on boundary -> move edge to nearest boundary
+        if not edge_on_boundary and not int_on_boundary:
+            min_dx, nearest_x = edge_x - x0, x0
+            if x1 - edge_x < min_dx:
+                min_dx, nearest_x = x1 - edge_x, x1
+            min_dy, nearest_y = edge_y - y0, y0
+            if y1 - edge_y < min_dy:
+                min_dy, nearest_y = y1 - edge_y, y1
+            if min_dx <= min_dy:
+                edge_x = nearest_x
+            else:
+                edge_y = nearest_y
+
+        # Final strict inside clamp for internal point
+        if int_x <= x0: int_x = x0 + 2
+        if int_x >= x1: int_x = x1 - 2
+        if int_y <= y0: int_y = y0 + 2
+        if int_y >= y1: int_y = y1 - 2
+
+        return (edge_x, edge_y, int_x, int_y)
+
+    @staticmethod
+    def snap_gaps(die, cutouts):
+        """
+        Snap tiny gaps (<=2% of die size) between cutouts to remove seams
+
+        Pairs are visited in the same order as the all-pairs loop of the shell
+        drivers, but only those within the snapping distance of each other
+        (looked up in a RectIndex) are examined; the others never snap.
+        """
+        x0, y0, x1, y1 = die
+        cutouts = [list(c) for c in cutouts]
+        n = len(cutouts)
+        thr_x = max((x1 - x0) // 50, 1)
+        thr_y = max((y1 - y0) // 50, 1)
+
+        minx = [min(c[0], c[2]) for c in cutouts]
+        maxx = [max(c[0], c[2]) for c in cutouts]
+        miny = [min(c[1], c[3]) for c in cutouts]
+        maxy = [max(c[1], c[3]) for c in cutouts]
+
+        def edge_idx(c):
+            px, py = c[0], c[1]
+            return 0 if (px == x0 or px == x1 or py == y0 or py == y1) else 1
+
+        def snap(k, axis, new):
+            # Move the near side of cutout k (on the given axis) to new
+            c = cutouts[k]
+            if edge_idx(c) == 0:
+                if c[axis] <= c[axis + 2]:
+                    c[axis] = new
+                    return True
+            elif c[axis + 2] <= c[axis]:
+                c[axis + 2] = new
+                return True
+            return False
+
+        index = RectIndex(max(thr_x, thr_y, max(maxx[k] - minx[k] for k in range(n))))
+        for k in range(n):
+            index.insert(k, (minx[k], miny[k], maxx[k], maxy[k]))
+
+        def neighbours(ri, after):
+            box = (minx[ri], miny[ri], maxx[ri], maxy[ri])
+            return sorted(k for k in index.query(box, thr_x, thr_y) if k > after)
+
+        for ri in range(n):
+            pending = neighbours(ri, ri)
+            while pending:
+                rj = pending.pop(0)
+                moved = False
+                # Horizontal snapping
+                for a, b in ((ri, rj), (rj, ri)):
+                    if maxx[a] < minx[b]:
+                        gap = minx[b] - maxx[a]
+                        ov = max(min(maxy[ri], maxy[rj]) - max(miny[ri], miny[rj]), 0)
+                        if 0 < gap <= thr_x and ov > 0 and snap(b, 0, maxx[a]):
+                            minx[b] = maxx[a]
+                            moved = True
+                        break
+                # Vertical snapping
+                for a, b in ((ri, rj), (rj, ri)):
+                    if maxy[a] < miny[b]:
+                        gap = miny[b] - maxy[a]
+                        ov = max(min(maxx[ri], maxx[rj]) - max(minx[ri], minx[rj]), 0)
+                        if 0 < gap <= thr_y and ov > 0 and snap(b, 1, maxy[a]):
+                            miny[b] = maxy[a]
+                            moved = True
+                        break
+                if moved:
+                    index.insert(ri, (minx[ri], miny[ri], maxx[ri], maxy[ri]))
+                    index.insert(rj, (minx[rj], miny[rj], maxx[rj], maxy[rj]))
+                    # A grown ri can reach cutouts that were out of range before
+                    pending = neighbours(ri, rj)
+
+        return [tuple(c) for c in cutouts]
+
+    @staticmethod
+    def _anchored_cutout(typ, die, start, span, depth):
+        """Cutout of a placement type from its start along the edge, span along the edge and inward depth"""
+        x0, y0, x1, y1 = die
+        if typ == 0:
+            return (x0, start, x0 + depth, start + span)
+        if typ == 1:
+            return (x1, start, x1 - depth, start + span)
+        if typ == 2:
+            return (start, y0, start + span, y0 + depth)
+        if typ == 3:
+            return (start, y1, start + span, y1 - depth)
+        if typ == 4:
+            return (x0, y0, x0 + span, y0 + depth)
+        if typ == 5:
+            return (x1, y0, x1 - span, y0 + depth)
+        if typ == 6:
+            return (x1, y1, x1 - span, y1 - depth)
+        return (x0, y1, x0 + span, y1 - depth)
+
+    def place_cutouts_free(self, die, i, attempt=0):
+        """
+        Place the cutouts of variant i by drawing from the remaining free space.
+
+        Every draw picks a placement type that still has room, one of the
+        maximal empty rectangles anchored to that edge or corner, a depth
+        that fits it and a span from the aspect draw, so nothing is rejected
+        and MIN_RECTS..MAX_RECTS cutouts are placed unless the boundary is full.
+        Cutout j draws from its own stream keyed by (design, die size,
+        variant seed, attempt, j).
+        """
+        x0, y0, x1, y1 = die
+        orig_width, orig_height = x1 - x0, y1 - y0
+        cfg = self.config
+
+        seed = cfg["seed_base"] + i + attempt * self.RESAMPLE_SEED_STRIDE
+        rects = (seed * 7) % (cfg["max_rects"] - cfg["min_rects"] + 1) + cfg["min_rects"]
+        design = cfg["stream_design"] or (self._base["design"] if self._base else "design")
+        size_class = f"{orig_width}x{orig_height}"
+
+        maxd = min(cfg["max_depth"], orig_width // 2, orig_height // 2)
+        min_depth = max(cfg["min_depth"], 2)
+        center = float(cfg["aspect_center"])
+        aspect_min, aspect_max = self.aspect_bounds()
+        aspect_min = max(aspect_min, 1 / cfg["max_aspect"])
+        aspect_max = max(min(aspect_max, cfg["max_aspect"]), aspect_min)
+        margins = tuple(max(length * cfg["corner_margin_pct"] // 100, 2)
+                        for length in (orig_height, orig_height, orig_width, orig_width))
+
+        coords = []
+        for j in range(1, rects + 1):
+            rnd = stream(design, size_class, seed, attempt, j)
+            for _ in range(1000):
+                aspect = rnd.gauss(center, cfg["sigma"])
+                if aspect_min <= aspect <= aspect_max:
+                    break
+            else:
+                aspect = min(max(center, aspect_min), aspect_max)
+
+            # Free spans wide enough for min_depth at some aspect in range, per type
+            options = {}
+            free = boundary_free_rects(die, coords, maxd, margins, 2 * cfg["buffer"])
+            for typ, spaces in free.items():
+                for lo, hi, room in spaces:
+                    width = hi - lo if typ < 4 else min(hi - lo, maxd)
+                    fit = min(aspect, width / min_depth)
+                    if room >= min_depth and fit >= aspect_min:
+                        options.setdefault(typ, []).append((lo, hi, width, room, fit))
+            if not options:
+                break
+
+            typ = rnd.choice(sorted(options))
+            lo, hi, width, room, fit = rnd.choice(options[typ])
+            depth = rnd.randint(min_depth, max(min_depth, min(room, int(width / fit))))
+            span = min(max(int(fit * depth + 0.5), 1), width)
+            if typ < 4:
+                start = lo + rnd.randint(0, width - span)
+            else:
+                start = lo if typ in (4, 7) else hi - span
+            cutout = self._anchored_cutout(typ, die, start, span, depth)
+            coords.append(self.normalize_cutout(die, cutout))
+        instrumentation.count("cutout_tries", len(coords))
+        instrumentation.count("cutouts_placed", len(coords))
+        instrumentation.count("cutouts_dropped", rects - len(coords))
+
+        if not coords:
+            coords = [(x0, y0, x0 + cfg["min_depth"], y0 + cfg["min_depth"])]
+            self.fallback_count += 1
+            instrumentation.count("fallbacks")
+
+        if len(coords) > 1:
+            coords = self.snap_gaps(die, coords)
+
+        return coords
+
+    def place_cutouts(self, die, i, attempt=0):
+        """
+        Place the cutouts of variant i; returns a list of (edge_x, edge_y, int_x, int_y).
+        A non-zero attempt draws a different placement for the same variant.
+        """
+        if self.config["sampler"] == "free-space":
+            return self.place_cutouts_free(die, i, attempt)
+
+        x0, y0, x1, y1 = die
+        orig_width, orig_height = x1 - x0, y1 - y0
+        cfg = self.config
+        min_depth, max_depth = cfg["min_depth"], cfg["max_depth"]
+
+        seed = cfg["seed_base"] + i + attempt * self.RESAMPLE_SEED_STRIDE
+        rects = (seed * 7) % (cfg["max_rects"] - cfg["min_rects"] + 1) + cfg["min_rects"]
+        coords = []
+        buffer = cfg["buffer"]
+        # Placed cutouts by position in coords, for the conflict checks
+        placed = RectIndex(max(max_depth, 1))
+
+        for j in range(1, rects + 1):
+            for tries in range(1, cfg["max_tries_per_rect"] + 1):
+                s = seed + j * 37 + tries * 13
+
+                # Random inward depth, clamped to <= half die size
+                maxd = min(max_depth, orig_width // 2, orig_height // 2)
+                if maxd < min_depth:
+                    depth = min_depth
+                else:
+                    depth = min_depth + (s * 97 + j * 53) % (maxd - min_depth + 1)
+                if depth < 2:
+                    depth = 2
+
+                typ = uniform_int(f"{seed}_{j}_{tries}", 0, 7)
+
+                adjacent = None
+                if coords and s % 100 < 30:
+                    ex1, ey1, ex2, ey2 = coords[(s * 3 + j + tries) % len(coords)]
+                    ex_min, ex_max = min(ex1, ex2), max(ex1, ex2)
+                    ey_min, ey_max = min(ey1, ey2), max(ey1, ey2)
+                    adjacent = (ex_max - ex_min, ey_max - ey_min,
+                                (ex_min + ex_max) // 2, (ey_min + ey_max) // 2)
+
+                if typ < 4:
+                    cutout = self._edge_cutout(typ, die, depth, s, tries, adjacent)
+                else:
+                    cutout = self._corner_cutout(typ, die, depth, s, tries)
+                self._corners = cutout
+
+                # Both rectangles grow by the buffer, so look 2 * buffer around the candidate
+                nearby = placed.query(cutout, 2 * buffer, 2 * buffer)
+                if any(self.cutout_conflict(cutout, coords[k], buffer) for k in nearby):
+                    instrumentation.count("overlap_rejections")
+                    continue
+
+                cutout = self.normalize_cutout(die, cutout)
+                self._corners = cutout
+                placed.insert(len(coords), cutout)
+                coords.append(cutout)
+                instrumentation.count("cutouts_placed")
+                break
+            else:
+                instrumentation.count("cutouts_dropped")
+            instrumentation.count("cutout_tries", tries)
+
+        # If none placed, fallback to a minimal rectangle
+        if not coords:
+            coords = [(x0, y0, x0 + min_depth, y0 + min_depth)]
+            self.fallback_count += 1
+            instrumentation.count("fallbacks")
+
+        if len(coords) > 1:
+            coords = self.snap_gaps(die, coords)
+
+        return coords
+
+    def load_base(self, input_def):
+        """Read the rectangular input DEF the variants are cut from"""
+        with instrumentation.stage("read_def"), open(input_def, 'r', encoding='utf-8') as f:
+            lines = f.readlines()
+        self.set_base(lines, input_def)
+
+    def set_base(self, lines, name="the input DEF"):
+        """load_base for DEF lines already in memory"""
+        diearea_index = next((k for k, line in enumerate(lines)
+                              if line.strip().startswith("DIEAREA")), -1)
+        if diearea_index == -1:
+            raise ValueError(f"DIEAREA line not found in {name}")
+        original_corners = parse_diearea(lines[diearea_index])
+        (x0, y0), (x1, y1) = original_corners[0], original_corners[1]
+        design = next((line.split()[1] for line in lines
+                       if line.startswith("DESIGN ") and len(line.split()) > 1), "design")
+        self._base = {"lines": lines, "diearea_index": diearea_index, "corners": original_corners,
+                      "die": (x0, y0, x1, y1), "design": design}
+
+    def _run_variant(self, i, name=None):
+        """
+        Place variant i from the current corner state, resampling while the
+        macros do not fit; returns (DIEAREA line, None) or (None, error).
+        Progress is printed under name, if given.
+        """
+        die, original_corners = self._base["die"], self._base["corners"]
+        macros = [tuple(m) for m in self.config["macros"]]
+        attempts = self.config["macro_fit_retries"] + 1 if macros else 1
+        error = None
+        for attempt in range(attempts):
+            with instrumentation.stage("place"):
+                coords = self.place_cutouts(die, i, attempt)
+            if name:
+                print(f"Generating {name} with {len(coords)} rect(s)...")
+            try:
+                flat = [v for c in coords for v in c]
+                with instrumentation.stage("diearea"):
+                    diearea = generate_cutout_diearea(original_corners, flat)
+            except ValueError as e:
+                return None, e
+            if not macros:
+                return diearea, None
+            with instrumentation.stage("macro_fit"):
+                placement = pack_macros(parse_diearea(diearea), macros, self.config["macro_halo"])
+            if placement is not None:
+                return diearea, None
+            instrumentation.count("macro_fit_rejections")
+            error = f"{len(macros)} macro(s) do not fit after {attempt + 1} attempt(s)"
+        return None, error
+
+    def _entry_corners(self, i):
+        """
+        Corner state the shell drivers would enter variant i with, found without
+        generating 1..i-1: walk back to the latest variant whose placement does
+        not read the state before it, then replay forward from there. The
+        replayed variants are not emitted, so they are not profiled either.
+        """
+        fallbacks = self.fallback_count
+        k = i - 1
+        with instrumentation.suspended():
+            while k >= 1:
+                self._corners = None
+                try:
+                    self._run_variant(k)
+                except _UnknownCorners:
+                    k -= 1
+                    continue
+                if self._corners is not None:
+                    break
+                k -= 1
+            state = self._corners if k >= 1 else self.INITIAL_CORNERS
+            for j in range(k + 1, i):
+                self._corners = state
+                self._run_variant(j)
+                state = self._corners
+        self.fallback_count = fallbacks
+        return state
+
+    def _seek_variant(self, i, name=None):
+        """_run_variant for a variant not preceded by i - 1 in this run"""
+        profiling = instrumentation.enabled()
+        fallbacks = self.fallback_count
+        self._corners = None
+        try:
+            # A probe that stops at the unknown corner state would count its
+            # first tries twice, so while profiling it is not recorded and is
+            # run again below once it is known to succeed
+            with instrumentation.suspended() if profiling else contextlib.nullcontext():
+                result = self._run_variant(i, None if profiling else name)
+        except _UnknownCorners:
+            self._corners = self._entry_corners(i)
+            return self._run_variant(i, name)
+        if not profiling:
+            return result
+        self.fallback_count = fallbacks
+        self._corners = None
+        return self._run_variant(i, name)
+
+    def dieareas(self, indices):
+        """
+        DIEAREA lines of the given variants (load_base first); runs of consecutive
+        numbers continue the corner state like a serial run, others seek
+
+        Yields:
+            tuple: (i, DIEAREA line, None) or (i, None, error)
+        """
+        previous = None
+        for i in indices:
+            if previous is not None and i == previous + 1:
+                diearea, error = self._run_variant(i)
+            else:
+                diearea, error = self._seek_variant(i)
+            previous = i
+            yield i, diearea, error
+
+    def variant(self, i):
+        """
+        DEF lines of variant i, computed on its own (load_base first); the
+        result equals the file a full serial run writes for i
+
+        Returns:
+            tuple: (list of lines, None) or (None, error)
+        """
+        diearea, error = self._seek_variant(i)
+        if error is not None:
+            return None, error
+        lines = list(self._base["lines"])
+        lines[self._base["diearea_index"]] = diearea + '\n'
+        return lines, None
+
+    def generate(self, input_def, out_dir, num_variants=None, indices=None):
+        """
+        Write num_variants cutout variants of input_def into out_dir
+
+        Args:
+            indices (list): Only write these variant numbers (1-based), e.g. one
+                            shard of a run; each file is the same as in a full run
+
+        Returns:
+            tuple: (success, fail) counts
+        """
+        if num_variants is None:
+            num_variants = self.config["num_variants"]
+        if indices is None:
+            indices = range(1, num_variants + 1)
+
+        self.load_base(input_def)
+        lines = self._base["lines"]
+        diearea_index = self._base["diearea_index"]
+        os.makedirs(out_dir, exist_ok=True)
+        success = fail = 0
+        self._corners = self.INITIAL_CORNERS
+        previous = 0
+        for i in indices:
+            outf = os.path.join(out_dir, f"{self.config['output_prefix']}_{i:03d}.def")
+            # Consecutive variants continue from the corner state of the one before
+            if i == previous + 1:
+                diearea, error = self._run_variant(i, outf)
+            else:
+                diearea, error = self._seek_variant(i, outf)
+            previous = i
+            if error is not None:
+                with open(os.path.join(out_dir, f"err_{i}.log"), 'w') as f:
+                    f.write(f"Error: {error}\n")
+                print(f"modify_def failed for {i} (see err_{i}.log)")
+                fail += 1
+                continue
+            lines[diearea_index] = diearea + '\n'
+            with instrumentation.stage("write_def"), open(outf, 'w', encoding='utf-8') as f:
+                f.writelines(lines)
+            success += 1
+
+        instrumentation.count("variants_succeeded", success)
+        instrumentation.count("variants_failed", fail)
+        instrumentation.flush("variant_generator", input=input_def, out_dir=out_dir,
+                              sampler=self.config["sampler"])
+        return success, fail
+
+def parse_variant_list(text):
+    """Variant numbers from "3,10-12" style lists, sorted and without duplicates"""
+    indices = set()
+    for part in text.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        lo, _, hi = part.partition("-")
+        lo, hi = int(lo), int(hi or lo)
+        if lo < 1 or hi < lo:
+            raise ValueError(f"bad range {part}")
+        indices.update(range(lo, hi + 1))
+    return sorted(indices)
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Generate rectilinear DEF variants with rectangular cutouts in one process",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter
+    )
+    parser.add_argument("-i", "--input", type=str, required=True, help="Input rectangular .def file")
+    parser.add_argument("-o", "--out-dir", type=str, default="out_defs", help="Output directory")
+    parser.add_argument("-n", "--num-variants", type=int, help="Number of variants (default: from --from-script, else 20)")
+    parser.add_argument("--from-script", type=str,
+                        help="Read MIN_RECTS, MAX_DEPTH, ASPECT_CENTER, ... from a *_modifier.sh script")
+    parser.add_argument("--prefix", type=str, help="Output file prefix")
+    parser.add_argument("--min-rects", type=int)
+    parser.add_argument("--max-rects", type=int)
+    parser.add_argument("--min-depth", type=int)
+    parser.add_argument("--max-depth", type=int)
+    parser.add_argument("--max-tries-per-rect", type=int)
+    parser.add_argument("--corner-margin-pct", type=int)
+    parser.add_argument("--aspect-center", type=str)
+    parser.add_argument("--buffer", type=int, help="Minimum spacing between cutouts in DBU (default: 0, touching allowed)")
+    parser.add_argument("--max-aspect", type=float,
+                        help="Cap on span/depth for the free-space sampler (default: from --from-script, else 5)")
+    parser.add_argument("--sampler", choices=["shell", "free-space"],
+                        help="shell: rejection tries, byte-identical to the shell drivers (default); "
+                             "free-space: draw only cutouts that fit the remaining boundary space")
+    parser.add_argument("--profile", type=str,
+                        help="Record per-stage wall time, allocations and counters to this file: JSON lines, or a "
+                             "Prometheus textfile if it ends in .prom (also enabled by RZOO_PROFILE)")
+    parser.add_argument("--corner-mode", choices=["uniform", "aspect"],
+                        help="How corner cutout spans are drawn (default: from --from-script, else uniform)")
+    parser.add_argument("--shard", type=str, metavar="K/N",
+                        help="Only write variants i with (i - 1) %% N == K; the N shards together equal one full run")
+    parser.add_argument("--variants", type=str,
+                        help='Only (re)generate these variant numbers, e.g. "7" or "3,10-12"')
+    fit = parser.add_argument_group("macro fit", "Resample variants whose die can no longer hold the design's macros")
+    fit.add_argument("--macro", type=int, nargs=2, action="append", metavar=("W", "H"),
+                     help="Macro instance size in DBU (repeatable)")
+    fit.add_argument("--lef", type=str, nargs="+", help="LEF files or directories with the macro sizes (use with --netlist)")
+    fit.add_argument("--netlist", type=str, help="Gate-level Verilog whose BLOCK instances must fit")
+    fit.add_argument("--macro-halo", type=int, help="Clearance around each macro in DBU (default: 0)")
+    fit.add_argument("--macro-fit-retries", type=int, help="Resampling attempts per variant before it fails (default: 10)")
+
+    args = parser.parse_args()
+
+    config = {}
+    if args.from_script:
+        config.update(VariantGenerator.load_shell_profile(args.from_script))
+    # Same environment override the shell drivers honour
+    if os.environ.get("ASPECT_CENTER"):
+        config["aspect_center"] = os.environ["ASPECT_CENTER"]
+    overrides = {
+        "output_prefix": args.prefix,
+        "num_variants": args.num_variants,
+        "min_rects": args.min_rects,
+        "max_rects": args.max_rects,
+        "min_depth": args.min_depth,
+        "max_depth": args.max_depth,
+        "max_tries_per_rect": args.max_tries_per_rect,
+        "corner_margin_pct": args.corner_margin_pct,
+        "aspect_center": args.aspect_center,
+        "corner_mode": args.corner_mode,
+        "buffer": args.buffer,
+        "max_aspect": args.max_aspect,
+        "sampler": args.sampler,
+    }
+    config.update({k: v for k, v in overrides.items() if v is not None})
+
+    macros = [tuple(m) for m in args.macro or []]
+    if args.netlist or args.lef:
+        if not (args.netlist and args.lef):
+            parser.error("--netlist and --lef are used together")
+        try:
+            tech = tech_config(merge_lefs(args.lef))
+            macros += netlist_macros(netlist_summary(args.netlist), tech["macros"])
+        except (OSError, ValueError) as e:
+            print(f"Error: Could not read the macros: {e}")
+            sys.exit(1)
+    if macros:
+        config["macros"] = macros
+        print(f"Checking that {len(macros)} macro(s) fit every variant")
+    if args.macro_halo is not None:
+        config["macro_halo"] = args.macro_halo
+    if args.macro_fit_retries is not None:
+        config["macro_fit_retries"] = args.macro_fit_retries
+
+    if args.profile:
+        instrumentation.configure(args.profile)
+
+    generator = VariantGenerator(config)
+    num_variants = generator.config["num_variants"]
+    indices = None
+    try:
+        if args.variants:
+            indices = parse_variant_list(args.variants)
+        if args.shard:
+            k, n = (int(v) for v in args.shard.split("/"))
+            if not 0 <= k < n:
+                raise ValueError(f"need 0 <= K < N in --shard {args.shard}")
+            indices = [i for i in (indices or range(1, num_variants + 1)) if (i - 1) % n == k]
+    except ValueError as e:
+        parser.error(f"Invalid variant selection: {e}")
+    try:
+        success, fail = generator.generate(args.input, args.out_dir, num_variants, indices)
+    except (OSError, ValueError) as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+
+    print("=== Done ===")
+    print(f"Success : {success}")
+    print(f"Failed  : {fail}")
+    print(f"Fallbacks: {generator.fallback_count}")
+    print(f"DEF files are in {args.out_dir}/")
+
+if __name__ == '__main__':
+    main()